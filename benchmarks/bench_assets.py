@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+from statistics import median
+from tempfile import mkdtemp
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('legacy', 'files', 'bundle')
+
+# a fresh interpreter per run: nothing decoded or cached by an earlier window
+CHILD = r"""
+import json, os, sys, time
+root, mode, bundle, workdir = sys.argv[1:5]
+sys.path.insert(0, root)
+from benchmarks import run
+from benchmarks.fixtures import make_music_folder
+from src.app import mainWindow
+from src.app.assetRegistry import ICONS_DIR, STYLES_DIR, AssetRegistry
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtGui import QIcon, QPixmap
+
+class LegacyAssets:
+    # what MainWindow did before the registry: a QIcon per file, the PNG
+    # background decoded and scaled per window, a stylesheet read per call
+    def icon(self, name):
+        return QIcon(os.path.join(ICONS_DIR, name + '.png'))
+    def background(self, width, height):
+        return QPixmap(os.path.join(ICONS_DIR, 'main_background.png')).scaled(width, height)
+    def stylesheet(self, name):
+        with open(os.path.join(STYLES_DIR, name + '.css'), 'r') as f:
+            return f.read()
+
+assets = LegacyAssets() if mode == 'legacy' else AssetRegistry(bundle if mode == 'bundle' else None)
+spent = [0.0]
+def timed(func):
+    def call(*args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            spent[0] += time.perf_counter() - start
+    return call
+for name in ('icon', 'background', 'stylesheet'):
+    setattr(assets, name, timed(getattr(assets, name)))
+mainWindow.ASSETS = assets
+
+music = os.path.join(workdir, 'music')
+make_music_folder(music, 2)
+app = run.qt_app()
+start = time.perf_counter()
+window = run.main_window(workdir, music)
+result = {'construct': time.perf_counter() - start, 'construct_assets': spent[0]}
+
+class FirstFrame(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and 'first_frame' not in result:
+            result['first_frame'] = time.perf_counter() - start
+            result['first_frame_assets'] = spent[0]
+            QTimer.singleShot(0, app.quit)
+        return False
+
+watcher = FirstFrame()
+window.installEventFilter(watcher)
+window.show()
+QTimer.singleShot(5000, app.quit)
+app.exec_()
+
+# the settings and downloader windows ask for their stylesheet every time they open
+spent[0] = 0.0
+for _ in range(50):
+    window.get_style_file('settings')
+    window.get_style_file('styles')
+result['stylesheets_50_opens'] = spent[0]
+window.close()
+print(json.dumps(result))
+"""
+
+
+def run_once(mode:str, bundle:str) -> dict:
+    workdir = mkdtemp(prefix='bench-assets-')
+    try:
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+        child = subprocess.run([sys.executable, '-c', CHILD, ROOT, mode, bundle, workdir], cwd=ROOT, env=env,
+                               capture_output=True, text=True)
+        if child.returncode:
+            raise RuntimeError(f"asset child failed:\n{child.stderr}")
+        return json.loads(child.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def build(path:str) -> int:
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    subprocess.run([sys.executable, os.path.join(ROOT, 'build_assets.py'), '--output', path], cwd=ROOT, env=env,
+                   capture_output=True, check=True)
+    return os.path.getsize(path)
+
+
+def staleness_check(workdir:str, bundle:str) -> None:
+    # an entry whose loose file changed after the build is ignored in favour of the file
+    from src.app.assetRegistry import STYLES_DIR, AssetRegistry
+    from src.utils.assetBundle import AssetBundle, write_bundle
+    with open(os.path.join(STYLES_DIR, 'styles.css'), 'r', encoding='utf-8') as f:
+        loose = f.read()
+    built = AssetBundle(bundle)
+    meta = dict(built.meta('styles/styles'))
+    assert built.text('styles/styles') == loose
+    built.close()
+    assert AssetRegistry(bundle).stylesheet('styles') == loose
+    stale = os.path.join(workdir, 'stale.bundle')
+    meta['mtime_ns'] -= 1
+    write_bundle(stale, [('styles/styles', b'/* built from an older styles.css */', meta)])
+    assert AssetRegistry(stale).stylesheet('styles') == loose
+    print("stale entry: loose file used instead of the bundle")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Window construction with and without the asset bundle')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    workdir = mkdtemp(prefix='bench-assets-bundle-')
+    try:
+        bundle = os.path.join(workdir, 'assets.bundle')
+        print(f"bundle: {build(bundle) // 1024} KiB")
+        staleness_check(workdir, bundle)
+        results = {}
+        for mode in MODES:
+            samples = [run_once(mode, bundle) for _ in range(args.runs)]
+            results[mode] = {key: median(sample[key] for sample in samples) for key in samples[0]}
+        for mode, result in results.items():
+            print(f"{mode:>7}: window {result['construct'] * 1000:6.1f} ms "
+                  f"(assets {result['construct_assets'] * 1000:5.2f} ms), "
+                  f"first frame {result['first_frame'] * 1000:6.1f} ms "
+                  f"(assets {result['first_frame_assets'] * 1000:5.2f} ms), "
+                  f"50 settings/downloader opens: {result['stylesheets_50_opens'] * 1000:.2f} ms of stylesheets")
+        # the registry must not cost more than the per-window loading it replaced
+        assert results['bundle']['first_frame_assets'] <= results['legacy']['first_frame_assets']
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
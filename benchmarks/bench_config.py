@@ -0,0 +1,123 @@
+import os
+import time
+import shutil
+from statistics import median
+from tempfile import mkdtemp
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from benchmarks import run
+from src.app.configWatcher import ConfigWatcher
+from src.app.playerCore import PlayerCore
+from src.utils.metrics import METRICS
+from src.utils.parse import Settings
+
+
+CONFIG_PATH = os.path.join('config', 'settings.toml')
+FRAME = 1 / 60
+REPEATS = 5
+# every key SettingsWindow offers, plus the ones set by hotkeys or by hand in the file:
+# (changed value, original value)
+CHANGES = {
+    'language': ('ru', 'en'), 'theme': ('light', 'dark'), 'interval_update_music': (40, 20),
+    'step_music': (2000, 1000), 'def_volume': (30, 0), 'current_volume': (40, 0), 'step_volume': (5, 10),
+    'win_width': (300, 280), 'win_height': (100, 97), 'btn_volume_up': ('ctrl+up', 'up'),
+    'btn_music_plus': ('ctrl+right', 'right'), 'crossfade_ms': (750, 2000), 'visualizer_fps': (0, 30),
+    'metrics_enabled': (True, False), 'metrics_trace': ('trace.jsonl', ''),
+}
+
+
+def window_check(app, workdir:str) -> None:
+    # MainWindow.apply_setting, behind Settings.set, reconfigures what the window owns
+    # within a frame, without a restart
+    music, config = os.path.join(workdir, 'music'), os.path.join(workdir, 'window')
+    os.makedirs(music)
+    os.makedirs(config)
+    window = run.main_window(config, music)
+    settings, player = window.settings, lambda: window.playback.media_player
+    try:
+        volume = settings.get('current_volume')
+        settings.set('def_volume', 35)
+        window.playback.drain()
+        assert settings.get('current_volume') == volume and player().volume() == volume
+        settings.set('metrics_enabled', True)
+        settings.set('metrics_trace', 'trace.jsonl')
+        assert METRICS.enabled and METRICS.trace_path == os.path.join(config, 'trace.jsonl')
+        settings.set('metrics_enabled', False)
+        assert not METRICS.enabled
+        settings.set('btn_volume_up', 'ctrl+up')
+        assert window.hotkeys.bindings.get('ctrl+up') == ('volume', 1), window.hotkeys.bindings
+        assert 'up' not in window.hotkeys.bindings
+        settings.set('interval_update_music', 40)
+        assert player().notifyInterval() == 40 and window.ui_scheduler.timer.interval() == 40
+        settings.set('crossfade_ms', 750)
+        assert player().engine.crossfade_ms == 750
+        settings.set('theme', 'light')
+        assert '#f0f0f0' in window.styleSheet()
+        settings.set('theme', 'dark')
+        assert '#f0f0f0' not in window.styleSheet()
+        settings.set('language', 'ru')
+        assert window.lang('Shuffle') == 'Перемешать'
+        settings.set('step_volume', 5)
+        settings.set('step_music', 2000)
+        assert (window.step_volume, window.step_music) == (5, 2000)
+        settings.set('win_width', 300)
+        settings.set('win_height', 100)
+        assert (window.width(), window.height()) == (300, 100)
+
+        timings = {}
+        for key, values in CHANGES.items():
+            samples = []
+            for _ in range(REPEATS):
+                for value in values:
+                    start = time.perf_counter()
+                    settings.set(key, value)
+                    samples.append(time.perf_counter() - start)
+                    app.processEvents()
+            timings[key] = median(samples)
+        slowest = max(timings, key=timings.get)
+        print(f"MainWindow.apply_setting: {len(CHANGES)} keys applied live, median per key at most "
+              f"{timings[slowest] * 1000:.2f} ms ({slowest})")
+        assert timings[slowest] < FRAME, timings
+    finally:
+        window.close()
+
+    # the start volume is taken when a player starts, not while one runs
+    settings = Settings(settings.filename, write_behind=True)
+    settings.set('def_volume', 35)
+    core = PlayerCore(settings, autoplay=False)
+    core.playback.drain()
+    assert settings.get('current_volume') == 35 and core.playback.media_player.volume() == 35
+    core.close()
+    settings.close()
+
+
+def main():
+    app = run.qt_app()
+    workdir = mkdtemp(prefix='bench-config-')
+    try:
+        path = shutil.copy(CONFIG_PATH, workdir)
+        settings = Settings(path, write_behind=True)
+        watcher = ConfigWatcher(settings)
+        seen = {}
+        settings.subscribe(lambda key, value: seen.setdefault(key, (value, time.perf_counter())))
+
+        # external edit picked up by the file watcher
+        time.sleep(0.05)
+        with open(path, 'a') as f:
+            f.write('extra_key = 7\n')
+        start = time.perf_counter()
+        while 'extra_key' not in seen and time.perf_counter() - start < 2:
+            app.processEvents()
+            time.sleep(0.001)
+        assert 'extra_key' in seen, 'file change was not picked up'
+        print(f"file edit -> observer: {(seen['extra_key'][1] - start) * 1000:.1f} ms "
+              f"(including {watcher.timer.interval()} ms debounce)")
+        settings.close()
+        window_check(app, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import shutil
+from tempfile import mkdtemp
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QBuffer, QIODevice, QSize
+from PyQt5.QtGui import QColor, QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+from benchmarks.fixtures import apic_frame, id3v2_tag, rss, write_mp3
+from src.app.coverArt import MISSING, PREFETCH_TRACKS, CoverArtCache, scale_cover
+from src.utils.metadata import read_cover
+
+
+LIBRARY = 10_000
+COVERS = 200
+SIZE = (280, 97)
+CAP = 8 * 1024 * 1024
+SLACK = 48 * 1024 * 1024
+
+
+def jpeg(width:int, height:int, seed:int) -> bytes:
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor.fromHsv(seed * 37 % 360, 200, 120 + seed % 100))
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'JPEG', 90)
+    return bytes(buffer.data())
+
+
+def wait_idle(app, cache:CoverArtCache, paths) -> None:
+    deadline = time.perf_counter() + 120
+    while any(cache.get(path) is MISSING for path in paths):
+        if time.perf_counter() > deadline:
+            raise TimeoutError('covers not loaded')
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def extraction_check(workdir:str) -> None:
+    # a back cover before the front cover, both with UTF-16 descriptions; a long audio payload after them
+    front, back = jpeg(600, 600, 1), jpeg(64, 64, 2)
+    tag = id3v2_tag('Song', extra=apic_frame(back, 4, description='back') + apic_frame(front, 3, description='front'))
+    path = write_mp3(os.path.join(workdir, 'tagged.mp3'), 60, tag=tag)
+    assert read_cover(path) == front
+    assert read_cover(write_mp3(os.path.join(workdir, 'plain.mp3'), 1)) is None
+    image = scale_cover(front, QSize(*SIZE))
+    assert (image.width(), image.height()) == SIZE
+    # one side already matching and the other short still scales up, no black band
+    for width, height in ((SIZE[0], 40), (120, SIZE[1]), (SIZE[0], SIZE[1] * 3)):
+        image = scale_cover(jpeg(width, height, 3), QSize(*SIZE))
+        assert (image.width(), image.height()) == SIZE
+        assert all(image.pixelColor(x, y).value() > 60 for x in (0, SIZE[0] - 1) for y in (0, SIZE[1] - 1))
+
+    start = time.perf_counter()
+    for _ in range(500):
+        read_cover(path)
+    extract = (time.perf_counter() - start) / 500
+    start = time.perf_counter()
+    for _ in range(50):
+        scale_cover(front, QSize(*SIZE))
+    scale = (time.perf_counter() - start) / 50
+    print(f"embedded cover of a {os.path.getsize(path) // 1024} KiB file: tag read {extract * 1e6:.0f} us, "
+          f"600x600 JPEG to {SIZE[0]}x{SIZE[1]} {scale * 1000:.2f} ms (pool thread)")
+
+
+def library(workdir:str) -> list[str]:
+    # COVERS distinct files, reached through LIBRARY distinct paths
+    sources = []
+    for index in range(COVERS):
+        tag = id3v2_tag(f'Track {index}', extra=apic_frame(jpeg(400, 400, index)))
+        sources.append(write_mp3(os.path.join(workdir, f'cover{index:03}.mp3'), 1, tag=tag))
+    links = os.path.join(workdir, 'library')
+    os.makedirs(links)
+    paths = []
+    for index in range(LIBRARY):
+        path = os.path.join(links, f'track{index:05}.mp3')
+        os.symlink(sources[index % COVERS], path)
+        paths.append(path)
+    return paths
+
+
+def scroll_check(app, paths:list[str]) -> None:
+    # every track requested in order, the next ones prefetched, like scrolling a list of 10k rows
+    cache = CoverArtCache(*SIZE, max_bytes=CAP)
+    baseline, peak_rss, peak_bytes = rss(), 0, 0
+    start = time.perf_counter()
+    for index, path in enumerate(paths):
+        cache.request(path)
+        cache.prefetch(paths[index + 1:index + 1 + PREFETCH_TRACKS])
+        if not index % 50:
+            wait_idle(app, cache, paths[index:index + 1 + PREFETCH_TRACKS])
+            peak_rss, peak_bytes = max(peak_rss, rss()), max(peak_bytes, cache.bytes)
+    wait_idle(app, cache, paths[-1:])
+    elapsed = time.perf_counter() - start
+    peak_rss, peak_bytes = max(peak_rss, rss()), max(peak_bytes, cache.bytes)
+    thumb = SIZE[0] * SIZE[1] * 4
+    assert peak_bytes <= CAP, peak_bytes
+    assert peak_rss - baseline <= CAP + SLACK, (peak_rss - baseline) // 1024
+    print(f"scroll {LIBRARY} tracks: {elapsed:.1f} s, {len(cache)} thumbnails kept ({peak_bytes // 1024} KiB "
+          f"<= {CAP // 1024} KiB cap), RSS +{(peak_rss - baseline) // 1024} KiB "
+          f"(unbounded: {LIBRARY * thumb // 1024 // 1024} MiB)")
+    cache.shutdown()
+
+
+def switch_check(app, workdir:str, paths:list[str]) -> None:
+    # play_song's swap: a prefetched cover is a dictionary hit plus a small pixmap upload
+    cache = CoverArtCache(*SIZE, disk_dir=os.path.join(workdir, 'covers'))
+    cache.prefetch(paths[:PREFETCH_TRACKS])
+    wait_idle(app, cache, paths[:PREFETCH_TRACKS])
+    start = time.perf_counter()
+    for path in paths[:PREFETCH_TRACKS]:
+        cover = cache.request(path)
+        QPixmap.fromImage(cover)
+    hit = (time.perf_counter() - start) / PREFETCH_TRACKS
+
+    start = time.perf_counter()
+    for path in paths[:PREFETCH_TRACKS]:
+        cache.load(path)
+    disk = (time.perf_counter() - start) / PREFETCH_TRACKS
+    cache.disk_dir = None
+    start = time.perf_counter()
+    for path in paths[:PREFETCH_TRACKS]:
+        cache.load(path)
+    cold = (time.perf_counter() - start) / PREFETCH_TRACKS
+    print(f"track switch with the cover prefetched: {hit * 1000:.3f} ms on the GUI thread; "
+          f"a miss costs {cold * 1000:.2f} ms from the tag, {disk * 1000:.2f} ms from the disk tier, off-thread")
+    cache.shutdown()
+
+
+def main():
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    workdir = mkdtemp(prefix='bench-covers-')
+    try:
+        extraction_check(workdir)
+        paths = library(workdir)
+        switch_check(app, workdir, paths)
+        scroll_check(app, paths)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
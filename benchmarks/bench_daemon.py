@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import socket
+import subprocess
+from statistics import median, quantiles
+from tempfile import mkdtemp
+
+from benchmarks.fixtures import write_wav
+from src.app.controlServer import MAX_LINE
+from src.utils.control import PlayerControl
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUND_TRIPS = 2000
+SETTLE_MS = 1000
+
+# both modes on a private config: NumPy backend into a null sink, the same music folder
+CHILD = r"""
+import json, os, shutil, sys, time
+start = time.perf_counter()
+root, mode, workdir, music = sys.argv[1:5]
+sys.path.insert(0, root)
+from benchmarks.fixtures import rss
+from src.utils.parse import Settings
+
+def report(**result):
+    result['rss'] = rss()
+    result['modules'] = sorted(m for m in ('PyQt5.QtWidgets', 'PyQt5.QtGui', 'src.app.mainWindow') if m in sys.modules)
+    print(json.dumps(result), flush=True)
+
+if mode == 'gui':
+    from benchmarks import run
+    app = run.qt_app()
+    window = run.main_window(workdir, music)
+    window.show()
+    result = {'construct': time.perf_counter() - start}
+    from PyQt5.QtCore import QTimer
+    QTimer.singleShot(SETTLE_MS, lambda: (report(**result), app.quit()))
+    app.exec_()
+    window.close()
+else:
+    import main
+    settings = Settings(shutil.copy(os.path.join(root, 'config', 'settings.toml'), workdir), write_behind=True)
+    with settings.transaction():
+        settings.set('path_to_music', music)
+        settings.set('playlist', '')
+        settings.set('normalize_volume', False)
+        settings.set('audio_backend', 'numpy')
+        settings.set('audio_sink', 'null')
+        settings.set('control_socket', os.path.join(workdir, 'player.sock'))
+    from PyQt5.QtCore import QCoreApplication, QTimer
+    app = QCoreApplication([sys.argv[0]])
+    constructed = []
+    QTimer.singleShot(0, lambda: constructed.append(time.perf_counter() - start))
+    QTimer.singleShot(SETTLE_MS, lambda: report(construct=constructed[0], socket=main.control_path(settings)))
+    main.run_daemon([sys.argv[0]], settings)
+""".replace('SETTLE_MS', str(SETTLE_MS))
+
+
+def start(mode:str, workdir:str, music:str) -> tuple[subprocess.Popen, dict]:
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    child = subprocess.Popen([sys.executable, '-c', CHILD, ROOT, mode, workdir, music], cwd=ROOT, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = child.stdout.readline()
+    if not line:
+        raise RuntimeError(f"{mode} child failed:\n{child.stderr.read()}")
+    return child, json.loads(line)
+
+
+def round_trips(control:PlayerControl, count:int, cmd:str, args) -> list[float]:
+    samples = []
+    for index in range(count):
+        began = time.perf_counter()
+        control.request(cmd, **args(index))
+        samples.append(time.perf_counter() - began)
+    return samples
+
+
+def describe(samples:list[float]) -> str:
+    p99 = quantiles(samples, n=100)[98]
+    return f"median {median(samples) * 1e6:6.0f} us, p99 {p99 * 1e6:6.0f} us"
+
+
+def api_check(control:PlayerControl, listener:PlayerControl, path:str) -> None:
+    status = control.request('status')
+    assert status['state'] == 'stopped' and status['track'] and status['count'] == 8, status
+    listener.subscribe('track', 'state', 'volume')
+    control.request('play')
+    assert listener.next_event() == {'event': 'state', 'state': 'playing'}
+    control.request('next')
+    event = listener.next_event()
+    assert event['event'] == 'track' and event['track'] != status['track'], event
+    control.request('seek', position=500)
+    control.request('volume', volume=42)
+    event = listener.next_event()
+    assert event == {'event': 'volume', 'volume': 42}, event
+    control.request('pause')
+    assert listener.next_event()['state'] == 'paused'
+    try:
+        control.request('rewind')
+    except RuntimeError as e:
+        assert 'unknown command' in str(e)
+    else:
+        raise AssertionError('unknown command accepted')
+    # bad input is an error response, never the end of the daemon
+    for cmd, args in (('volume', {'volume': 1e999}), ('seek', {'position': 1e999}), ('volume', {'volume': 'up'})):
+        try:
+            control.request(cmd, **args)
+        except RuntimeError as e:
+            assert 'finite number' in str(e), e
+        else:
+            raise AssertionError(f'{cmd} {args} accepted')
+    flood = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    flood.connect(path)
+    try:
+        flood.sendall(b'x' * (MAX_LINE + 4096))
+        reply = flood.makefile('rb').readline()
+        assert b'longer than' in reply, reply
+    except OSError:
+        pass
+    flood.close()
+    assert control.request('status')['volume'] == 42
+    print(f"api: status/play/next/seek/volume/pause answered, events delivered to the subscriber, bad input refused")
+
+
+def main():
+    workdir = mkdtemp(prefix='bench-daemon-')
+    try:
+        music = os.path.join(workdir, 'music')
+        os.makedirs(music)
+        # long enough that nothing ends and advances on its own during the run
+        for index in range(8):
+            write_wav(os.path.join(music, f'track{index}.wav'), 30, rate=8000, channels=1, title=f'Track {index}')
+        gui_dir, daemon_dir = os.path.join(workdir, 'gui'), os.path.join(workdir, 'daemon')
+        os.makedirs(gui_dir)
+        os.makedirs(daemon_dir)
+
+        gui, gui_result = start('gui', gui_dir, music)
+        gui.wait()
+        daemon, daemon_result = start('headless', daemon_dir, music)
+        try:
+            assert not daemon_result['modules'], daemon_result['modules']
+            control, listener = PlayerControl(daemon_result['socket']), PlayerControl(daemon_result['socket'])
+            api_check(control, listener, daemon_result['socket'])
+
+            status = round_trips(control, ROUND_TRIPS, 'status', lambda index: {})
+            volume = round_trips(control, ROUND_TRIPS // 4, 'volume', lambda index: {'volume': index % 100})
+            seek = round_trips(control, ROUND_TRIPS // 4, 'seek', lambda index: {'position': index * 10 % 900})
+            # command sent by one client -> event read by another
+            listener.subscribe('volume')
+            events = []
+            for index in range(200):
+                began = time.perf_counter()
+                control.request('volume', volume=50 + index % 2)
+                listener.next_event()
+                events.append(time.perf_counter() - began)
+            print(f"status round trip: {describe(status)}")
+            print(f"volume round trip: {describe(volume)}")
+            print(f"  seek round trip: {describe(seek)}")
+            print(f"volume -> event on a second connection: {describe(events)}")
+            assert median(status) < 0.005, median(status)
+            control.close()
+            listener.close()
+        finally:
+            daemon.send_signal(signal.SIGTERM)
+            daemon.wait(10)
+        assert not os.path.exists(daemon_result['socket'])
+
+        print(f"     gui: up in {gui_result['construct'] * 1000:5.0f} ms, RSS {gui_result['rss'] / 2**20:6.1f} MiB")
+        print(f"headless: up in {daemon_result['construct'] * 1000:5.0f} ms, RSS {daemon_result['rss'] / 2**20:6.1f} MiB "
+              f"({(1 - daemon_result['rss'] / gui_result['rss']) * 100:.0f}% less, no QtGui/QtWidgets loaded)")
+        assert daemon_result['rss'] < gui_result['rss']
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
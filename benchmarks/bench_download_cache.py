@@ -0,0 +1,226 @@
+import os
+import re
+import shutil
+import sys
+import time
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import mkdtemp
+from threading import Thread
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication
+
+from src.app.downloadManager import DownloadManager, DONE
+from src.utils.downloader import Downloader
+from src.utils.downloadCache import PARTIAL_MAX_AGE, VIDEO_ID, video_id
+
+
+SIZE = 2 * 1024 * 1024
+
+
+class MediaServer(ThreadingHTTPServer):
+    # a local stand-in for the video CDN: GET with optional Range, optionally
+    # cutting a response short or ignoring ranges altogether
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RangeHandler)
+        self.files = {}
+        self.served = 0
+        self.requests = []
+        self.cut_after = None
+        self.ignore_range = False
+        Thread(target=self.serve_forever, daemon=True).start()
+
+
+    def url(self, name:str) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/{name}'
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        data = server.files.get(self.path.lstrip('/'))
+        if data is None:
+            self.send_error(404)
+            return
+        start = 0
+        match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        server.requests.append((self.path, self.headers.get('Range')))
+        if match and not server.ignore_range:
+            start = int(match.group(1))
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.cut_after is not None:
+            # the connection drops part way, as a flaky network would
+            body, server.cut_after = body[:server.cut_after], None
+        for offset in range(0, len(body), 64 * 1024):
+            self.wfile.write(body[offset:offset + 64 * 1024])
+            server.served += len(body[offset:offset + 64 * 1024])
+
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeStream:
+    def __init__(self, server:MediaServer, name:str, itag:int):
+        self.url = server.url(name)
+        self.filesize = len(server.files[name])
+        self.itag = itag
+
+
+class FakeStreams:
+    def __init__(self, owner):
+        self.owner = owner
+
+
+    def filter(self, **kwargs):
+        FakeYouTube.lookups += 1
+        return self
+
+
+    def first(self):
+        name = self.owner.url.rsplit('=', 1)[-1]
+        return FakeStream(FakeYouTube.server, name, 140)
+
+
+class FakeYouTube:
+    # pytube's surface; every streams/title access would be a request to YouTube
+    server = None
+    lookups = 0
+
+    def __init__(self, url, on_progress_callback=None):
+        self.url = url
+        self.streams = FakeStreams(self)
+
+
+    @property
+    def title(self):
+        FakeYouTube.lookups += 1
+        return 'Song ' + self.url.rsplit('=', 1)[-1]
+
+
+def payload(seed:int, size:int = SIZE) -> bytes:
+    return hashlib.sha256(str(seed).encode()).digest() * (size // 32)
+
+
+def run_jobs(app, manager:DownloadManager, urls:list[str], music:str) -> tuple[list[dict], float]:
+    start = time.perf_counter()
+    ids = [manager.add(url, music) for url in urls]
+    while manager.pending():
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+    return [manager.jobs[job_id] for job_id in ids], time.perf_counter() - start
+
+
+def main():
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    workdir = mkdtemp(prefix='bench-download-cache-')
+    server = MediaServer()
+    FakeYouTube.server = server
+    try:
+        music = os.path.join(workdir, 'music')
+        for index in range(8):
+            server.files[f'vid{index}'] = payload(index)
+        # another upload of the same audio
+        server.files['reupload'] = server.files['vid0']
+        manager = DownloadManager(os.path.join(workdir, 'downloads.json'), 2, retries=3, backoff=0.01,
+                                  cache_bytes=5 * SIZE)
+        manager.create_downloader = lambda url, path, on_progress: Downloader(
+            url, path, on_progress=on_progress, youtube=FakeYouTube, cache=manager.cache())
+        url = 'https://www.youtube.com/watch?v=vid0'
+
+        (job,), cold = run_jobs(app, manager, [url], music)
+        assert job['status'] == DONE and server.served == SIZE
+        path = os.path.join(music, job['filename'])
+        assert open(path, 'rb').read() == server.files['vid0']
+        print(f"first request: {SIZE // 1024} KiB fetched in {cold * 1000:.0f} ms -> {job['filename']}")
+
+        served, lookups = server.served, FakeYouTube.lookups
+        (job,), warm = run_jobs(app, manager, [url], music)
+        (short,), _ = run_jobs(app, manager, ['https://youtu.be/vid0'], music)
+        assert server.served == served and FakeYouTube.lookups == lookups
+        assert job['filename'] == short['filename'] == os.path.basename(path)
+        assert len(os.listdir(music)) == 1
+        os.remove(path)
+        (job,), restored = run_jobs(app, manager, [url], music)
+        assert os.path.exists(path) and server.served == served
+        print(f"repeat request: {warm * 1000:.1f} ms, 0 bytes and no YouTube lookups; deleted file "
+              f"restored from the cache in {restored * 1000:.1f} ms")
+
+        # connection cut at 40%: the retry asks for the rest with a Range request
+        server.served, server.cut_after = 0, int(SIZE * 0.4)
+        (job,), elapsed = run_jobs(app, manager, ['https://www.youtube.com/watch?v=vid1'], music)
+        cache = manager.cache()
+        assert job['status'] == DONE and job['attempts'] == 2 and cache.resumed == 1
+        assert server.served == SIZE and server.requests[-1][1] == f'bytes={int(SIZE * 0.4)}-'
+        assert open(os.path.join(music, job['filename']), 'rb').read() == server.files['vid1']
+        print(f"cut at 40%: resumed from byte {int(SIZE * 0.4)}, {server.served / SIZE:.2f}x the file "
+              f"transferred in total ({elapsed * 1000:.0f} ms)")
+
+        # a server that ignores Range: the resume notices the 200 and starts over
+        server.served, server.cut_after, server.ignore_range = 0, int(SIZE * 0.4), True
+        (job,), _ = run_jobs(app, manager, ['https://www.youtube.com/watch?v=vid2'], music)
+        server.ignore_range = False
+        assert job['status'] == DONE and server.served == SIZE + int(SIZE * 0.4)
+        assert open(os.path.join(music, job['filename']), 'rb').read() == server.files['vid2']
+        print("server without range support: restarted from 0, file intact")
+
+        # identical bytes under another video id are stored once
+        run_jobs(app, manager, ['https://www.youtube.com/watch?v=reupload'], music)
+        objects = sum(len(files) for _, _, files in os.walk(cache.objects_dir))
+        assert objects == 3 and cache.size() == 3 * SIZE
+        print(f"re-upload of the same audio: {objects} objects for 4 cached videos")
+
+        # LRU: vid0 is the oldest but used again, so vid1 goes when a sixth file passes the 5-file cap
+        run_jobs(app, manager, [url], music)
+        run_jobs(app, manager, [f'https://www.youtube.com/watch?v=vid{index}' for index in range(3, 6)], music)
+        cached = {row[0] for row in cache.db.execute("SELECT video_id FROM downloads")}
+        assert cache.size() <= 5 * SIZE, cache.size()
+        assert {'vid0', 'reupload', 'vid2', 'vid5'} <= cached and 'vid1' not in cached, cached
+        assert all(os.path.exists(os.path.join(music, name)) for name in os.listdir(music))
+        print(f"cap 5 files: {cache.size() // SIZE} files kept ({', '.join(sorted(cached))}), "
+              f"least recently used evicted, music folder untouched ({len(os.listdir(music))} files)")
+
+        # a URL without a usable id never reaches a file name as typed
+        for odd in ('https://example.com/watch?v=../../x', 'https://example.com/some/page'):
+            assert VIDEO_ID.fullmatch(video_id(odd)) and video_id(odd) == video_id(odd), video_id(odd)
+
+        # partial files of abandoned downloads: expired after a week, and counted against the cap
+        stale, fresh = (os.path.join(cache.partial_dir, f'gone{index}-140.part') for index in range(2))
+        for part in (stale, fresh):
+            with open(part, 'wb') as f:
+                f.write(bytes(SIZE // 2))
+        old = time.time() - PARTIAL_MAX_AGE - 60
+        os.utime(stale, (old, old))
+        cache.evict(keep=('vid0', 140))
+        assert not os.path.exists(stale) and os.path.exists(fresh)
+        assert cache.size() <= cache.max_bytes, cache.size()
+        print(f"abandoned partials: week-old one removed, fresh one counted ({cache.size() // 1024} KiB "
+              f"<= {cache.max_bytes // 1024} KiB cap)")
+
+        # many repeat requests, straight against the cache
+        start = time.perf_counter()
+        for _ in range(200):
+            cache.resolve('vid0', 'audio', None, music)
+        print(f"hit path: {(time.perf_counter() - start) / 200 * 1000:.2f} ms per resolve")
+        manager.shutdown()
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import json
+import shutil
+import sys
+import time
+from tempfile import mkdtemp
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication
+
+from src.app.downloadManager import DownloadManager, DONE, FAILED, CANCELLED, QUEUED
+from src.utils.downloader import Downloader
+
+
+class FakeStream:
+    # stands in for a pytube Stream: writes `filesize` bytes in chunks with progress callbacks
+    def __init__(self, owner, filesize=256 * 1024, chunk=16 * 1024, delay=0.001):
+        self.owner = owner
+        self.filesize = filesize
+        self.chunk = chunk
+        self.delay = delay
+
+
+    def filter(self, **kwargs):
+        return self
+
+
+    def first(self):
+        return self
+
+
+    def download(self, output_path, filename):
+        failures = FakeYouTube.failures_by_url
+        if failures.get(self.owner.url):
+            failures[self.owner.url] -= 1
+            raise ConnectionError('simulated network failure')
+        remaining = self.filesize
+        with open(os.path.join(output_path, filename), 'wb') as f:
+            while remaining:
+                size = min(self.chunk, remaining)
+                f.write(bytes(size))
+                remaining -= size
+                time.sleep(self.delay)
+                self.owner.on_progress_callback(self, None, remaining)
+
+
+class FakeYouTube:
+    failures_by_url = {}
+
+
+    def __init__(self, url, on_progress_callback=None):
+        self.url = url
+        self.title = 'Fake ' + url.rsplit('=', 1)[-1]
+        self.on_progress_callback = on_progress_callback
+        self.streams = FakeStream(self)
+
+
+def fake_downloader(url, path, on_progress):
+    return Downloader(url, path, on_progress=on_progress, youtube=FakeYouTube)
+
+
+def resume_check(app, workdir:str) -> None:
+    # a job left queued by the last run only starts once the owner is wired up, and
+    # a duplicate check or move that raises fails the job instead of the worker
+    queue_path = os.path.join(workdir, 'resume.json')
+    url = 'https://www.youtube.com/watch?v=resumed'
+    with open(queue_path, 'w') as f:
+        json.dump([{'id': 7, 'url': url, 'path': workdir, 'audio': True, 'status': QUEUED,
+                    'attempts': 0, 'progress': 0, 'filename': None, 'error': None}], f)
+    for outcome in (DONE, FAILED):
+        checked, finished = [], []
+
+        def check_duplicate(path):
+            checked.append(path)
+            if outcome == FAILED:
+                raise OSError('library unavailable')
+
+        manager = DownloadManager(queue_path, retries=0, create_downloader=fake_downloader)
+        time.sleep(0.05)
+        assert manager.jobs == {}
+        manager.check_duplicate = check_duplicate
+        manager.jobFinished.connect(lambda job_id, path: finished.append(path))
+        manager.start()
+        deadline = time.perf_counter() + 10
+        while manager.jobs[7]['status'] != outcome or (outcome == DONE and not finished):
+            assert time.perf_counter() < deadline, manager.jobs[7]
+            app.processEvents()
+            time.sleep(0.001)
+        assert checked and bool(finished) == (outcome == DONE)
+        # the status flips before the worker saves; its save must not land on the rewrite below
+        manager.shutdown(wait=True)
+        with open(queue_path, 'w') as f:
+            json.dump([dict(manager.jobs[7], status=QUEUED, attempts=0)], f)
+    print("resumed job: duplicate check and jobFinished wired before it ran, a failing check recorded as failed")
+
+
+def main(jobs:int = 40, workers:int = 4):
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    workdir = mkdtemp(prefix='bench-downloads-')
+    try:
+        urls = [f"https://www.youtube.com/watch?v=fake{n}" for n in range(jobs)]
+        FakeYouTube.failures_by_url = {urls[1]: 2, urls[2]: 10}
+        manager = DownloadManager(os.path.join(workdir, 'downloads.json'), workers, retries=3,
+                                  backoff=0.01, create_downloader=fake_downloader)
+        progress_events = []
+        manager.jobProgress.connect(lambda job_id, percent: progress_events.append(percent))
+
+        start = time.perf_counter()
+        ids = [manager.add(url, workdir) for url in urls]
+        manager.cancel(ids[-1])
+        while manager.pending():
+            app.processEvents()
+            time.sleep(0.001)
+        app.processEvents()
+        elapsed = time.perf_counter() - start
+
+        statuses = [manager.jobs[job_id]['status'] for job_id in ids]
+        assert statuses[1] == DONE and manager.jobs[ids[1]]['attempts'] == 3
+        assert statuses[2] == FAILED
+        assert statuses[-1] == CANCELLED
+        print(f"{jobs} jobs on {workers} workers in {elapsed:.2f}s: {statuses.count(DONE)} done, "
+              f"{statuses.count(FAILED)} failed, {statuses.count(CANCELLED)} cancelled, "
+              f"{len(progress_events)} progress signals")
+
+        # a job reads as finished before its worker has saved it; reload only after the last save
+        manager.shutdown(wait=True)
+        restored = DownloadManager(os.path.join(workdir, 'downloads.json'), create_downloader=fake_downloader)
+        restored.start()
+        assert not restored.pending() and len(restored.jobs) == jobs
+        restored.shutdown()
+        resume_check(app, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,109 @@
+import os
+import shutil
+import threading
+import time
+from struct import pack
+from tempfile import mkdtemp
+
+import numpy as np
+
+from benchmarks.fixtures import write_wav
+from src.utils.audioEngine import AudioEngine, FileSink, NullSink
+from src.utils.decoders import WavStream
+
+
+SECONDS = 4
+CONFIGS = ((50, 256), (100, 512), (250, 1024), (500, 2048))
+
+
+def busy(stop:threading.Event) -> None:
+    # keeps the GIL contended the way a repainting GUI thread would
+    while not stop.is_set():
+        sum(i * i for i in range(2000))
+
+
+def realtime_run(path:str, buffer_ms:int, period:int, load:bool) -> dict[str]:
+    events = []
+    engine = AudioEngine(NullSink(realtime=True), buffer_ms, period, on_event=events.append)
+    stop = threading.Event()
+    if load:
+        threading.Thread(target=busy, args=(stop,), daemon=True).start()
+    engine.open(path)
+    while 'buffered' not in events:
+        time.sleep(0.001)
+    engine.play()
+
+    time.sleep(SECONDS / 4)
+    for target in (engine.sample_rate * SECONDS // 2, engine.sample_rate // 2):
+        engine.seek(target)
+        time.sleep(SECONDS / 8)
+    while 'end' not in events:
+        time.sleep(0.005)
+    stop.set()
+    engine.sink.stop()
+    return {'buffer_ms': buffer_ms, 'period': period, 'underruns': engine.underruns,
+            'start_ms': engine.start_latencies[-1], 'seek_ms': max(engine.seek_latencies),
+            'output_latency_ms': (engine.track.ring.capacity + period) * 1000 // engine.sample_rate}
+
+
+def fidelity(path:str, workdir:str) -> float:
+    # faster-than-realtime render through the file sink must equal input * volume
+    out_path = os.path.join(workdir, 'out.wav')
+    events = []
+    engine = AudioEngine(FileSink(out_path), 100, 512, on_event=events.append)
+    engine.volume = 0.5
+    engine.open(path)
+    while 'buffered' not in events:
+        time.sleep(0.001)
+    start = time.perf_counter()
+    engine.play()
+    while 'end' not in events:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    engine.sink.stop()
+
+    source, rendered = WavStream(path), WavStream(out_path)
+    expected = source.read(0, source.frames) * 0.5
+    got = rendered.read(0, source.frames)
+    assert len(got) == len(expected)
+    assert np.abs(got - expected).max() <= 1.5 / 32768
+    return SECONDS / elapsed
+
+
+def malformed_check(workdir:str) -> None:
+    # a cut-off or empty fmt chunk is a file the backend reports as invalid, not an exception
+    from src.app.audioBackend import INVALID_MEDIA
+    from src.app.numpyBackend import NumpyBackend
+    backend = NumpyBackend(sink=NullSink())
+    statuses = []
+    backend.mediaStatusChanged.connect(statuses.append)
+    for name, fmt in (('short_fmt.wav', b'\x01\x00\x01\x00'), ('no_channels.wav', pack('<HHIIHH', 1, 0, 8000, 0, 0, 16))):
+        path = os.path.join(workdir, name)
+        with open(path, 'wb') as f:
+            f.write(b'RIFF' + pack('<I', 28 + len(fmt)) + b'WAVE' + b'fmt ' + pack('<I', len(fmt)) + fmt +
+                    b'data' + pack('<I', 4) + bytes(4))
+        backend.open(path)
+        assert statuses[-1] == INVALID_MEDIA, (name, statuses)
+    backend.engine.sink.stop()
+    print("truncated fmt chunk, zero channels: reported as invalid media")
+
+
+def main():
+    workdir = mkdtemp(prefix='bench-engine-')
+    try:
+        malformed_check(workdir)
+        path = write_wav(os.path.join(workdir, 'tone.wav'), SECONDS)
+        print(f"file sink render: {fidelity(path, workdir):.0f}x realtime, output matches input * volume")
+        for load in (False, True):
+            for buffer_ms, period in CONFIGS:
+                result = realtime_run(path, buffer_ms, period, load)
+                print(("busy GIL " if load else "idle     ") +
+                      "buffer {buffer_ms:>3} ms / period {period:>4}: {underruns} underruns, "
+                      "start {start_ms:5.1f} ms, seek {seek_ms:5.1f} ms, "
+                      "output latency {output_latency_ms} ms".format(**result))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
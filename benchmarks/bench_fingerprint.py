@@ -0,0 +1,150 @@
+import os
+import shutil
+import sys
+import time
+from tempfile import mkdtemp
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication
+
+from benchmarks.bench_downloads import FakeYouTube
+from benchmarks.fixtures import write_song
+from src.app.downloadManager import DownloadManager, DONE, DUPLICATE
+from src.utils.decoders import can_decode
+from src.utils.downloader import Downloader
+from src.utils.fingerprint import FingerprintIndex, fingerprint, fingerprint_all, find_duplicate
+from src.utils.library import Library
+
+
+SONG_SECONDS = 20
+LIBRARY_SIZES = (50, 100, 200)
+# every DUPLICATE_EVERY-th song also exists as a quieter, noisier, shifted 22 kHz copy
+DUPLICATE_EVERY = 10
+QUERIES = 20
+
+
+def make_library(root:str, count:int) -> set[frozenset]:
+    os.makedirs(root, exist_ok=True)
+    planted = set()
+    for seed in range(count):
+        original = write_song(os.path.join(root, f'song{seed:04}.wav'), seed, SONG_SECONDS)
+        if seed % DUPLICATE_EVERY == 0:
+            copy = write_song(os.path.join(root, f'song{seed:04}_copy.wav'), seed, SONG_SECONDS,
+                              rate=22050, lead_in=0.37, gain=0.6, noise=0.02)
+            planted.add(frozenset((original, copy)))
+    return planted
+
+
+def index_library(library:Library, root:str, workers:int = None) -> tuple[float, int]:
+    library.scan(root)
+    index = FingerprintIndex(library)
+    start = time.perf_counter()
+    index.store(fingerprint_all(index.stale(root), workers))
+    return time.perf_counter() - start, len(library.stale('fingerprints', root))
+
+
+def query_latency(library:Library, queries:list[str]) -> float:
+    index = FingerprintIndex(library)
+    prints = [fingerprint(path) for path in queries]
+    start = time.perf_counter()
+    for data in prints:
+        index.match(data)
+    return (time.perf_counter() - start) / len(prints)
+
+
+def download_check(workdir:str, library_path:str, duplicate_of:str) -> tuple[str, str]:
+    # a fake download that writes a re-encoded copy of a library song
+    app = QCoreApplication.instance() or QCoreApplication([sys.argv[0]])
+
+    class SongStream:
+        filesize = 1
+
+        def filter(self, **kwargs):
+            return self
+
+        def first(self):
+            return self
+
+        def download(self, output_path, filename):
+            write_song(os.path.join(output_path, filename), int(url.rsplit('=', 1)[-1]), SONG_SECONDS, lead_in=1.1)
+
+    class SongYouTube(FakeYouTube):
+        def __init__(self, url, on_progress_callback=None):
+            super().__init__(url, on_progress_callback)
+            self.streams = SongStream()
+
+    statuses = []
+    music = os.path.join(workdir, 'downloads')
+    os.makedirs(music)
+    manager = DownloadManager(os.path.join(workdir, 'downloads.json'),
+                              create_downloader=lambda url, path, on_progress: Downloader(url, path, youtube=SongYouTube),
+                              check_duplicate=lambda path: find_duplicate(library_path, path))
+    for url in (f'https://www.youtube.com/watch?v={int(duplicate_of[-8:-4])}', 'https://www.youtube.com/watch?v=9999'):
+        job_id = manager.add(url, music)
+        deadline = time.perf_counter() + 30
+        while manager.jobs[job_id]['status'] not in (DONE, DUPLICATE) and time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        statuses.append(manager.jobs[job_id]['status'])
+    manager.shutdown()
+    return tuple(statuses)
+
+
+def main():
+    workdir = mkdtemp(prefix='bench-fingerprint-')
+    try:
+        root = os.path.join(workdir, 'music')
+        planted = make_library(root, max(LIBRARY_SIZES))
+        tracks = sorted(os.listdir(root))
+        audio_seconds = len(tracks) * SONG_SECONDS
+
+        start = time.perf_counter()
+        for path in tracks[:10]:
+            fingerprint(os.path.join(root, path))
+        serial = (time.perf_counter() - start) / 10
+        print(f"fingerprint: {serial * 1000:.1f} ms per {SONG_SECONDS} s song "
+              f"({SONG_SECONDS / serial:.0f}x realtime, one process)")
+
+        library_path = os.path.join(workdir, 'library.sqlite')
+        library = Library(library_path)
+        pool_time, left = index_library(library, root)
+        assert left == 0
+        print(f"indexed {len(tracks)} files ({audio_seconds / 60:.0f} min) on a process pool in {pool_time:.2f}s, "
+              f"rescan {index_library(library, root)[0] * 1000:.1f} ms (cached)")
+
+        groups = FingerprintIndex(library).duplicates(root)
+        found = {frozenset(group) for group in groups}
+        assert found == planted, (len(found), len(planted))
+        start = time.perf_counter()
+        FingerprintIndex(library).duplicates(root)
+        print(f"duplicates report: {len(found)}/{len(planted)} planted pairs, no false positives, "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        library.close()
+
+        # lookup cost as the library grows: posting lists, not a scan
+        queries = [os.path.join(root, f'song{seed:04}.wav') for seed in range(QUERIES)]
+        for size in LIBRARY_SIZES:
+            sized = os.path.join(workdir, f'lib{size}')
+            os.makedirs(sized)
+            for name in tracks:
+                if int(name[4:8]) < size:
+                    os.link(os.path.join(root, name), os.path.join(sized, name))
+            library = Library(os.path.join(workdir, f'lib{size}.sqlite'))
+            index_library(library, sized)
+            hashes = library.db.execute("SELECT COUNT(*) FROM fingerprint_hashes").fetchone()[0]
+            print(f"{size:>4} songs, {hashes:>6} hashes: lookup {query_latency(library, queries) * 1000:.2f} ms")
+            library.close()
+
+        if not can_decode('download.mp3'):
+            print("download check: skipped, downloads are .mp3 and there is no mp3 decoder (ffmpeg)")
+            return
+        statuses = download_check(workdir, library_path, queries[0])
+        assert statuses == (DUPLICATE, DONE), statuses
+        print(f"download check: re-download -> {statuses[0]}, new song -> {statuses[1]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import sys
+import time
+from statistics import median
+from tempfile import mkdtemp
+from threading import Thread
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication
+
+from benchmarks.fixtures import write_wav
+from src.app.audioBackend import create_backend
+from src.app.hotkeys import HotkeyDispatcher
+from src.app.musicPlayback import PlaybackController
+from src.app.seekCoalescer import SeekCoalescer
+from src.utils.metrics import METRICS
+
+
+FLOOD = 10_000
+REPEAT_HZ = 33
+HOLD_SECONDS = 2.0
+
+
+def pump(app, seconds:float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def injector(dispatcher:HotkeyDispatcher, key:str, count:int, interval:float = 0.0) -> Thread:
+    # synthetic key events from a foreign thread, like the keyboard hook's
+    def run():
+        for _ in range(count):
+            dispatcher.inject(key)
+            if interval:
+                time.sleep(interval)
+    thread = Thread(target=run)
+    thread.start()
+    return thread
+
+
+def flood(app) -> dict[str]:
+    # a stuck key: every press must count, handlers run at most once per frame
+    steps = []
+    dispatcher = HotkeyDispatcher()
+    dispatcher.register('volume', steps.append)
+    dispatcher.bind('f24', 'volume', 1)
+    start = time.perf_counter()
+    thread = injector(dispatcher, 'f24', FLOOD)
+    while thread.is_alive() or dispatcher.presses < FLOOD or dispatcher.pending:
+        app.processEvents()
+    elapsed = time.perf_counter() - start
+    assert sum(steps) == FLOOD, sum(steps)
+    return {'presses': dispatcher.presses, 'dispatches': len(steps), 'seconds': elapsed,
+            'p50': median(dispatcher.latencies), 'max': max(dispatcher.latencies)}
+
+
+def held(app, acceleration:float) -> float:
+    # auto-repeat of a held arrow key; returns the seek distance in steps
+    steps = []
+    dispatcher = HotkeyDispatcher(acceleration)
+    dispatcher.register('seek', steps.append, accelerate=True)
+    dispatcher.bind('f23', 'seek', 1)
+    thread = injector(dispatcher, 'f23', int(HOLD_SECONDS * REPEAT_HZ), 1 / REPEAT_HZ)
+    while thread.is_alive():
+        pump(app, 0.01)
+    pump(app, 0.05)
+    return sum(steps)
+
+
+def end_to_end(app, workdir:str) -> dict[str]:
+    # key -> volume/seek applied by the player, through the same path as MainWindow
+    path = write_wav(os.path.join(workdir, 'track.wav'), 30)
+    METRICS.reset()
+    METRICS.enable()
+    controller = PlaybackController(lambda: create_backend('numpy', {'audio_sink': 'null'}))
+    controller.load(path)
+    controller.play()
+    seeker = SeekCoalescer(controller, os.path.join(workdir, 'seek'))
+    volume = [50]
+
+    def change_volume(steps):
+        volume[0] = max(0, min(100, volume[0] + steps * 5))
+        controller.set_volume(volume[0])
+
+    dispatcher = HotkeyDispatcher(0.1)
+    dispatcher.register('volume', change_volume)
+    dispatcher.register('seek', lambda steps: seeker.seek_by(round(steps * 1000)), accelerate=True)
+    dispatcher.bind('f22', 'volume', 1)
+    dispatcher.bind('f21', 'seek', 1)
+    results = {}
+    # seeks additionally wait out the seek coalescer's settle delay
+    for action, key in (('volume', 'f22'), ('seek', 'f21')):
+        METRICS.reset()
+        for _ in range(20):
+            dispatcher.inject(key)
+            pump(app, 0.08)
+        histograms = METRICS.snapshot()['histograms']
+        results[action] = (histograms['hotkey.dispatch'], histograms['hotkey'])
+    seeker.shutdown()
+    METRICS.close()
+    return results
+
+
+def main():
+    app = QCoreApplication.instance() or QCoreApplication([sys.argv[0]])
+    result = flood(app)
+    print(f"flood: {result['presses']} presses -> {result['dispatches']} handler calls in {result['seconds']:.2f}s, "
+          f"press->handler p50 {result['p50']:.2f} ms, max {result['max']:.2f} ms")
+    flat, accelerated = held(app, 0.0), held(app, 0.1)
+    print(f"held {HOLD_SECONDS:.0f}s at {REPEAT_HZ} Hz: {flat:.0f} steps without acceleration, "
+          f"{accelerated:.0f} with 0.1/repeat")
+    workdir = mkdtemp(prefix='bench-hotkeys-')
+    try:
+        for action, (dispatch, applied) in end_to_end(app, workdir).items():
+            print(f"{action:>6}: key->handler p50 {dispatch['p50']:.2f} ms, key->player applied "
+                  f"p50 {applied['p50']:.2f} ms, max {applied['max']:.2f} ms (n={applied['count']})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import sys
+import time
+import threading
+from tempfile import mkdtemp
+
+from src.utils.library import Library
+
+
+SIZES = (1_000, 10_000, 100_000)
+FILES_PER_DIR = 100
+
+
+def make_library(root:str, count:int) -> None:
+    # artist/album/track layout, `FILES_PER_DIR` tracks per album
+    for index in range(count):
+        album = os.path.join(root, f"artist{index // (FILES_PER_DIR * 10):04}",
+                             f"album{index // FILES_PER_DIR:05}")
+        if index % FILES_PER_DIR == 0:
+            os.makedirs(album, exist_ok=True)
+        ext = '.mp3' if index % 4 else '.wav'
+        open(os.path.join(album, f"track{index:06}{ext}"), 'wb').close()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench(count:int) -> dict:
+    workdir = mkdtemp(prefix='bench-library-')
+    try:
+        music = os.path.join(workdir, 'music')
+        make_library(music, count)
+        library = Library(os.path.join(workdir, 'library.sqlite'))
+
+        listdir_time, _ = timed(lambda: [os.path.join(d, f) for d, _, files in os.walk(music)
+                                         for f in files if f.endswith(('.mp3', '.wav'))])
+        cold_time, cold = timed(library.scan, music)
+        warm_time, warm = timed(library.scan, music)
+
+        # one new album lands in the library
+        make_library(os.path.join(music, 'new'), FILES_PER_DIR)
+        delta_time, delta = timed(library.scan, music)
+
+        view = library.tracks(music)
+        page_time, _ = timed(lambda: [view[i] for i in range(0, len(view), max(1, len(view) // 100))])
+        library.close()
+
+        return {
+            'files': count,
+            'os_walk': listdir_time,
+            'cold_scan': cold_time,
+            'warm_scan': warm_time,
+            'warm_skipped_dirs': warm['skipped'],
+            'delta_scan': delta_time,
+            'delta_added': delta['added'],
+            'page_100_lookups': page_time,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def rescan_check(bursts:int = 20) -> None:
+    # folder events arriving while the metadata scan runs start no new thread or pool:
+    # they fold into one more pass once the running one ends
+    from benchmarks import run
+    from benchmarks.fixtures import make_music_folder
+    from src.app.libraryScan import LibraryScanThread
+    from src.app.playerCore import SCANS
+    workdir = mkdtemp(prefix='bench-rescan-')
+    try:
+        music = os.path.join(workdir, 'music')
+        make_music_folder(music, 300, seconds=0.2)
+        app = run.qt_app()
+        window = run.main_window(workdir, music)
+        core, peak = window.core, 0
+        for _ in range(bursts):
+            core.start_scans()
+            peak = max(peak, sum(isinstance(thread, LibraryScanThread) for thread in threading.enumerate()))
+        run.wait_for(app, lambda: not core.scans and not core.rescans, timeout=60)
+        window.close()
+        assert peak <= len(SCANS), peak
+        print(f"{bursts} scan requests during a scan: at most {peak} scan threads alive, all folded into one more pass")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(sizes=SIZES):
+    rescan_check()
+    for count in sizes:
+        r = bench(count)
+        print("{files:>7} files: os.walk {os_walk:.3f}s, cold {cold_scan:.3f}s, "
+              "warm {warm_scan:.3f}s ({warm_skipped_dirs} dirs skipped), "
+              "+{delta_added} files {delta_scan:.3f}s, 100 lookups {page_100_lookups:.4f}s".format(**r))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
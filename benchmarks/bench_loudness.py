@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import time
+import logging
+import tracemalloc
+from struct import pack
+from tempfile import mkdtemp
+
+from benchmarks.bench_peaks import write_long_wav
+from benchmarks.fixtures import write_mp3, write_wav
+from src.app.libraryScan import LoudnessScanThread
+from src.utils.decoders import MISSING_DECODERS
+from src.utils.loudness import analyze, analyze_all, lfilter
+
+
+def batch_check(workdir:str) -> None:
+    # a malformed file in a batch costs only its own gain; an MP3 without ffmpeg is reported
+    broken = os.path.join(workdir, 'broken.wav')
+    with open(broken, 'wb') as f:
+        f.write(b'RIFF' + pack('<I', 32) + b'WAVE' + b'fmt ' + pack('<I', 4) + bytes(4) + b'data' + pack('<I', 4) + bytes(4))
+    paths = [broken] + [write_wav(os.path.join(workdir, f"batch{n}.wav"), 1, amplitude=0.1) for n in range(3)]
+    results = dict(analyze_all(paths, 2))
+    assert results[broken]['loudness'] is None and all(results[path]['gain'] for path in paths[1:]), results
+
+    mp3 = write_mp3(os.path.join(workdir, 'download.mp3'), 1)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logging.getLogger('src.app.libraryScan').addHandler(handler)
+    selected = LoudnessScanThread(None, workdir).select([mp3, paths[1]])
+    logging.getLogger('src.app.libraryScan').removeHandler(handler)
+    if '.mp3' in MISSING_DECODERS:
+        assert selected == [paths[1]] and 'ffmpeg is not installed' in records[0].getMessage(), records
+        print(f"without ffmpeg: {records[0].getMessage()}")
+    else:
+        assert selected == [mp3, paths[1]] and not records, records
+
+
+def main(files:int = 32, long_seconds:int = 600):
+    workdir = mkdtemp(prefix='bench-loudness-')
+    try:
+        print(f"K-weighting: {'scipy lfilter' if lfilter else 'unavailable, unweighted'}")
+        batch_check(workdir)
+        quiet = analyze(write_wav(os.path.join(workdir, 'quiet.wav'), 5, amplitude=0.05))
+        loud = analyze(write_wav(os.path.join(workdir, 'loud.wav'), 5, amplitude=0.8))
+        print(f"quiet {quiet['loudness']:.1f} LUFS -> {quiet['gain']:+.1f} dB, "
+              f"loud {loud['loudness']:.1f} LUFS -> {loud['gain']:+.1f} dB")
+
+        long_path = os.path.join(workdir, 'long.wav')
+        write_long_wav(long_path, long_seconds)
+        tracemalloc.start()
+        start = time.perf_counter()
+        analyze(long_path)
+        elapsed = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{long_seconds}s file ({os.path.getsize(long_path) / 2 ** 20:.0f} MiB): {elapsed:.2f}s, "
+              f"peak Python allocations {peak_memory / 2 ** 20:.1f} MiB")
+
+        paths = [write_wav(os.path.join(workdir, f"t{n}.wav"), 20, amplitude=0.1 + n % 8 / 10)
+                 for n in range(files)]
+        for workers in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            dict(analyze_all(paths, workers))
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>3} workers: {files / elapsed:.1f} tracks/s ({files * 20 / elapsed:,.0f}x realtime)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,68 @@
+import os
+import shutil
+import sys
+import time
+from struct import pack
+from tempfile import mkdtemp
+
+from benchmarks.fixtures import make_music_folder, write_mp3, write_wav, xing_frame
+from src.utils.metadata import extract_all, read_cover, read_metadata
+
+
+FILES = 2_000
+
+
+def riff_check(workdir:str) -> None:
+    # a cue-label list ahead of the INFO list and the data chunk must be stepped over whole
+    path = write_wav(os.path.join(workdir, 'labelled.wav'), 2, rate=8000, channels=1, title='Labelled')
+    with open(path, 'rb') as f:
+        head, rest = f.read(12), f.read()
+    label = b'labl' + pack('<I', 9) + pack('<I', 1) + b'cue\x00\x00' + b'\x00'
+    adtl = b'LIST' + pack('<I', len(label) + 4) + b'adtl' + label
+    with open(path, 'wb') as f:
+        f.write(head[:4] + pack('<I', len(adtl) + len(rest) + 4) + head[8:] + adtl + rest)
+    data = read_metadata(path)
+    assert data['title'] == 'Labelled' and data['duration'] == 2000, data
+
+
+def truncated_check(workdir:str) -> None:
+    # cut-off headers leave fields empty; they never fail the file, or the batch it is scanned in
+    broken = {
+        'short_fmt.wav': b'RIFF' + pack('<I', 16) + b'WAVE' + b'fmt ' + pack('<I', 4) + b'\x01\x00\x01\x00',
+        'short_ext.mp3': b'ID3\x03\x00\x40' + bytes(4) + b'\x00\x00',
+        'short_frame.mp3': b'ID3\x03\x00\x00' + bytes((0, 0, 0, 20)) + b'TIT2\x00\x00',
+        'short_xing.mp3': xing_frame(100)[:40],
+    }
+    paths = [write_mp3(os.path.join(workdir, 'intact.mp3'), 1)]
+    for name, content in broken.items():
+        paths.append(os.path.join(workdir, name))
+        with open(paths[-1], 'wb') as f:
+            f.write(content)
+    for path in paths:
+        read_metadata(path)
+        read_cover(path)
+    results = dict(extract_all(paths, 2, chunksize=1))
+    assert len(results) == len(paths) and results[paths[0]]['title'] == 'intact', results
+
+
+def main(count:int = FILES):
+    workdir = mkdtemp(prefix='bench-metadata-')
+    try:
+        riff_check(workdir)
+        truncated_check(workdir)
+        paths = make_music_folder(workdir, count)
+        sample = read_metadata(paths[1])
+        print(f"sample: {sample}")
+
+        for workers in sorted({1, 4, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            results = dict(extract_all(paths, workers))
+            elapsed = time.perf_counter() - start
+            tagged = sum(1 for data in results.values() if data['title'])
+            print(f"{workers:>3} workers: {count / elapsed:,.0f} files/s ({tagged}/{count} tagged)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
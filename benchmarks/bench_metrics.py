@@ -0,0 +1,87 @@
+import os
+import json
+import shutil
+import time
+from tempfile import mkdtemp
+from urllib.request import urlopen
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication
+
+from benchmarks.fixtures import write_wav
+from src.app.audioBackend import create_backend
+from src.app.musicPlayback import PlaybackController
+from src.utils.metrics import METRICS, Metrics
+
+
+CALLS = 200_000
+SWITCHES = 10
+
+
+def probe_cost(metrics:Metrics) -> dict[str]:
+    # ns per call of each probe as the player code uses them
+    def span():
+        with metrics.span('bench.span'):
+            pass
+
+    def begin_end():
+        metrics.begin('bench.async')
+        metrics.end('bench.async')
+
+    results = {}
+    for name, probe in (('count', lambda: metrics.count('bench.count')), ('span', span),
+                        ('begin/end', begin_end), ('phase', lambda: metrics.phase('bench.async', 'x'))):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            probe()
+        results[name] = (time.perf_counter() - start) / CALLS * 1e9
+    return results
+
+
+def traced_switches(workdir:str) -> tuple[dict, str, int]:
+    app = QCoreApplication.instance() or QCoreApplication([])
+    paths = [write_wav(os.path.join(workdir, f'track{index}.wav'), 1) for index in range(2)]
+    trace_path = os.path.join(workdir, 'trace.jsonl')
+    METRICS.reset()
+    METRICS.enable(trace_path)
+    port = METRICS.serve(0)
+
+    controller = PlaybackController(lambda: create_backend('numpy', {'audio_sink': 'null'}))
+    controller.set_notify_interval(20)
+    for index in range(SWITCHES):
+        METRICS.begin('track_switch', path=paths[index % 2])
+        controller.load(paths[index % 2])
+        controller.play()
+        deadline = time.perf_counter() + 5
+        while METRICS.is_open('track_switch') and time.perf_counter() < deadline:
+            app.processEvents()
+    with urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+        exposition = response.read().decode()
+    snapshot = METRICS.snapshot()
+    METRICS.close()
+    with open(trace_path, 'r') as f:
+        events = sum(1 for line in f if json.loads(line))
+    return snapshot, exposition, events
+
+
+def main():
+    disabled = probe_cost(Metrics())
+    enabled_metrics = Metrics()
+    enabled_metrics.enable()
+    enabled = probe_cost(enabled_metrics)
+    for name in disabled:
+        print(f"{name:>10}: disabled {disabled[name]:6.0f} ns, enabled {enabled[name]:6.0f} ns")
+
+    workdir = mkdtemp(prefix='bench-metrics-')
+    try:
+        snapshot, exposition, events = traced_switches(workdir)
+        for name, summary in sorted(snapshot['histograms'].items()):
+            print(f"{name:>26}: n={summary['count']} p50 {summary['p50']:.2f} ms, max {summary['max']:.2f} ms")
+        print(f"trace: {events} JSONL events, endpoint: {len(exposition.splitlines())} exposition lines")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import os
+import shutil
+import time
+import tracemalloc
+import wave
+from tempfile import mkdtemp
+
+import numpy as np
+
+from benchmarks.fixtures import write_wav
+from src.utils.audioEngine import AudioEngine
+from src.utils.mixer import RAMP_MS, Crossfade, GainRamp, Mixer
+
+
+RATE = 44100
+BLOCKS = 5000
+PERIODS = (256, 512, 1024, 2048)
+
+
+class ManualSink:
+    # the benchmark pulls blocks itself, so every output frame is accounted for
+    frames = 0
+
+    def start(self, sample_rate:int, channels:int, period:int, pull) -> None:
+        self.pull = pull
+
+
+    def stop(self) -> None:
+        pass
+
+
+def write_level(path:str, level:float, seconds:float) -> str:
+    # a constant-valued track: the mix of two of them is the gain curve itself
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(np.full(int(seconds * RATE) * 2, round(level * 32767), dtype='<i2').tobytes())
+    return path
+
+
+def expected_fade(incoming:float, outgoing:float, length:int, count:int, curve:str) -> np.ndarray:
+    progress = np.minimum(np.arange(count) / length, 1)
+    if curve == 'linear':
+        return incoming * progress + outgoing * (1 - progress)
+    return incoming * np.sin(progress * np.pi / 2) + outgoing * np.cos(progress * np.pi / 2)
+
+
+def mixer_check(curve:str, period:int = 512, length:int = 3000) -> None:
+    # block by block, including a fade that ends mid-block
+    mixer, fade = Mixer(period, 2), Crossfade(None, None, length, curve)
+    rendered = []
+    for _ in range(length // period + 2):
+        out, second = np.full((period, 2), 0.5, np.float32), np.full((period, 2), -0.25, np.float32)
+        mixer.crossfade(out, second, fade)
+        rendered.append(out[:, 0].copy())
+    rendered = np.concatenate(rendered)
+    assert np.abs(rendered - expected_fade(0.5, -0.25, length, len(rendered), curve)).max() < 1e-6
+
+
+def engine_check(workdir:str, curve:str) -> int:
+    # A (0.25) playing, B (-0.5) opened with a crossfade: every output frame must be
+    # on the curve, starting exactly at the first block pulled after the switch
+    a = write_level(os.path.join(workdir, 'a.wav'), 0.25, 2)
+    b = write_level(os.path.join(workdir, 'b.wav'), -0.5, 2)
+    period, fade_ms = 512, 100
+    engine = AudioEngine(ManualSink(), 250, period)
+    engine.crossfade_ms, engine.curve = fade_ms, curve
+    engine.open(a)
+    engine.play()
+    block = np.zeros((period, 2), dtype=np.float32)
+    for _ in range(10):
+        engine.pull(block, True)
+    assert np.abs(block - 0.25).max() < 1 / 32768
+    assert engine.open(b, crossfade=True)
+    rendered = []
+    for _ in range(20):
+        engine.pull(block, True)
+        rendered.append(block[:, 0].copy())
+    rendered = np.concatenate(rendered)
+    length = RATE * fade_ms // 1000
+    expected = expected_fade(-0.5, 0.25, length, len(rendered), curve)
+    assert np.abs(rendered - expected).max() < 2 / 32768, np.abs(rendered - expected).max()
+    assert engine.fade is None
+    engine.close()
+    return length
+
+
+def ramp_check(workdir:str) -> float:
+    # a volume change while playing glides over RAMP_MS instead of stepping
+    path = write_level(os.path.join(workdir, 'level.wav'), 0.5, 1)
+    engine = AudioEngine(ManualSink(), 250, 256)
+    engine.open(path)
+    engine.play()
+    block = np.zeros((256, 2), dtype=np.float32)
+    engine.pull(block, True)
+    engine.volume = 0.2
+    rendered = []
+    for _ in range(6):
+        engine.pull(block, True)
+        rendered.append(block[:, 0].copy())
+    rendered = np.concatenate(rendered)
+    frames = RATE * RAMP_MS // 1000
+    expected = 0.5 * np.concatenate([1 - 0.8 * np.arange(1, frames + 1) / frames, np.full(len(rendered) - frames, 0.2)])
+    assert np.abs(rendered - expected).max() < 1e-4
+    engine.close()
+    return float(np.abs(np.diff(rendered)).max())
+
+
+def switch_click(workdir:str, crossfade_ms:int) -> float:
+    # largest sample-to-sample jump across a switch between two tones
+    a = write_wav(os.path.join(workdir, 'tone_a.wav'), 2, frequency=440.0, amplitude=0.8)
+    b = write_wav(os.path.join(workdir, 'tone_b.wav'), 2, frequency=620.0, amplitude=0.8)
+    engine = AudioEngine(ManualSink(), 250, 512)
+    engine.crossfade_ms = crossfade_ms
+    engine.open(a)
+    engine.play()
+    block = np.zeros((512, 2), dtype=np.float32)
+    rendered = []
+    for index in range(60):
+        if index == 30:
+            # a hard switch stops and restarts like MainWindow without a fade
+            if not engine.open(b, crossfade=True):
+                engine.play()
+        engine.pull(block, True)
+        rendered.append(block[:, 0].copy())
+    engine.close()
+    return float(np.abs(np.diff(np.concatenate(rendered)[29 * 512:32 * 512])).max())
+
+
+def mixing_cost(period:int, curve:str) -> tuple[float, float, int]:
+    # us per block for a crossfade and for a ramped volume, and traced bytes
+    mixer, ramp = Mixer(period, 2), GainRamp(period)
+    out, second = np.zeros((period, 2), np.float32), np.zeros((period, 2), np.float32)
+    fade = Crossfade(None, None, period * BLOCKS * 2, curve)
+    mixer.crossfade(out, second, fade)
+    tracemalloc.start()
+    for index in range(100):
+        mixer.crossfade(out, second, fade)
+        ramp.set(index % 2, period * 2)
+        ramp.apply(out)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # views and Python floats only: nothing is kept and nothing scales with the block
+    assert retained < 1024 and peak < 2048, (retained, peak)
+
+    start = time.perf_counter()
+    for _ in range(BLOCKS):
+        mixer.crossfade(out, second, fade)
+    fading = (time.perf_counter() - start) / BLOCKS * 1e6
+    start = time.perf_counter()
+    for index in range(BLOCKS):
+        if not index % 8:
+            ramp.set(index % 16 / 16, period * 4)
+        ramp.apply(out)
+    ramping = (time.perf_counter() - start) / BLOCKS * 1e6
+    return fading, ramping, peak
+
+
+def main():
+    workdir = mkdtemp(prefix='bench-mixer-')
+    try:
+        for curve in ('linear', 'equal_power'):
+            mixer_check(curve)
+            length = engine_check(workdir, curve)
+            print(f"{curve:>11}: {length}-frame crossfade through the engine matches the curve sample for sample")
+        print(f"volume 1.0 -> 0.2 while playing: ramped over {RAMP_MS} ms, largest step {ramp_check(workdir):.4f}")
+        hard, faded = switch_click(workdir, 0), switch_click(workdir, 50)
+        print(f"track switch, largest sample jump: hard {hard:.3f}, 50 ms crossfade {faded:.3f}")
+        for period in PERIODS:
+            for curve in ('linear', 'equal_power'):
+                fading, ramping, peak = mixing_cost(period, curve)
+                budget = period / RATE * 1e6
+                print(f"period {period:>4} {curve:>11}: crossfade {fading:5.1f} us/block, ramp {ramping:5.1f} us/block "
+                      f"({(fading + ramping) / budget * 100:.2f}% of the {budget / 1000:.1f} ms block), "
+                      f"{peak} B traced over 100 blocks")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
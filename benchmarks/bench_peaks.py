@@ -0,0 +1,148 @@
+import os
+import shutil
+import sys
+import time
+import wave
+from tempfile import mkdtemp
+
+import numpy as np
+
+from src.utils.metadata import file_key
+from src.utils.peaks import PeakCache
+
+
+SECONDS = 3600
+RATE = 44100
+CHANNELS = 2
+WIDTHS = (280, 1920)
+CAPPED_TRACKS = 4
+
+
+def write_long_wav(path:str, seconds:int = SECONDS, rate:int = RATE, channels:int = CHANNELS) -> None:
+    # chirp with a slow envelope, written minute by minute
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        t = np.arange(60 * rate) / rate
+        for minute in range(-(-seconds // 60)):
+            envelope = 0.5 + 0.4 * np.sin(2 * np.pi * (t + minute * 60) / 90)
+            samples = (envelope * np.sin(2 * np.pi * (220 + minute) * t) * 32767 * 0.8).astype('<i2')
+            frames = min(60, seconds - minute * 60) * rate
+            w.writeframes(np.repeat(samples[:frames, None], channels, axis=1).tobytes())
+
+
+def bar_check(workdir:str, peaks) -> None:
+    # clicks and drags seek to the point under the cursor, the wheel zooms around it
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QPoint, QPointF, Qt
+    from PyQt5.QtGui import QWheelEvent
+    from PyQt5.QtTest import QTest
+    from PyQt5.QtWidgets import QApplication
+    from src.app.waveformBar import WaveformBar
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    bar = WaveformBar(os.path.join(workdir, 'bar'))
+    bar.resize(WIDTHS[0], 20)
+    bar.setRange(0, peaks.duration())
+    bar.set_peaks(None, peaks)
+    bar.show()
+    seeks = []
+    bar.seekRequested.connect(seeks.append)
+    duration = peaks.duration()
+
+    QTest.mouseClick(bar, Qt.LeftButton, pos=QPoint(WIDTHS[0] // 4, 10))
+    assert seeks == [duration // 4], (seeks, duration)
+
+    def wheel(x, delta):
+        point = QPointF(x, 10)
+        app.sendEvent(bar, QWheelEvent(point, QPointF(bar.mapToGlobal(point.toPoint())), QPoint(), QPoint(0, delta),
+                                       Qt.NoButton, Qt.NoModifier, Qt.NoScrollPhase, False))
+
+    for _ in range(3):
+        wheel(WIDTHS[0] // 2, 120)
+    start, end = bar.zoom
+    assert end - start == duration // 8 and start <= duration // 2 <= end, bar.zoom
+    seeks.clear()
+    QTest.mouseClick(bar, Qt.LeftButton, pos=QPoint(0, 10))
+    assert seeks == [start], (seeks, bar.zoom)
+    bar.repaint()
+    for _ in range(3):
+        wheel(WIDTHS[0] // 2, -120)
+    assert bar.zoom is None, bar.zoom
+    print(f"bar: click seeks under the cursor, 3 wheel steps show {(end - start) / 1000:.0f}s of "
+          f"{duration / 1000:.0f}s, 3 back the whole track")
+    bar.shutdown()
+
+
+def eviction_check(workdir:str) -> None:
+    # a cap of two and a half tracks: a third track drops the least recently loaded one
+    paths = []
+    for i in range(CAPPED_TRACKS):
+        paths.append(os.path.join(workdir, f'capped{i}.wav'))
+        write_long_wav(paths[-1], 20 + i)
+    sample = PeakCache(os.path.join(workdir, 'sample'))
+    sample.compute(paths[-1])
+    cache = PeakCache(os.path.join(workdir, 'capped'), max_bytes=sample.size() * 5 // 2)
+    keys = [file_key(path) for path in paths]
+
+    def kept(directory):
+        return sorted(name for name in os.listdir(directory) if name.endswith('.npy'))
+
+    for i in (0, 1, 0, 2):
+        cache.load(paths[i])
+        time.sleep(0.01)
+    # the second track went with its .json, the first survived because it was shown again
+    assert kept(cache.directory) == sorted(keys[i] + '.npy' for i in (0, 2))
+    assert not os.path.exists(cache.paths(keys[1])[1]) and cache.size() <= cache.max_bytes
+    # a fresh cache picks the same order up from the file times
+    reopened = PeakCache(cache.directory, max_bytes=cache.max_bytes)
+    reopened.load(paths[3])
+    assert kept(cache.directory) == sorted(keys[i] + '.npy' for i in (2, 3))
+    print(f"cache: {CAPPED_TRACKS} tracks under a {cache.max_bytes // 1024} KB cap -> 2 kept, "
+          f"least recently loaded evicted")
+
+
+def main(seconds:int = SECONDS):
+    workdir = mkdtemp(prefix='bench-peaks-')
+    try:
+        path = os.path.join(workdir, 'long.wav')
+        write_long_wav(path, seconds)
+        cache = PeakCache(os.path.join(workdir, 'peaks'))
+        size_mb = os.path.getsize(path) / 2 ** 20
+
+        start = time.perf_counter()
+        key = file_key(path)
+        key_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        peaks = cache.compute(path, key)
+        compute_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        peaks = cache.get(path)
+        load_time = time.perf_counter() - start
+
+        print(f"{seconds}s WAV ({size_mb:.0f} MiB): key {key_time * 1000:.1f} ms, "
+              f"extract {compute_time:.2f}s ({seconds / compute_time:,.0f}x realtime), "
+              f"cached load {load_time * 1000:.2f} ms, {len(peaks.levels)} levels")
+
+        bar_check(workdir, peaks)
+        eviction_check(workdir)
+
+        duration = peaks.duration()
+        for width in WIDTHS:
+            for span in (duration, duration // 60, 10_000, 1_000):
+                rounds = 200
+                start = time.perf_counter()
+                for n in range(rounds):
+                    offset = (n * 7919) % max(1, duration - span)
+                    peaks.window(offset, offset + span, width)
+                elapsed = (time.perf_counter() - start) / rounds
+                print(f"  render {width:>4}px over {span / 1000:>7.1f}s: {elapsed * 1e6:7.1f} us")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
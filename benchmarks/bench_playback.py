@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication, QObject, pyqtSignal
+
+from src.app.audioBackend import NO_MEDIA, LOADED_MEDIA, STOPPED, PLAYING, PAUSED
+from src.app.musicPlayback import PlaybackController
+
+
+SKIPS = 5_000
+SKIP_THREADS = 4
+
+
+class FakePlayer(QObject):
+    # the QMediaPlayer surface PlaybackController relies on, without a media backend
+    mediaStatusChanged = pyqtSignal(int)
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    loads = 0
+
+
+    def __init__(self):
+        super().__init__()
+        self.path = None
+        self.state = STOPPED
+        self.__position = 0
+        self.__volume = 100
+
+
+    def open(self, path):
+        FakePlayer.loads += 1
+        self.path = path
+        self.mediaStatusChanged.emit(LOADED_MEDIA)
+
+
+    def mediaStatus(self):
+        return LOADED_MEDIA if self.path else NO_MEDIA
+
+
+    def crossfades(self):
+        return False
+
+
+    def play(self):
+        self.state = PLAYING
+
+
+    def pause(self):
+        self.state = PAUSED
+
+
+    def stop(self):
+        self.state = STOPPED
+
+
+    def setPosition(self, position):
+        self.__position = position
+
+
+    def position(self):
+        return self.__position
+
+
+    def duration(self):
+        return 0
+
+
+    def setVolume(self, volume):
+        self.__volume = volume
+
+
+    def volume(self):
+        return self.__volume
+
+
+def skip_storm(skips:int = SKIPS, threads:int = SKIP_THREADS) -> dict:
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    controller = PlaybackController(FakePlayer)
+    baseline_threads = threading.active_count()
+    order, order_lock = [], threading.Lock()
+
+    def skipper(worker):
+        for index in range(skips // threads):
+            path = os.path.abspath(f"track-{worker}-{index}.mp3")
+            with order_lock:
+                order.append(path)
+                controller.load(path)
+                controller.play()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=skipper, args=(n,)) for n in range(threads)]
+    peak_threads = threading.active_count()
+    for worker in workers:
+        worker.start()
+        peak_threads = max(peak_threads, threading.active_count())
+        app.processEvents()
+    while any(worker.is_alive() for worker in workers) or controller.pending():
+        app.processEvents()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+
+    player = controller.media_player
+    assert controller.pending() == 0
+    assert player.path == order[-1], (player.path, order[-1])
+    assert player.state == PLAYING
+    assert threading.active_count() == baseline_threads
+
+    return {
+        'skips': controller.submitted // 2,
+        'open_calls': FakePlayer.loads,
+        'commands_executed': controller.executed,
+        'seconds': elapsed,
+        'extra_threads_peak': peak_threads - baseline_threads,
+    }
+
+
+def main():
+    result = skip_storm()
+    print("{skips} skips in {seconds:.3f}s -> {open_calls} open calls, "
+          "{commands_executed} commands executed, peak extra threads {extra_threads_peak}".format(**result))
+
+
+if __name__ == "__main__":
+    main()
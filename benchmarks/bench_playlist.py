@@ -0,0 +1,98 @@
+import os
+import shutil
+import time
+import tracemalloc
+from tempfile import mkdtemp
+
+from src.utils.library import Library
+from src.utils.playlist import Permutation, Playlist, PlaylistStore, PlaylistView, read_m3u
+
+
+ENTRIES = 100_000
+STEPS = 200_000
+
+
+def write_big_m3u(path:str, count:int = ENTRIES) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U\n')
+        for index in range(count):
+            f.write(f'#EXTINF:{180 + index % 120},Artist {index % 997} - Track {index}\n')
+            f.write(f'music/artist{index % 997:03}/track{index:06}.mp3\n')
+
+
+def check_permutations() -> None:
+    for size in (1, 2, 3, 10, 1000, 4097, 65_536):
+        permutation = Permutation(size, seed=size)
+        values = [permutation[i] for i in range(size)]
+        assert sorted(values) == list(range(size)), size
+        assert all(permutation.index(value) == i for i, value in enumerate(values)), size
+    assert list(Permutation(1000, 7)) == list(Permutation(1000, 7))
+    assert list(Permutation(1000, 7)) != list(Permutation(1000, 8))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    check_permutations()
+    workdir = mkdtemp(prefix='bench-playlist-')
+    try:
+        m3u = os.path.join(workdir, 'big.m3u8')
+        write_big_m3u(m3u)
+        library = Library(os.path.join(workdir, 'library.sqlite'))
+        store = PlaylistStore(library)
+
+        tracemalloc.start()
+        import_time, name = timed(store.import_m3u, m3u)
+        _, import_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert sum(1 for _ in read_m3u(m3u)) == ENTRIES
+
+        tracemalloc.start()
+        playlist = store.open(name)
+        playlist.set_shuffle(True, seed=42)
+        start = time.perf_counter()
+        seen = set()
+        for _ in range(STEPS):
+            seen.add(playlist.next())
+        next_time = time.perf_counter() - start
+        for _ in range(1000):
+            playlist.prev()
+        _, walk_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(seen) == ENTRIES
+
+        start = time.perf_counter()
+        for index in range(STEPS):
+            playlist.enqueue(index % ENTRIES)
+        enqueue_time = time.perf_counter() - start
+
+        # the saved position and shuffle come back after a restart
+        playlist.queue.clear()
+        expected = playlist.current()
+        store.save(playlist)
+        restore_time, restored = timed(store.open, name)
+        assert restored.current() == expected and restored.shuffle and restored.seed == 42
+        assert restored.peek_next() == playlist.peek_next()
+
+        export_path = os.path.join(workdir, 'out.m3u8')
+        tracemalloc.start()
+        export_time, count = timed(store.export_m3u, PlaylistView(library, name), export_path)
+        _, export_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert count == ENTRIES and list(read_m3u(export_path))[:3] == PlaylistView(library, name)[:3]
+
+        print(f"{ENTRIES:,}-entry M3U: import {import_time:.2f}s (peak {import_peak / 2 ** 20:.1f} MiB), "
+              f"export {export_time:.2f}s (peak {export_peak / 2 ** 20:.1f} MiB), restore {restore_time * 1000:.1f} ms")
+        print(f"shuffled next {next_time / STEPS * 1e6:.2f} us/step (walk peak {walk_peak / 2 ** 20:.2f} MiB), "
+              f"enqueue {enqueue_time / STEPS * 1e6:.2f} us")
+        library.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import random
+import shutil
+import time
+from bisect import bisect_right
+from tempfile import mkdtemp
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from benchmarks.fixtures import MPEG1_L3_BITRATES, id3v2_tag, mp3_frame, mp3_frames, xing_frame
+from src.app.seekCoalescer import SeekCoalescer
+from src.utils.metadata import file_key, parse_frame_header
+from src.utils.seekIndex import SeekIndexCache, build_index
+
+
+SECONDS = 1800
+LOOKUPS = 100_000
+BURST = 60
+SECTION_FRAMES = 400
+CAPPED_TRACKS = 4
+
+
+def vbr_frames(seconds:float) -> bytes:
+    # bitrate drifts section by section like real VBR (quiet intro, dense chorus, ...)
+    count, rng = int(seconds * 44100 / 1152), random.Random(3)
+    sections = [rng.choice(MPEG1_L3_BITRATES) for _ in range(-(-count // SECTION_FRAMES))]
+    return b''.join(mp3_frame(sections[i // SECTION_FRAMES]) for i in range(count))
+
+
+def write_fixture(path:str, vbr:bool) -> list[tuple[int, int]]:
+    # returns the ground truth (byte offset, first sample) of every frame
+    audio = vbr_frames(SECONDS) if vbr else mp3_frames(SECONDS)
+    # encoders put an info frame first; it carries no audio and must not be indexed
+    info = xing_frame(int(SECONDS * 44100 / 1152), b'Xing' if vbr else b'Info')
+    tag = id3v2_tag('Seek', 'Artist', 'Album') + info
+    with open(path, 'wb') as f:
+        f.write(tag + audio)
+    truth, position, samples = [], 0, 0
+    while position < len(audio):
+        frame = parse_frame_header(audio[position:position + 4])
+        truth.append((len(tag) + position, samples))
+        samples += frame['samples']
+        position += frame['length']
+    return truth
+
+
+def accuracy(index, truth, path:str) -> tuple[int, int]:
+    # worst distance in ms between the frame each method lands on and the frame
+    # that really contains the target: seek index vs. a constant-bitrate guess
+    first = truth[0][0]
+    rate = (os.path.getsize(path) - first) / index.duration()
+    offsets = [offset for offset, _ in truth]
+    starts = [sample for _, sample in truth]
+    worst_index = worst_naive = 0
+    rng = random.Random(7)
+    for _ in range(2000):
+        target = rng.randrange(index.duration())
+        expected = starts[bisect_right(starts, target * index.sample_rate // 1000) - 1]
+        byte, _ = index.time_to_byte(target)
+        worst_index = max(worst_index, abs(starts[offsets.index(byte)] - expected))
+        guess = max(0, bisect_right(offsets, first + int(target * rate)) - 1)
+        worst_naive = max(worst_naive, abs(starts[guess] - expected))
+    return worst_index * 1000 // index.sample_rate, worst_naive * 1000 // index.sample_rate
+
+
+class FakePlayback:
+    def __init__(self):
+        self.seeks = []
+        self.index = None
+
+
+    def position(self):
+        return 60_000
+
+
+    def duration(self):
+        return SECONDS * 1000
+
+
+    def seek(self, position):
+        self.seeks.append(position)
+
+
+    def set_seek_index(self, path, index):
+        self.index = index
+
+
+def coalescing(app, cache_dir:str, path:str) -> dict[str]:
+    playback = FakePlayback()
+    seeker = SeekCoalescer(playback, cache_dir)
+    seeker.set_track(path)
+    loop = QEventLoop()
+    seeker.indexReady.connect(lambda *args: QTimer.singleShot(0, loop.quit))
+    loop.exec_()
+
+    start = time.perf_counter()
+    for _ in range(BURST):
+        seeker.seek_by(5_000)
+    while not playback.seeks:
+        app.processEvents(QEventLoop.WaitForMoreEvents, 10)
+    latency = time.perf_counter() - start
+    seeker.shutdown()
+    assert seeker.requests == BURST and len(playback.seeks) == 1
+    assert playback.index is seeker.index
+    return {'requests': seeker.requests, 'seeks': len(playback.seeks), 'target': playback.seeks[0],
+            'latency_ms': latency * 1000}
+
+
+def eviction(cache_dir:str, workdir:str) -> dict[str]:
+    # a cap of two and a half indexes: playing a third track drops the least recently loaded one
+    paths = []
+    for i in range(CAPPED_TRACKS):
+        paths.append(os.path.join(workdir, f'capped{i}.mp3'))
+        with open(paths[-1], 'wb') as f:
+            f.write(mp3_frames(60 + i))
+    sample = os.path.join(workdir, 'sample.sidx')
+    build_index(paths[-1]).dump(sample)
+    cache = SeekIndexCache(cache_dir, max_bytes=os.path.getsize(sample) * 5 // 2)
+    names = [file_key(path) + '.sidx' for path in paths]
+    for i in (0, 1, 0, 2):
+        cache.load(paths[i])
+        time.sleep(0.01)
+    # the second track went, the first survived because it was played again
+    assert sorted(os.listdir(cache_dir)) == sorted(names[i] for i in (0, 2))
+    assert cache.size() <= cache.max_bytes
+    # a fresh cache picks the same order up from the file times
+    reopened = SeekIndexCache(cache_dir, max_bytes=cache.max_bytes)
+    reopened.load(paths[3])
+    assert sorted(os.listdir(cache_dir)) == sorted(names[i] for i in (2, 3))
+    return {'tracks': CAPPED_TRACKS, 'kept': len(os.listdir(cache_dir)), 'cap_kb': cache.max_bytes // 1024}
+
+
+def main():
+    app = QCoreApplication([])
+    workdir = mkdtemp(prefix='bench-seek-')
+    try:
+        for name, vbr in (('cbr', False), ('vbr', True)):
+            path = os.path.join(workdir, f'{name}.mp3')
+            truth = write_fixture(path, vbr)
+            cache = SeekIndexCache(os.path.join(workdir, 'seek'))
+
+            start = time.perf_counter()
+            index = build_index(path)
+            build_time = time.perf_counter() - start
+            assert [offset for offset, _ in truth] == list(index.offsets)
+
+            cache.load(path)
+            start = time.perf_counter()
+            cache.load(path)
+            load_time = time.perf_counter() - start
+
+            targets = [random.randrange(index.duration()) for _ in range(LOOKUPS)]
+            start = time.perf_counter()
+            for target in targets:
+                index.time_to_byte(target)
+            lookup_time = time.perf_counter() - start
+
+            worst_index, worst_naive = accuracy(index, truth, path)
+            print(f"{name.upper()} {SECONDS}s, {len(index):,} frames: build {build_time * 1000:.0f} ms, "
+                  f"cached load {load_time * 1000:.2f} ms, lookup {lookup_time / LOOKUPS * 1e6:.2f} us, "
+                  f"worst error index {worst_index} ms vs bitrate estimate {worst_naive} ms")
+
+        result = coalescing(app, os.path.join(workdir, 'seek'), os.path.join(workdir, 'vbr.mp3'))
+        print("{requests} held-key seeks -> {seeks} seek to {target} ms after {latency_ms:.1f} ms".format(**result))
+        result = eviction(os.path.join(workdir, 'capped'), workdir)
+        print("{tracks} tracks under a {cap_kb} KB cap -> {kept} indexes kept".format(**result))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
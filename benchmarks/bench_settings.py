@@ -0,0 +1,46 @@
+import os
+import shutil
+import time
+from tempfile import mkdtemp
+
+from src.utils.parse import Settings
+
+
+CONFIG_PATH = os.path.join('config', 'settings.toml')
+STORM_EVENTS = 500
+
+
+def hotkey_storm(write_behind:bool, events:int = STORM_EVENTS) -> dict:
+    # auto-repeat on the volume hotkey: one Settings.set per key event
+    workdir = mkdtemp(prefix='bench-settings-')
+    try:
+        path = shutil.copy(CONFIG_PATH, workdir)
+        settings = Settings(path, write_behind=write_behind, delay=0.05)
+
+        start = time.perf_counter()
+        for event in range(events):
+            settings.set('current_volume', event % 100)
+        elapsed = time.perf_counter() - start
+        settings.close()
+
+        return {
+            'mode': 'write-behind' if write_behind else 'sync',
+            'events': events,
+            'seconds': elapsed,
+            'sets_per_sec': events / elapsed if elapsed else float('inf'),
+            'writes': settings.writes,
+            'fsyncs': settings.fsyncs,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    for write_behind in (False, True):
+        result = hotkey_storm(write_behind)
+        print("{mode:>12}: {events} events, {sets_per_sec:,.0f} sets/s, "
+              "{writes} writes, {fsyncs} fsyncs".format(**result))
+
+
+if __name__ == "__main__":
+    main()
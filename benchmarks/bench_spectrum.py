@@ -0,0 +1,133 @@
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+from tempfile import mkdtemp
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+from benchmarks.fixtures import write_song
+from src.app.audioBackend import create_backend
+from src.app.musicPlayback import PlaybackController
+from src.app.spectrumView import SpectrumView
+from src.utils.spectrum import RESOLUTIONS, SampleTap, SpectrumAnalyzer
+
+
+SECONDS = 5
+FRAMES = 2000
+
+
+def feed(tap:SampleTap, samples:np.ndarray, rate:int = 44100, period:int = 1024) -> None:
+    for start in range(0, len(samples) - period + 1, period):
+        tap.write(samples[start:start + period], rate)
+
+
+def tone_check() -> float:
+    # a 1 kHz sine at -6 dBFS lands in the band holding 1 kHz, at about 0.9
+    rate = 44100
+    t = np.arange(rate) / rate
+    tap, analyzer = SampleTap(), SpectrumAnalyzer()
+    feed(tap, np.repeat((0.5 * np.sin(2 * np.pi * 1000 * t))[:, None], 2, axis=1).astype(np.float32))
+    analyzer.update(tap)
+    loudest = int(np.argmax(analyzer.levels))
+    bin_hz = rate / analyzer.factor / RESOLUTIONS[0][0]
+    low = analyzer.starts[loudest] * bin_hz
+    high = analyzer.starts[loudest + 1] * bin_hz if loudest + 1 < len(analyzer.starts) else rate / 2
+    assert low <= 1000 < high, (low, high)
+    assert abs(analyzer.levels[loudest] - 0.9) < 0.05, analyzer.levels[loudest]
+    return float(analyzer.levels[loudest])
+
+
+def hot_loop() -> list[tuple[int, int, float, int]]:
+    # per resolution: (fft size, bars, us per frame, peak bytes traced over 100 frames)
+    rng = np.random.default_rng(1)
+    block = (rng.standard_normal((1024, 2)) * 0.1).astype(np.float32)
+    results = []
+    for level, (size, _) in enumerate(RESOLUTIONS):
+        tap, analyzer = SampleTap(), SpectrumAnalyzer(level)
+        for _ in range(16):
+            tap.write(block, 44100)
+        analyzer.update(tap)
+        tap.write(block, 44100)
+        analyzer.update(tap)
+
+        tracemalloc.start()
+        for _ in range(100):
+            tap.write(block, 44100)
+            analyzer.update(tap)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # only Python-level scratch (views, floats); no buffers proportional to the FFT
+        assert peak < 4096, peak
+
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            tap.write_index += 1
+            analyzer.update(tap)
+        cost = (time.perf_counter() - start) / FRAMES * 1e6
+        results.append((size, len(analyzer.levels), cost, peak))
+    return results
+
+
+def playing(app, path:str, fps:int, stall:int = 0) -> dict[str]:
+    # the window's path: numpy engine -> tap -> analyzer -> repaint, real-time sink
+    controller = PlaybackController(lambda: create_backend('numpy', {'audio_sink': 'null'}))
+    view = SpectrumView(fps)
+    view.resize(280, 16)
+    view.show()
+    controller.load(path)
+    controller.play()
+    app.processEvents()
+    if fps:
+        view.attach(controller)
+    # other work on the GUI thread (a rescan, a big repaint) blocking it for `stall` ms
+    load = QTimer()
+    load.timeout.connect(lambda: time.sleep(stall / 1000))
+    if stall:
+        load.start(100)
+    levels = []
+    wall, cpu = time.perf_counter(), time.process_time()
+    while time.perf_counter() - wall < SECONDS:
+        app.processEvents()
+        levels.append(view.level())
+        time.sleep(0.001)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    load.stop()
+    view.detach()
+    controller.stop()
+    app.processEvents()
+    return {'cpu': cpu / wall * 100, 'frames': view.frames / wall, 'level': view.level(),
+            'worst': max(levels), 'cost': view.budget.cost if view.budget else 0.0}
+
+
+def main():
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    print(f"1 kHz at -6 dBFS -> loudest bar {tone_check():.2f}")
+    for size, bars, cost, allocated in hot_loop():
+        print(f"fft {size:>4}, {bars:>2} bars: {cost:6.1f} us/frame, {allocated} B peak allocation per 100 frames")
+
+    workdir = mkdtemp(prefix='bench-spectrum-')
+    try:
+        path = write_song(os.path.join(workdir, 'song.wav'), 7, seconds=SECONDS + 2)
+        baseline = playing(app, path, 0)
+        print(f"playback alone: {baseline['cpu']:.1f}% CPU")
+        for fps in (30, 60):
+            r = playing(app, path, fps)
+            print(f"{fps} fps: {r['frames']:.1f} frames/s, +{r['cpu'] - baseline['cpu']:.1f}% CPU over playback, "
+                  f"{r['cost']:.2f} ms/frame, resolution {RESOLUTIONS[r['level']]}")
+        for fps in (30, 60):
+            r = playing(app, path, fps, stall=40)
+            assert r['worst'] > 0, r
+            print(f"{fps} fps, GUI thread stalled 40 ms every 100 ms: {r['frames']:.1f} frames/s, "
+                  f"dropped to {RESOLUTIONS[r['worst']]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+from statistics import median
+from tempfile import mkdtemp
+
+from src.utils.parse import Settings
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, 'config', 'settings.toml')
+# shared with run.py, under the startup_* keys
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baselines', 'suite.json')
+# the NumPy engine the window is timed with needs numpy from the start
+LAZY_MODULES = ('pytube', 'src.app.settingsWindow', 'src.app.downloaderWindow', 'src.utils.downloader')
+
+# runs in a fresh interpreter so import costs are real, on a private copy of the
+# shipped config playing into a null sink, so no sound server is needed
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+root, config, lazy = sys.argv[1], sys.argv[2], sys.argv[3].split(',')
+sys.path.insert(0, root)
+import main
+from src.app import mainWindow
+imported = time.perf_counter()
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from src.utils.parse import Settings
+app, player = main.create_player([sys.argv[0]], Settings(config, write_behind=True))
+constructed = time.perf_counter()
+result = {'imports': imported - start, 'construct': constructed - start}
+
+class FirstFrame(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and 'first_frame' not in result:
+            result['first_frame'] = time.perf_counter() - start
+            QTimer.singleShot(0, app.quit)
+        return False
+
+watcher = FirstFrame()
+player.installEventFilter(watcher)
+player.show()
+QTimer.singleShot(5000, app.quit)
+app.exec_()
+result['loaded_lazy_modules'] = [m for m in lazy if m in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def run_once() -> dict:
+    workdir = mkdtemp(prefix='bench-startup-')
+    try:
+        config = shutil.copy(CONFIG_PATH, workdir)
+        settings = Settings(config)
+        with settings.transaction():
+            settings.set('audio_backend', 'numpy')
+            settings.set('audio_sink', 'null')
+        settings.close()
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+        child = subprocess.run([sys.executable, '-c', CHILD, ROOT, config, ','.join(LAZY_MODULES)], cwd=ROOT,
+                               env=env, capture_output=True, text=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if child.returncode:
+        raise RuntimeError(f"startup child failed:\n{child.stderr}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def measure(runs:int = 5) -> dict:
+    samples = [run_once() for _ in range(runs)]
+    result = {key: median(sample[key] for sample in samples)
+              for key in ('imports', 'construct', 'first_frame') if all(key in s for s in samples)}
+    result['loaded_lazy_modules'] = sorted({m for s in samples for m in s['loaded_lazy_modules']})
+    return result
+
+
+def metrics(result:dict) -> dict[str]:
+    return {f'startup_{key}_ms': value * 1000 for key, value in result.items() if key != 'loaded_lazy_modules'}
+
+
+def compare(result:dict, baseline:dict, tolerance:float) -> list[str]:
+    failures = [f"{module} imported during startup" for module in result['loaded_lazy_modules']]
+    for key, value in metrics(result).items():
+        if key not in baseline:
+            failures.append(f"{key}: not in the baseline, run with --update-baseline")
+        elif value > baseline[key] * (1 + tolerance):
+            failures.append(f"{key}: {value:.1f} ms > baseline {baseline[key]:.1f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless startup timing')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    print(json.dumps(result, indent=1))
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r') as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        baseline.update(metrics(result))
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        return 0
+
+    if not any(key.startswith('startup_') for key in baseline):
+        print(f"no startup baseline in {BASELINE_PATH}, run with --update-baseline to create one", file=sys.stderr)
+        return 1
+    failures = compare(result, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import os
+import shutil
+import sys
+import time
+from tempfile import mkdtemp
+from threading import Thread
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication
+
+from benchmarks.fixtures import make_music_folder
+from src.app.playerCore import PlayerCore
+from src.utils.parse import Settings
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'settings.toml')
+INITIAL = 200
+DROPPED = 5000
+DELETED = 1000
+NESTED = 500
+
+
+class TimedCore(PlayerCore):
+    # the player's own handling of watcher events, timing what runs on the GUI thread
+    batches = 0
+    gui_time = 0.0
+
+
+    def folder_changed(self, paths, renames):
+        start = time.perf_counter()
+        super().folder_changed(paths, renames)
+        self.gui_time += time.perf_counter() - start
+
+
+    def library_updated(self, folder, renames, stats):
+        start = time.perf_counter()
+        super().library_updated(folder, renames, stats)
+        self.batches += 1
+        self.gui_time += time.perf_counter() - start
+
+
+class WatchedFolder:
+    # a headless player on a private config, watching `root`
+    def __init__(self, workdir:str, root:str, polling:bool = False):
+        config = os.path.join(workdir, 'config-polling' if polling else 'config-inotify')
+        os.makedirs(config)
+        self.settings = Settings(shutil.copy(CONFIG_PATH, config), write_behind=True)
+        with self.settings.transaction():
+            for key, value in (('path_to_music', root), ('playlist', ''), ('normalize_volume', False),
+                               ('audio_backend', 'numpy'), ('audio_sink', 'null')):
+                self.settings.set(key, value)
+        self.core = TimedCore(self.settings, autoplay=False)
+        self.core.set_music()
+        self.core.playlist.jump(INITIAL // 2)
+        self.watcher = self.core.folder_watcher
+        if polling:
+            self.watcher.poll_interval = 500
+            self.watcher.use_polling()
+        self.view, self.playlist, self.library = self.core.music_files, self.core.playlist, self.core.library
+
+
+    def close(self):
+        self.core.close()
+        self.settings.close()
+
+
+def wait_until(app, predicate, timeout:float = 30) -> float:
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError('changes never became visible')
+        app.processEvents()
+        time.sleep(0.001)
+    return time.perf_counter()
+
+
+def run(workdir:str, polling:bool) -> dict[str]:
+    app = QCoreApplication.instance() or QCoreApplication([sys.argv[0]])
+    root = os.path.join(workdir, 'polling' if polling else 'inotify')
+    make_music_folder(root, INITIAL, seconds=0.05)
+    folder = WatchedFolder(workdir, root, polling)
+    library = folder.library
+    current = folder.playlist.current()
+    results = {'mode': folder.watcher.mode}
+
+    # a burst of small files from another thread, as a large copy would produce
+    def copy():
+        payload = bytes(4096)
+        for index in range(DROPPED):
+            with open(os.path.join(root, f'dropped{index:05}.mp3'), 'wb') as f:
+                f.write(payload)
+        results['written'] = time.perf_counter()
+    writer = Thread(target=copy)
+    writer.start()
+    visible = wait_until(app, lambda: len(folder.view) == INITIAL + DROPPED)
+    writer.join()
+    results['drop_ms'] = (visible - results.pop('written')) * 1000
+    results['drop_batches'] = folder.core.batches
+    assert folder.playlist.current() == current
+
+    # the playing file is renamed: with inotify the playlist follows it, polling
+    # only sees one file go and another appear
+    renamed = 'renamed_' + os.path.basename(current)
+    os.rename(os.path.join(root, current), os.path.join(root, renamed))
+    start = time.perf_counter()
+    if polling:
+        def listed():
+            rank = library.rank(root, os.path.join(root, renamed))
+            return rank is not None and folder.view[rank] == renamed
+        visible = wait_until(app, listed)
+    else:
+        visible = wait_until(app, lambda: folder.playlist.current() == renamed)
+    results['rename_ms'] = (visible - start) * 1000
+
+    for index in range(DELETED):
+        os.remove(os.path.join(root, f'dropped{index:05}.mp3'))
+    start = time.perf_counter()
+    visible = wait_until(app, lambda: len(folder.view) == INITIAL + DROPPED - DELETED)
+    results['delete_ms'] = (visible - start) * 1000
+
+    # a whole album moved in from outside the folder
+    album = os.path.join(workdir, f'album-{polling}')
+    make_music_folder(album, NESTED, seconds=0.05)
+    os.rename(album, os.path.join(root, 'album'))
+    start = time.perf_counter()
+    visible = wait_until(app, lambda: len(folder.view) == INITIAL + DROPPED - DELETED + NESTED)
+    results['move_in_ms'] = (visible - start) * 1000
+    assert polling or folder.playlist.current() == renamed
+
+    results['batches'] = folder.core.batches
+    results['apply_ms'] = folder.core.gui_time * 1000
+    folder.close()
+    return results
+
+
+def main():
+    workdir = mkdtemp(prefix='bench-watcher-')
+    try:
+        for polling in (False, True):
+            r = run(workdir, polling)
+            print(f"{r['mode']:>8}: {DROPPED} files visible {r['drop_ms']:.0f} ms after the last write "
+                  f"({r['drop_batches']} batches), rename {r['rename_ms']:.0f} ms, {DELETED} deletes "
+                  f"{r['delete_ms']:.0f} ms, {NESTED}-file folder moved in {r['move_in_ms']:.0f} ms; "
+                  f"{r['batches']} updates took {r['apply_ms']:.0f} ms on the GUI thread")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
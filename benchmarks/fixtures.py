@@ -0,0 +1,136 @@
+import math
+import os
+import wave
+from array import array
+from struct import pack
+
+
+MPEG1_L3_BITRATES = (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+
+
+def syncsafe(size:int) -> bytes:
+    return bytes((size >> shift) & 0x7f for shift in (21, 14, 7, 0))
+
+
+def id3v2_tag(title:str, artist:str = '', album:str = '', extra:bytes = b'') -> bytes:
+    frames = b''
+    for frame_id, text in ((b'TIT2', title), (b'TPE1', artist), (b'TALB', album)):
+        if text:
+            payload = b'\x03' + text.encode('utf-8')
+            frames += frame_id + pack('>I', len(payload)) + b'\x00\x00' + payload
+    frames += extra
+    return b'ID3\x03\x00\x00' + syncsafe(len(frames)) + frames
+
+
+def apic_frame(image:bytes, picture_type:int = 3, mime:str = 'image/jpeg', description:str = '') -> bytes:
+    # UTF-16 description, the awkward case for finding where the image starts
+    payload = (b'\x01' + mime.encode('latin-1') + b'\x00' + bytes((picture_type,))
+               + description.encode('utf-16') + b'\x00\x00' + image)
+    return b'APIC' + pack('>I', len(payload)) + b'\x00\x00' + payload
+
+
+def mp3_frame(bitrate:int, padding:int = 0) -> bytes:
+    # MPEG-1 layer III, 44.1 kHz, joint stereo, silent payload
+    index = (0,) + MPEG1_L3_BITRATES
+    header = bytes((0xff, 0xfb, index.index(bitrate) << 4 | padding << 1, 0x64))
+    return header + bytes(144 * bitrate * 1000 // 44100 + padding - 4)
+
+
+def xing_frame(frames:int, tag:bytes = b'Xing') -> bytes:
+    # the encoder's info frame: a frame count after the 32 bytes of stereo side info, no audio
+    frame = bytearray(mp3_frame(128))
+    frame[36:48] = tag + pack('>II', 1, frames)
+    return bytes(frame)
+
+
+def mp3_frames(seconds:float, vbr:bool = False) -> bytes:
+    count = int(seconds * 44100 / 1152)
+    if not vbr:
+        return b''.join(mp3_frame(128, i % 2) for i in range(count))
+    return b''.join(mp3_frame(MPEG1_L3_BITRATES[(i * 7) % len(MPEG1_L3_BITRATES)]) for i in range(count))
+
+
+def write_mp3(path:str, seconds:float = 5, title:str = None, artist:str = 'Artist',
+              album:str = 'Album', vbr:bool = False, tag:bytes = None) -> str:
+    title = title or os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'wb') as f:
+        f.write(tag if tag is not None else id3v2_tag(title, artist, album))
+        f.write(mp3_frames(seconds, vbr))
+    return path
+
+
+def sine_pcm(seconds:float, rate:int = 44100, channels:int = 2,
+             frequency:float = 440.0, amplitude:float = 0.5) -> array:
+    samples = array('h')
+    step = 2 * math.pi * frequency / rate
+    peak = int(amplitude * 32767)
+    for n in range(int(seconds * rate)):
+        value = int(peak * math.sin(step * n))
+        samples.extend((value,) * channels)
+    return samples
+
+
+def write_wav(path:str, seconds:float = 5, rate:int = 44100, channels:int = 2, title:str = None,
+              frequency:float = 440.0, amplitude:float = 0.5) -> str:
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(sine_pcm(seconds, rate, channels, frequency, amplitude).tobytes())
+    if title:
+        info = b'INAM' + pack('<I', len(title) + 1) + title.encode() + b'\x00'
+        if len(info) % 2:
+            info += b'\x00'
+        chunk = b'LIST' + pack('<I', len(info) + 4) + b'INFO' + info
+        with open(path, 'r+b') as f:
+            f.seek(0, os.SEEK_END)
+            f.write(chunk)
+            size = f.tell() - 8
+            f.seek(4)
+            f.write(pack('<I', size))
+    return path
+
+
+def rss() -> int:
+    # resident set size in bytes (Linux)
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def make_music_folder(root:str, count:int, seconds:float = 1) -> list[str]:
+    os.makedirs(root, exist_ok=True)
+    paths = []
+    for index in range(count):
+        if index % 4:
+            paths.append(write_mp3(os.path.join(root, f"track{index:05}.mp3"), seconds,
+                                   title=f"Track {index}", vbr=index % 3 == 0))
+        else:
+            paths.append(write_wav(os.path.join(root, f"track{index:05}.wav"), min(seconds, 0.1),
+                                   rate=8000, channels=1, title=f"Track {index}"))
+    return paths
+
+
+def write_song(path:str, seed:int, seconds:float = 20, rate:int = 44100, lead_in:float = 0.0,
+               gain:float = 1.0, noise:float = 0.0) -> str:
+    # a seeded sequence of decaying two-tone notes; the same seed is the same song,
+    # lead_in/gain/noise/rate make it a different file of it
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    parts, length = [np.zeros(int(lead_in * rate))], 0
+    while length < seconds * rate:
+        t = np.arange(int(rng.uniform(0.1, 0.4) * rate)) / rate
+        tones = rng.uniform(80, 4000, size=2)
+        parts.append((np.sin(2 * np.pi * tones[0] * t) + 0.5 * np.sin(2 * np.pi * tones[1] * t)) * np.exp(-t * 6))
+        length += len(t)
+    song = np.concatenate(parts)[:int((seconds + lead_in) * rate)]
+    song = 0.3 * gain * song + noise * np.random.default_rng(seed + 1).standard_normal(len(song))
+    pcm = (np.clip(song, -1, 1) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.repeat(pcm, 2).tobytes())
+    return path
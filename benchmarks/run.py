@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import subprocess
+from statistics import median
+from tempfile import mkdtemp
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from benchmarks import bench_settings, bench_startup
+from benchmarks.fixtures import make_music_folder, write_wav
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, 'config', 'settings.toml')
+LANGUAGE_PATH = os.path.join(ROOT, 'config', 'language.toml')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baselines', 'suite.json')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+LIBRARY_SIZE = 500
+SWITCHES = 20
+LOOKUPS = 100_000
+PROGRESS_UPDATES = 2_000
+SETTINGS_RUNS = 5
+# metrics bound by the disk rather than the code get more room than --tolerance
+TOLERANCES = {'settings_set_sync_us': 1.0}
+
+# every metric is a cost, lower is better
+CASES = {}
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def qt_app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([sys.argv[0]])
+
+
+def wait_for(app, predicate, timeout:float = 10) -> None:
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError('benchmark condition not reached')
+        app.processEvents()
+
+
+def main_window(workdir:str, music:str):
+    # a real MainWindow on a private config: NumPy backend into a null sink
+    from src.app.mainWindow import MainWindow
+    from src.utils.parse import Settings
+    settings = Settings(shutil.copy(CONFIG_PATH, workdir), write_behind=True)
+    with settings.transaction():
+        settings.set('path_to_music', music)
+        settings.set('playlist', '')
+        settings.set('normalize_volume', False)
+        settings.set('audio_backend', 'numpy')
+        settings.set('audio_sink', 'null')
+    try:
+        return MainWindow(settings, LANGUAGE_PATH)
+    except BaseException:
+        settings.close()
+        raise
+
+
+@case('settings')
+def settings_case(workdir:str) -> dict:
+    # the median of several storms: one fsync stall would otherwise decide the number
+    results = {}
+    for write_behind in (False, True):
+        storms = [bench_settings.hotkey_storm(write_behind) for _ in range(SETTINGS_RUNS)]
+        key = 'write_behind' if write_behind else 'sync'
+        results[f'settings_set_{key}_us'] = median(storm['seconds'] / storm['events'] for storm in storms) * 1e6
+    return results
+
+
+@case('language')
+def language_case(workdir:str) -> dict:
+    from src.utils.parse import Language
+    language = Language(LANGUAGE_PATH, 'en')
+    words = list(language.get_file()['en'])
+    lookups = [words[i % len(words)] for i in range(LOOKUPS)]
+    get_time = timed(lambda: [language.get(word) for word in lookups])
+    get_lang_time = timed(lambda: [language.get_lang() for _ in range(200)])
+    return {'language_get_us': get_time / LOOKUPS * 1e6, 'language_get_lang_us': get_lang_time / 200 * 1e6}
+
+
+@case('library_scan')
+def library_scan_case(workdir:str) -> dict:
+    from src.utils.library import Library
+    music = os.path.join(workdir, 'music')
+    make_music_folder(music, LIBRARY_SIZE, seconds=0.5)
+    library = Library(os.path.join(workdir, 'library.sqlite'))
+    results = {'library_scan_cold_ms': timed(library.scan, music) * 1000,
+               'library_scan_warm_ms': timed(library.scan, music) * 1000}
+    library.close()
+    return results
+
+
+@case('set_music')
+def set_music_case(workdir:str) -> dict:
+    music = os.path.join(workdir, 'music')
+    make_music_folder(music, LIBRARY_SIZE, seconds=0.5)
+    app = qt_app()
+    # the constructor already scanned once; time a cold scan plus the view refresh
+    window = main_window(workdir, music)
+    app.processEvents()
+    window.core.library.forget(music)
+    cold = timed(window.core.set_music)
+    app.processEvents()
+    warm = timed(window.core.set_music)
+    window.close()
+    return {'set_music_cold_ms': cold * 1000, 'set_music_warm_ms': warm * 1000}
+
+
+@case('track_switch')
+def track_switch_case(workdir:str) -> dict:
+    music = os.path.join(workdir, 'music')
+    os.makedirs(music)
+    for index in range(SWITCHES + 1):
+        write_wav(os.path.join(music, f'track{index:03}.wav'), 2)
+    app = qt_app()
+    window = main_window(workdir, music)
+
+    # next_song -> first audible frame of the new track
+    latencies = []
+    for _ in range(SWITCHES):
+        path = os.path.join(music, window.core.playlist.peek_next())
+        engine = lambda: window.playback.media_player.engine
+        start = time.perf_counter()
+        window.core.next_song()
+        wait_for(app, lambda: window.playback.path == path and engine().frame > 0 and engine().playing)
+        latencies.append(time.perf_counter() - start)
+        wait_for(app, lambda: time.perf_counter() - start > 0.05)
+    window.close()
+    return {'track_switch_median_ms': median(latencies) * 1000, 'track_switch_max_ms': max(latencies) * 1000}
+
+
+@case('progress')
+def progress_case(workdir:str) -> dict:
+    # position updates as the player emits them, including the repaints they cause
+    app = qt_app()
+    from src.app.uiScheduler import UiRefreshScheduler
+    from src.app.waveformBar import WaveformBar
+    bar = WaveformBar(os.path.join(workdir, 'peaks'))
+    bar.resize(280, 20)
+    bar.setRange(0, PROGRESS_UPDATES * 20)
+    bar.show()
+    scheduler = UiRefreshScheduler(20)
+    app.processEvents()
+
+    start = time.perf_counter()
+    for index in range(PROGRESS_UPDATES):
+        scheduler.post('position', bar.setValue, index * 20)
+    post_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index in range(PROGRESS_UPDATES // 10):
+        bar.setValue(index * 200)
+        bar.repaint()
+    repaint_time = time.perf_counter() - start
+    bar.shutdown()
+    return {'progress_post_us': post_time / PROGRESS_UPDATES * 1e6,
+            'progress_repaint_us': repaint_time / (PROGRESS_UPDATES // 10) * 1e6}
+
+
+@case('startup')
+def startup_case(workdir:str) -> dict:
+    result = bench_startup.measure(3)
+    if result['loaded_lazy_modules']:
+        raise RuntimeError(f"eagerly imported: {', '.join(result['loaded_lazy_modules'])}")
+    return bench_startup.metrics(result)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names:list[str]) -> dict:
+    report = {'revision': git_revision(), 'python': platform.python_version(), 'platform': platform.platform(),
+              'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'metrics': {}, 'errors': {}}
+    for name in names:
+        workdir = mkdtemp(prefix=f'bench-{name}-')
+        try:
+            report['metrics'].update(CASES[name](workdir))
+        except Exception as e:
+            # recorded rather than raised so the other cases still run; main() fails the run
+            report['errors'][name] = f"{type(e).__name__}: {e}".splitlines()[0]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(metrics:dict, baseline:dict, tolerance:float) -> list[str]:
+    failures = []
+    for key, value in baseline.items():
+        allowed = TOLERANCES.get(key, tolerance)
+        if key not in metrics:
+            failures.append(f"{key}: missing from this run")
+        elif metrics[key] > value * (1 + allowed):
+            failures.append(f"{key}: {metrics[key]:.2f} > baseline {value:.2f} (+{allowed:.0%})")
+    # a new metric is held to nothing until it has a baseline
+    for key in sorted(set(metrics) - set(baseline)):
+        failures.append(f"{key}: not in the baseline, run with --update-baseline")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless benchmark suite')
+    parser.add_argument('cases', nargs='*', metavar='case', help=f"cases to run, default all: {', '.join(CASES)}")
+    parser.add_argument('--output', help='result JSON path, default benchmarks/results/<time>.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case: {', '.join(unknown)} (choose from {', '.join(CASES)})")
+
+    report = run(args.cases or list(CASES))
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    for key, value in sorted(report['metrics'].items()):
+        print(f"{key:>32}: {value:10.2f}")
+    for name, reason in report['errors'].items():
+        print(f"ERROR: {name}: {reason}", file=sys.stderr)
+    print(f"results written to {output}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+        baseline.update(report['metrics'])
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        return 1 if report['errors'] else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --update-baseline to create one", file=sys.stderr)
+        return 1
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if not args.cases:
+        failures = compare(report['metrics'], baseline, args.tolerance)
+    else:
+        # a partial run is held only to the baseline entries of the cases it ran
+        failures = compare(report['metrics'], {key: value for key, value in baseline.items()
+                                               if any(key.startswith(name) for name in args.cases)}, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures or report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import os
+import sys
+import argparse
+
+from src.utils.parse import Settings
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config', 'settings.toml')
+
+
+def main(argv=None):
+    # packs icons, stylesheets and the background at the window size into
+    # src/app/assets/assets.bundle; rerun after changing an asset or the window size
+    parser = argparse.ArgumentParser(description='Build the asset bundle')
+    parser.add_argument('--config', default=CONFIG_PATH)
+    parser.add_argument('--size', action='append', default=[], metavar='WxH',
+                        help='extra background size, may be repeated')
+    parser.add_argument('--output')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtGui import QGuiApplication
+    from src.app.assetRegistry import BUNDLE_PATH, build_bundle
+
+    app = QGuiApplication([sys.argv[0]])
+    settings = Settings(args.config)
+    sizes = [(settings.get('win_width'), settings.get('win_height'))]
+    sizes += [tuple(int(part) for part in size.split('x')) for size in args.size]
+    output = args.output or BUNDLE_PATH
+    size = build_bundle(output, sizes)
+    print(f"{output}: {size // 1024} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,68 @@
-from src.app.mainWindow import MainWindow
 from src.utils.parse import Settings
-from PyQt5.QtWidgets import QApplication
-from sys import argv as sysArgv, exit as sysExit
-from os.path import dirname
+from sys import argv as sysArgv, exit as sysExit, platform as sysPlatform
+from os.path import dirname, join
+
+CONFIG_PATH = join(dirname(__file__), 'config', 'settings.toml')
+LANGUAGE_PATH = join(dirname(__file__), 'config', 'language.toml')
+
+
+def create_player(argv, settings=None):
+    # the config is parsed once here and shared with every window
+    settings = settings or Settings(CONFIG_PATH, write_behind=True)
+
+    if (settings.get('theme') == 'dark' and sysPlatform == 'win32'):
+        argv += ['-platform', 'windows:darkmode=1']
+
+    from PyQt5.QtWidgets import QApplication
+    from src.app.mainWindow import MainWindow
+
+    app = QApplication(argv)
+    player = MainWindow(settings, LANGUAGE_PATH)
+    return app, player
+
+
+def control_path(settings):
+    return join(dirname(settings.filename), settings.get('control_socket') or 'player.sock')
+
+
+def create_daemon(argv, settings=None):
+    # no widgets, stylesheets or images: playback driven over the control socket
+    settings = settings or Settings(CONFIG_PATH, write_behind=True)
+
+    from PyQt5.QtCore import QCoreApplication
+    from src.app.playerDaemon import PlayerDaemon
+    from src.app.controlServer import ControlServer
+
+    app = QCoreApplication.instance() or QCoreApplication(argv)
+    daemon = PlayerDaemon(settings)
+    server = ControlServer(daemon, control_path(settings))
+    server.listen()
+    return app, daemon, server
+
+
+def run_daemon(argv, settings=None):
+    import signal
+    from PyQt5.QtCore import QTimer
+
+    app, daemon, server = create_daemon(argv, settings)
+    # Python only runs signal handlers between Qt events; the timer makes sure there are some
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: app.quit())
+    wakeup = QTimer()
+    wakeup.start(500)
+    wakeup.timeout.connect(lambda: None)
+    code = app.exec_()
+    server.close()
+    daemon.close()
+    return code
+
 
 if __name__ == "__main__":
-    
-    if (Settings('config\\settings.toml').get('theme') == 'dark'):
-        sysArgv += ['-platform', 'windows:darkmode=1']
-        
-    sysArgv += ['-platform']
-    
-    app = QApplication(sysArgv)
-    player = MainWindow('config\\settings.toml', 'config\\language.toml')
+
+    if '--headless' in sysArgv:
+        sysArgv.remove('--headless')
+        sysExit(run_daemon(sysArgv))
+
+    app, player = create_player(sysArgv)
     player.show()
     sysExit(app.exec_())
-    
-    
-   
\ No newline at end of file
@@ -0,0 +1,156 @@
+import os
+
+from src.utils.assetBundle import AssetBundle, write_bundle
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon, QImage, QPixmap, QPixmapCache
+
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+ICONS_DIR = os.path.join(ASSETS_DIR, 'icons')
+STYLES_DIR = os.path.join(ASSETS_DIR, 'stylesheets')
+BUNDLE_PATH = os.path.join(ASSETS_DIR, 'assets.bundle')
+BACKGROUND = 'main_background'
+IMAGE_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+
+def build_bundle(path:str = BUNDLE_PATH, background_sizes:list[tuple[int, int]] = ()) -> int:
+    # icons and backgrounds as raw premultiplied ARGB32, ready for QPixmap without a
+    # PNG decode or a rescale at startup; stylesheets as UTF-8. Run by build_assets.py
+    entries = []
+    for filename in sorted(os.listdir(ICONS_DIR)):
+        name, extension = os.path.splitext(filename)
+        if extension == '.png' and name != BACKGROUND:
+            source = os.path.join(ICONS_DIR, filename)
+            entries.append(image_entry('icons/' + name, QImage(source), source))
+    source = os.path.join(ICONS_DIR, BACKGROUND + '.png')
+    background = QImage(source)
+    for width, height in dict.fromkeys(background_sizes):
+        entries.append(image_entry(f'backgrounds/{BACKGROUND}@{width}x{height}', background.scaled(width, height),
+                                   source))
+    for filename in sorted(os.listdir(STYLES_DIR)):
+        name, extension = os.path.splitext(filename)
+        if extension == '.css':
+            source = os.path.join(STYLES_DIR, filename)
+            with open(source, 'rb') as f:
+                entries.append(('styles/' + name, f.read(), dict(source_meta(source), format='text')))
+    return write_bundle(path, entries)
+
+
+def image_entry(name:str, image:QImage, source:str) -> tuple[str, bytes, dict]:
+    if image.isNull():
+        raise ValueError(f"cannot read image for {name}")
+    image = image.convertToFormat(IMAGE_FORMAT)
+    return (name, image.constBits().asstring(image.sizeInBytes()),
+            dict(source_meta(source), format='argb32', width=image.width(), height=image.height(),
+                 stride=image.bytesPerLine()))
+
+
+def source_meta(source:str) -> dict:
+    # what the entry was built from, so an edited loose file wins over the bundle
+    stat = os.stat(source)
+    return {'source': os.path.relpath(source, ASSETS_DIR), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def is_fresh(meta:dict) -> bool:
+    try:
+        stat = os.stat(os.path.join(ASSETS_DIR, meta['source']))
+    except (KeyError, OSError):
+        return False
+    return stat.st_mtime_ns == meta.get('mtime_ns') and stat.st_size == meta.get('size')
+
+
+class AssetRegistry:
+    # one place for icons, backgrounds and stylesheets, shared by every window.
+    # Pixmaps live in QPixmapCache and are made on first use, from the mapped
+    # bundle when there is one and from the loose files otherwise, or when the
+    # file an entry was built from has changed since
+    def __init__(self, bundle_path:str | None = BUNDLE_PATH):
+        self.bundle_path = bundle_path
+        self.__bundle = None
+        self.__icons = {}
+        self.__styles = {}
+
+
+    def bundle(self) -> AssetBundle | None:
+        if self.__bundle is None and self.bundle_path and os.path.exists(self.bundle_path):
+            try:
+                self.__bundle = AssetBundle(self.bundle_path)
+            except (OSError, ValueError):
+                # stale or damaged: the loose files still work
+                self.bundle_path = None
+        return self.__bundle
+
+
+    def pixmap(self, name:str) -> QPixmap:
+        key = 'asset:icons/' + name
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None:
+            pixmap = self.__from_bundle('icons/' + name)
+            if pixmap is None:
+                pixmap = QPixmap(os.path.join(ICONS_DIR, name + '.png'))
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+
+    def icon(self, name:str) -> QIcon:
+        # the QIcon keeps its pixmap, so an icon stays valid if the cache drops the entry
+        icon = self.__icons.get(name)
+        if icon is None:
+            icon = self.__icons[name] = QIcon(self.pixmap(name))
+        return icon
+
+
+    def background(self, width:int, height:int) -> QPixmap:
+        name = f'backgrounds/{BACKGROUND}@{width}x{height}'
+        key = 'asset:' + name
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None:
+            pixmap = self.__from_bundle(name)
+            if pixmap is None:
+                # a window size the bundle was not built for
+                pixmap = QPixmap(os.path.join(ICONS_DIR, BACKGROUND + '.png')).scaled(width, height)
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+
+    def stylesheet(self, name:str) -> str:
+        style = self.__styles.get(name)
+        if style is None:
+            name_in_bundle = 'styles/' + name
+            style = self.bundle().text(name_in_bundle) if self.__meta(name_in_bundle) is not None else None
+            if style is None:
+                with open(os.path.join(STYLES_DIR, name + '.css'), 'r', encoding='utf-8') as f:
+                    style = f.read()
+            self.__styles[name] = style
+        return style
+
+
+    def close(self) -> None:
+        self.__icons.clear()
+        self.__styles.clear()
+        if self.__bundle is not None:
+            self.__bundle.close()
+            self.__bundle = None
+
+
+    def __meta(self, name):
+        bundle = self.bundle()
+        meta = bundle.meta(name) if bundle is not None else None
+        return meta if meta is not None and is_fresh(meta) else None
+
+
+    def __from_bundle(self, name):
+        meta = self.__meta(name)
+        if meta is None:
+            return None
+        data = self.bundle().get(name)
+        # the QImage points into the map; fromImage copies it into the pixmap
+        image = QImage(data, meta['width'], meta['height'], meta['stride'], IMAGE_FORMAT)
+        pixmap = QPixmap.fromImage(image, Qt.NoFormatConversion)
+        del image
+        data.release()
+        return pixmap
+
+
+ASSETS = AssetRegistry()
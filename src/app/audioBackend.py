@@ -0,0 +1,28 @@
+from importlib import import_module
+
+
+# same values as QMediaPlayer.MediaStatus / QMediaPlayer.State, so code written
+# against either backend compares the same numbers
+NO_MEDIA, LOADING_MEDIA, LOADED_MEDIA, STALLED_MEDIA, BUFFERING_MEDIA, BUFFERED_MEDIA, END_OF_MEDIA, INVALID_MEDIA = range(1, 9)
+STOPPED, PLAYING, PAUSED = range(3)
+
+# backends are imported on first use: "qt" needs QtMultimedia and a platform
+# media plugin, "numpy" only needs numpy
+BACKENDS = {
+    'qt': 'src.app.qtBackend.QtMediaBackend',
+    'numpy': 'src.app.numpyBackend.NumpyBackend',
+}
+
+
+def register_backend(name, target):
+    BACKENDS[name] = target
+
+
+def create_backend(name, settings=None):
+    target = BACKENDS.get(name)
+    if target is None:
+        raise ValueError(f"Unknown audio backend: {name}")
+    if isinstance(target, str):
+        module, _, attribute = target.rpartition('.')
+        target = BACKENDS[name] = getattr(import_module(module), attribute)
+    return target(settings)
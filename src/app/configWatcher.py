@@ -0,0 +1,45 @@
+import os
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer
+
+
+class ConfigWatcher(QObject):
+    def __init__(self, settings, delay=50, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.path = os.path.abspath(settings.filename)
+        # the directory is watched too: an atomic save replaces the file,
+        # which drops it from the file watch
+        self.watcher = QFileSystemWatcher([self.path, os.path.dirname(self.path)], self)
+        self.watcher.fileChanged.connect(self.changed)
+        self.watcher.directoryChanged.connect(self.changed)
+        self.__mtime = self.mtime()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.reload)
+
+
+    def mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+
+    def changed(self, path):
+        # editors often write in several steps; reload once they settle
+        if os.path.exists(self.path) and self.path not in self.watcher.files():
+            self.watcher.addPath(self.path)
+        self.timer.start()
+
+
+    def reload(self):
+        mtime = self.mtime()
+        if mtime is None or mtime == self.__mtime:
+            return
+        self.__mtime = mtime
+        try:
+            self.settings.reload()
+        except (OSError, ValueError):
+            # half-written or invalid file: wait for the next change
+            self.__mtime = None
@@ -0,0 +1,128 @@
+import os
+import json
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtNetwork import QLocalServer
+
+
+EVENTS = ('track', 'state', 'volume', 'position', 'playlist')
+# a request is a short JSON line; a client past this without a newline is dropped
+MAX_LINE = 64 * 1024
+
+
+class ControlClient(QObject):
+    # one connection: newline-delimited JSON requests in, responses and subscribed events out
+    def __init__(self, socket, server):
+        super().__init__(server)
+        self.socket = socket
+        self.server = server
+        self.events = set()
+        self.__buffer = b''
+        socket.readyRead.connect(self.read)
+        socket.disconnected.connect(self.close)
+
+
+    def read(self):
+        self.__buffer += bytes(self.socket.readAll())
+        *lines, self.__buffer = self.__buffer.split(b'\n')
+        for line in lines:
+            if line.strip():
+                self.send(self.server.handle(self, line))
+        if len(self.__buffer) > MAX_LINE:
+            self.__buffer = b''
+            self.send({'ok': False, 'error': f'request longer than {MAX_LINE} bytes'})
+            self.socket.disconnectFromServer()
+
+
+    def send(self, message:dict) -> None:
+        self.socket.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+        # out now rather than on the next pass of the event loop
+        self.socket.flush()
+
+
+    def close(self):
+        self.server.clients.discard(self)
+        self.socket.deleteLater()
+        self.deleteLater()
+
+
+class ControlServer(QObject):
+    # the headless player's API on a Unix domain socket (a named pipe on Windows):
+    #   {"id": 1, "cmd": "seek", "position": 30000}  ->  {"id": 1, "ok": true, "result": ...}
+    #   {"cmd": "subscribe", "events": ["track", "state"]}  ->  then {"event": "track", ...} lines
+    def __init__(self, daemon, path:str, parent=None):
+        super().__init__(parent)
+        self.daemon = daemon
+        self.path = path
+        self.clients = set()
+        self.commands = {
+            'play': lambda request: daemon.play(),
+            'pause': lambda request: daemon.pause(),
+            'toggle': lambda request: daemon.toggle(),
+            'next': lambda request: daemon.next_song(),
+            'prev': lambda request: daemon.prev_song(),
+            'seek': lambda request: daemon.seek(request['position']),
+            'volume': lambda request: daemon.set_volume(request['volume']),
+            'status': lambda request: daemon.status(),
+        }
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.accept)
+        daemon.playerEvent.connect(self.broadcast)
+
+
+    def listen(self) -> bool:
+        # a socket file left by a crashed daemon would make listen() fail
+        QLocalServer.removeServer(self.path)
+        if not self.server.listen(self.path):
+            raise OSError(f"cannot listen on {self.path}: {self.server.errorString()}")
+        return True
+
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            self.clients.add(ControlClient(self.server.nextPendingConnection(), self))
+
+
+    def handle(self, client:ControlClient, line:bytes) -> dict:
+        try:
+            request = json.loads(line)
+            command = request['cmd']
+        except (ValueError, KeyError, TypeError, RecursionError):
+            return {'ok': False, 'error': 'expected a JSON object with "cmd"'}
+        response = {'id': request['id']} if 'id' in request else {}
+        try:
+            if command == 'subscribe':
+                events = request.get('events') or EVENTS
+                unknown = set(events) - set(EVENTS)
+                if unknown:
+                    raise ValueError(f"unknown events: {', '.join(sorted(unknown))}")
+                client.events = set(events)
+                result = sorted(client.events)
+            elif command == 'unsubscribe':
+                client.events, result = set(), None
+            elif command in self.commands:
+                result = self.commands[command](request)
+            else:
+                raise ValueError(f"unknown command: {command}")
+        except Exception as e:
+            # an exception leaving a slot aborts the process under PyQt 5.5+; one bad
+            # request, or a backend failure while serving it, must not take the daemon down
+            response.update(ok=False, error=f"{type(e).__name__}: {e}")
+            return response
+        response.update(ok=True, result=result)
+        return response
+
+
+    def broadcast(self, name:str, data:dict):
+        for client in list(self.clients):
+            if name in client.events:
+                client.send(dict(data, event=name))
+
+
+    def close(self):
+        for client in list(self.clients):
+            client.socket.disconnectFromServer()
+        self.server.close()
+        if os.path.exists(self.path):
+            QLocalServer.removeServer(self.path)
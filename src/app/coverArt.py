@@ -0,0 +1,230 @@
+import os
+from hashlib import blake2b
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from src.utils.metadata import read_cover
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QRect, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+
+PREFETCH_TRACKS = 3
+MAX_BYTES = 16 * 1024 * 1024
+DISK_BYTES = 64 * 1024 * 1024
+# a remembered "no cover" still costs its key and slot
+MISSING_COST = 256
+MISSING = object()
+DISK_QUALITY = 90
+
+
+class CoverArtCache(QObject):
+    # cover thumbnails at one size, keyed by path. Reading the tag, decoding and
+    # scaling run on a pool thread; the GUI thread gets QImages through
+    # coverReady(path, image or None). The memory tier is an LRU bounded by
+    # max_bytes, the optional disk tier keeps scaled JPEGs across runs
+    coverReady = pyqtSignal(str, object)
+
+
+    def __init__(self, width:int, height:int, max_bytes:int = MAX_BYTES, disk_dir:str = None,
+                 disk_bytes:int = DISK_BYTES, workers:int = 1, parent=None):
+        super().__init__(parent)
+        self.size = QSize(width, height)
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__pending = set()
+        self.__lock = Lock()
+        self.__disk = None
+        self.__generation = 0
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='covers')
+
+
+    def get(self, path:str):
+        # memory tier only: a QImage, None for a track without a cover, MISSING if not loaded yet
+        with self.__lock:
+            entry = self.__entries.get(path, MISSING)
+            if entry is not MISSING:
+                self.__entries.move_to_end(path)
+                self.hits += 1
+        return entry
+
+
+    def request(self, path:str):
+        # get(), scheduling a load on a miss; coverReady follows for that path
+        entry = self.get(path)
+        if entry is MISSING:
+            self.__submit(path)
+        return entry
+
+
+    def prefetch(self, paths) -> None:
+        for path in paths:
+            if path and self.get(path) is MISSING:
+                self.__submit(path)
+
+
+    def set_size(self, width:int, height:int) -> None:
+        if (width, height) != (self.size.width(), self.size.height()):
+            self.size = QSize(width, height)
+            self.clear()
+
+
+    def set_max_bytes(self, max_bytes:int) -> None:
+        with self.__lock:
+            self.max_bytes = max_bytes
+            self.__trim()
+
+
+    def clear(self) -> None:
+        # loads already running finish but are not kept
+        with self.__lock:
+            self.__generation += 1
+            self.__entries.clear()
+            self.__pending.clear()
+            self.bytes = 0
+
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+    def load(self, path:str):
+        # pool thread: the scaled cover, or None when the track has none
+        size = self.size
+        key = self.__disk_key(path, size) if self.disk_dir else None
+        if key is not None:
+            image = QImage(os.path.join(self.disk_dir, key))
+            if not image.isNull():
+                self.__touch_disk(key)
+                return image
+        data = read_cover(path)
+        image = scale_cover(data, size) if data else None
+        if image is not None and key is not None:
+            self.__store_disk(key, image)
+        return image
+
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+    def __submit(self, path):
+        with self.__lock:
+            if path in self.__pending:
+                return
+            self.__pending.add(path)
+            generation = self.__generation
+            self.misses += 1
+        self.pool.submit(self.__run, path, generation)
+
+
+    def __run(self, path, generation):
+        try:
+            image = self.load(path)
+        except Exception:
+            image = None
+        with self.__lock:
+            if generation != self.__generation:
+                return
+            self.__pending.discard(path)
+            self.__insert(path, image)
+        # queued to the GUI thread
+        self.coverReady.emit(path, image)
+
+
+    def __insert(self, path, image):
+        # lock held
+        old = self.__entries.pop(path, MISSING)
+        if old is not MISSING:
+            self.bytes -= cost(old)
+        self.__entries[path] = image
+        self.bytes += cost(image)
+        self.__trim()
+
+
+    def __trim(self):
+        # lock held; the newest entry stays even if it alone is over the limit
+        while self.bytes > self.max_bytes and len(self.__entries) > 1:
+            _, image = self.__entries.popitem(last=False)
+            self.bytes -= cost(image)
+
+
+    def __disk_key(self, path, size):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        digest = blake2b(f'{path}\0{stat.st_mtime_ns}\0{stat.st_size}'.encode(), digest_size=16)
+        return f'{digest.hexdigest()}-{size.width()}x{size.height()}.jpg'
+
+
+    def __disk_index(self):
+        # lock held; file name -> size in least recently used order, from the mtimes on first use
+        if self.__disk is None:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with os.scandir(self.disk_dir) as entries:
+                files = sorted((entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                               for entry in entries if entry.name.endswith('.jpg'))
+            self.__disk = OrderedDict((name, size) for _, name, size in files)
+        return self.__disk
+
+
+    def __touch_disk(self, key):
+        with self.__lock:
+            disk = self.__disk_index()
+            if key in disk:
+                disk.move_to_end(key)
+        try:
+            os.utime(os.path.join(self.disk_dir, key))
+        except OSError:
+            pass
+
+
+    def __store_disk(self, key, image):
+        path = os.path.join(self.disk_dir, key)
+        with self.__lock:
+            disk = self.__disk_index()
+        if not image.save(path + '.tmp', 'JPEG', DISK_QUALITY):
+            return
+        os.replace(path + '.tmp', path)
+        with self.__lock:
+            disk[key] = os.path.getsize(path)
+            total = sum(disk.values())
+            while total > self.disk_bytes and len(disk) > 1:
+                name, size = disk.popitem(last=False)
+                total -= size
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+
+def cost(image) -> int:
+    return image.sizeInBytes() + MISSING_COST if image is not None else MISSING_COST
+
+
+def scale_cover(data:bytes, size:QSize) -> QImage | None:
+    # fills `size`, cropping the overflow evenly; JPEG and friends downscale while decoding
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    source = reader.size()
+    if source.isValid() and source.width() > size.width() and source.height() > size.height():
+        reader.setScaledSize(source.scaled(size, Qt.KeepAspectRatioByExpanding))
+    image = reader.read()
+    if image.isNull():
+        return None
+    # already filling `size` means one side matches and the other is at least as long
+    if (image.width() < size.width() or image.height() < size.height()
+            or image.width() != size.width() and image.height() != size.height()):
+        image = image.scaled(size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    left, top = (image.width() - size.width()) // 2, (image.height() - size.height()) // 2
+    return image.copy(QRect(left, top, size.width(), size.height())).convertToFormat(
+        QImage.Format_ARGB32_Premultiplied)
@@ -0,0 +1,193 @@
+import os
+import json
+import shutil
+from itertools import count
+from tempfile import mkstemp
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, DUPLICATE = 'queued', 'running', 'done', 'failed', 'cancelled', 'duplicate'
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class DownloadManager(QObject):
+    jobAdded = pyqtSignal(int, str)
+    jobProgress = pyqtSignal(int, int)
+    jobRetrying = pyqtSignal(int, int, str)
+    jobFinished = pyqtSignal(int, str)
+    jobFailed = pyqtSignal(int, str)
+    jobCancelled = pyqtSignal(int)
+    jobDuplicate = pyqtSignal(int, str)
+
+
+    def __init__(self, queue_path, workers=2, retries=3, backoff=1.0, create_downloader=None,
+                 check_duplicate=None, cache_bytes=None, parent=None):
+        super().__init__(parent)
+        self.queue_path = queue_path
+        self.retries = retries
+        self.backoff = backoff
+        self.create_downloader = create_downloader or self.default_downloader
+        # check_duplicate(path) -> matching library track or None
+        self.check_duplicate = check_duplicate
+        self.staging_dir = os.path.join(os.path.dirname(os.path.abspath(queue_path)), 'incoming')
+        self.cache_dir = os.path.join(os.path.dirname(os.path.abspath(queue_path)), 'download-cache')
+        self.cache_bytes = cache_bytes
+        self.__cache = None
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='download')
+        self.jobs = {}
+        self.__cancel = {}
+        self.__lock = Lock()
+        self.__ids = count(1)
+        self.__closing = False
+        self.__started = False
+
+
+    def default_downloader(self, url, path, on_progress):
+        from src.utils.downloader import Downloader
+        return Downloader(url, path, on_progress=on_progress, cache=self.cache())
+
+
+    def cache(self):
+        # opened by the first download, on a worker thread
+        from src.utils.downloadCache import MAX_BYTES, DownloadCache
+        with self.__lock:
+            if self.__cache is None:
+                self.__cache = DownloadCache(self.cache_dir, self.cache_bytes or MAX_BYTES)
+            return self.__cache
+
+
+    def start(self):
+        # after the owner has set check_duplicate and connected its signals, so
+        # resumed jobs go through the same checks and notifications as new ones
+        if not self.__started:
+            self.__started = True
+            self.restore()
+
+
+    def restore(self):
+        # jobs that were queued or running when the player quit start over
+        try:
+            with open(self.queue_path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.__lock:
+            for job in saved:
+                self.jobs.setdefault(job['id'], job)
+            self.__ids = count(max(self.jobs, default=0) + 1)
+        for job in self.jobs.values():
+            if job['status'] in (QUEUED, RUNNING):
+                job['status'] = QUEUED
+                self.__submit(job)
+
+
+    def save(self):
+        with self.__lock:
+            directory = os.path.dirname(os.path.abspath(self.queue_path))
+            fd, tmp_path = mkstemp(prefix='.downloads-', suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(list(self.jobs.values()), f, indent=1)
+            os.replace(tmp_path, self.queue_path)
+
+
+    def add(self, url, path, audio=True):
+        with self.__lock:
+            job = {'id': next(self.__ids), 'url': url, 'path': path, 'audio': audio,
+                   'status': QUEUED, 'attempts': 0, 'progress': 0, 'filename': None, 'error': None}
+            self.jobs[job['id']] = job
+        self.save()
+        self.jobAdded.emit(job['id'], url)
+        self.__submit(job)
+        return job['id']
+
+
+    def cancel(self, job_id):
+        event = self.__cancel.get(job_id)
+        if event is not None:
+            event.set()
+
+
+    def set_cache_bytes(self, cache_bytes):
+        self.cache_bytes = cache_bytes
+        if self.__cache is not None:
+            self.__cache.max_bytes = cache_bytes
+            self.pool.submit(self.__cache.evict)
+
+
+    def pending(self):
+        return [job for job in self.jobs.values() if job['status'] in (QUEUED, RUNNING)]
+
+
+    def shutdown(self, wait=False):
+        # interrupted jobs stay queued and resume on the next start; wait=True
+        # returns once the workers have written their last save()
+        self.__closing = True
+        for event in self.__cancel.values():
+            event.set()
+        self.pool.shutdown(wait=wait, cancel_futures=True)
+
+
+    def __submit(self, job):
+        self.__cancel[job['id']] = Event()
+        self.pool.submit(self.__run, job)
+
+
+    def __update(self, job, **fields):
+        with self.__lock:
+            job.update(fields)
+        self.save()
+
+
+    def __run(self, job):
+        cancelled = self.__cancel[job['id']]
+
+        def on_progress(percent):
+            if cancelled.is_set():
+                raise DownloadCancelled()
+            job['progress'] = percent
+            self.jobProgress.emit(job['id'], percent)
+
+        while True:
+            if cancelled.is_set():
+                if self.__closing:
+                    self.__update(job, status=QUEUED)
+                    return
+                self.__update(job, status=CANCELLED)
+                self.jobCancelled.emit(job['id'])
+                return
+            self.__update(job, status=RUNNING, attempts=job['attempts'] + 1)
+            # audio that may be a duplicate only reaches the music folder once checked
+            target = self.staging_dir if self.check_duplicate and job['audio'] else job['path']
+            try:
+                os.makedirs(target, exist_ok=True)
+                downloader = self.create_downloader(job['url'], target, on_progress)
+                filename = downloader.downloadAudio() if job['audio'] else downloader.downloadVideo()
+                if target != job['path']:
+                    staged = os.path.join(target, filename)
+                    duplicate = self.check_duplicate(staged)
+                    if duplicate:
+                        os.remove(staged)
+                        self.__update(job, status=DUPLICATE, progress=100, duplicate=duplicate, error=None)
+                        self.jobDuplicate.emit(job['id'], duplicate)
+                        return
+                    shutil.move(staged, os.path.join(job['path'], filename))
+            except DownloadCancelled:
+                continue
+            except Exception as e:
+                if job['attempts'] > self.retries:
+                    self.__update(job, status=FAILED, error=str(e))
+                    self.jobFailed.emit(job['id'], str(e))
+                    return
+                self.jobRetrying.emit(job['id'], job['attempts'], str(e))
+                # exponential backoff, cut short by cancel()
+                cancelled.wait(self.backoff * 2 ** (job['attempts'] - 1))
+                continue
+
+            self.__update(job, status=DONE, progress=100, filename=filename, error=None)
+            self.jobFinished.emit(job['id'], os.path.join(job['path'], filename))
+            return
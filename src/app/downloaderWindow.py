@@ -1,27 +1,36 @@
-from src.utils.downloader import Downloader
+import os
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (QWidget, 
                              QVBoxLayout, 
+                             QHBoxLayout,
                              QPushButton, 
                              QLabel,
-                             QLineEdit)
+                             QPlainTextEdit,
+                             QListWidget,
+                             QListWidgetItem)
 
 
 class DownloaderWindow(QWidget):
-    def __init__(self, style, path):
+    def __init__(self, style, path, manager):
         super().__init__()
         
         self.setWindowTitle('Downloader')
         self.setStyleSheet(style)
         self.setFixedWidth(320)
         self.path = path
+        self.manager = manager
+        self.job_items = {}
         self.init_ui()
+        self.init_manager()
         
     
     def init_ui(self):
 
         layout = QVBoxLayout()
 
-        self.urlInput = QLineEdit()
+        # one URL per line
+        self.urlInput = QPlainTextEdit()
+        self.urlInput.setFixedHeight(80)
         layout.addWidget(self.urlInput)
 
         downloadAudioButton = QPushButton('Download Audio')
@@ -32,6 +41,13 @@ class DownloaderWindow(QWidget):
         downloadVideoButton.clicked.connect(self.download_video)
         layout.addWidget(downloadVideoButton)
 
+        self.jobList = QListWidget()
+        layout.addWidget(self.jobList)
+
+        cancelButton = QPushButton('Cancel')
+        cancelButton.clicked.connect(self.cancel_selected)
+        layout.addWidget(cancelButton)
+
         self.statusLabel = QLabel()
         layout.addWidget(self.statusLabel)
 
@@ -42,32 +58,74 @@ class DownloaderWindow(QWidget):
         self.statusLabel.setText(text)
     
     
+    def init_manager(self):
+        for job in self.manager.jobs.values():
+            self.set_job_text(job['id'], f"{job['status']}: {job['url']}")
+        self.manager.jobAdded.connect(self.job_added)
+        self.manager.jobProgress.connect(self.job_progress)
+        self.manager.jobRetrying.connect(self.job_retrying)
+        self.manager.jobFinished.connect(self.job_finished)
+        self.manager.jobFailed.connect(self.job_failed)
+        self.manager.jobCancelled.connect(self.job_cancelled)
+        self.manager.jobDuplicate.connect(self.job_duplicate)
+
+
+    def set_job_text(self, job_id, text) -> None:
+        item = self.job_items.get(job_id)
+        if item is None:
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, job_id)
+            self.jobList.insertItem(0, item)
+            self.job_items[job_id] = item
+        item.setText(text)
+
+
+    def job_added(self, job_id, url) -> None:
+        self.set_job_text(job_id, f"queued: {url}")
+
+
+    def job_progress(self, job_id, percent) -> None:
+        self.set_job_text(job_id, f"{percent}%: {self.manager.jobs[job_id]['url']}")
+
+
+    def job_retrying(self, job_id, attempt, error) -> None:
+        self.set_job_text(job_id, f"retry {attempt}: {error}")
+
+
+    def job_finished(self, job_id, filename) -> None:
+        self.set_job_text(job_id, f"done: {self.manager.jobs[job_id]['filename']}")
+
+
+    def job_failed(self, job_id, error) -> None:
+        self.set_job_text(job_id, f"failed: {error}")
+
+
+    def job_cancelled(self, job_id) -> None:
+        self.set_job_text(job_id, f"cancelled: {self.manager.jobs[job_id]['url']}")
+
+
+    def job_duplicate(self, job_id, duplicate) -> None:
+        self.set_job_text(job_id, f"duplicate of: {os.path.basename(duplicate)}")
+
+
+    def cancel_selected(self) -> None:
+        for item in self.jobList.selectedItems():
+            self.manager.cancel(item.data(Qt.UserRole))
+
+
     def download(self, is_audio) -> None:
-        url = self.urlInput.text()
-        
-        try:
-            if self.path:
-                if url.startswith("https://www.youtube.com/watch?v="):
-                    dl = Downloader(url, self.path)
-                    
-                    if is_audio:
-                        dl.downloadAudio()
-                        self.printLabel(' Audio downloaded successfully: {}'.format(dl.getTitle()))      
-
-                    else:
-                        dl.downloadVideo()
-                        self.printLabel(' Video downloaded successfully: {}'.format(dl.getTitle()))
-                
-                else:
-                    self.printLabel(' Invalid URL!')
-
-            else:
-                print('Invalid path')                
-                
-        except Exception as e:
-            self.printLabel(f' Error: {str(e)}')
-            
-        self.close()
+        if not self.path:
+            self.printLabel(' Invalid path!')
+            return
+
+        urls = [url.strip() for url in self.urlInput.toPlainText().splitlines() if url.strip()]
+        invalid = [url for url in urls if not url.startswith("https://www.youtube.com/watch?v=")]
+        for url in urls:
+            if url not in invalid:
+                self.manager.add(url, self.path, is_audio)
+
+        self.urlInput.setPlainText('\n'.join(invalid))
+        self.printLabel(' Invalid URL!' if invalid else ' Queued {} download(s)'.format(len(urls)))
 
 
     def download_audio(self) -> None:
@@ -0,0 +1,144 @@
+import os
+from errno import ENOSPC
+from PyQt5.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal
+
+from src.utils.inotify import (Inotify, IN_CREATE, IN_DELETE_SELF, IN_IGNORED, IN_ISDIR,
+                               IN_MOVE_SELF, IN_MOVED_FROM, IN_MOVED_TO, IN_Q_OVERFLOW)
+
+
+class FolderWatcher(QObject):
+    # changed(paths, renames): the set of touched paths and {old: new} for moves
+    # inside the folder, or (None, {}) when the whole folder has to be rescanned
+    changed = pyqtSignal(object, object)
+
+
+    def __init__(self, root, recursive=True, delay=100, max_delay=1000, poll_interval=2000, parent=None):
+        super().__init__(parent)
+        self.root = os.path.abspath(root)
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.pending = set()
+        self.renames = {}
+        self.__moves = {}
+        self.__rescan = False
+        self.watches = {}
+        self.inotify = None
+        self.notifier = None
+
+        # a burst (a large copy) is delivered once it pauses, or every max_delay while it lasts
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.flush)
+        self.limit = QTimer(self)
+        self.limit.setSingleShot(True)
+        self.limit.setInterval(max_delay)
+        self.limit.timeout.connect(self.flush)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+
+        try:
+            self.inotify = Inotify()
+            self.add_tree(self.root)
+        except OSError:
+            self.use_polling()
+            return
+        self.notifier = QSocketNotifier(self.inotify.fileno(), QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self.read_events)
+
+
+    @property
+    def mode(self):
+        return 'inotify' if self.inotify is not None else 'polling'
+
+
+    def use_polling(self):
+        # no inotify, or out of watches: the library scan skips unchanged directories anyway
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.watches.clear()
+        self.poll_timer.start(self.poll_interval)
+
+
+    def add_tree(self, path):
+        for directory, subdirs, _ in os.walk(path) if self.recursive else [(path, (), ())]:
+            try:
+                self.watches[self.inotify.add_watch(directory)] = directory
+            except OSError as e:
+                if e.errno == ENOSPC:
+                    raise
+                # vanished while walking
+                subdirs[:] = []
+
+
+    def read_events(self):
+        for wd, mask, cookie, name in self.inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                self.__rescan = True
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # a directory moved inside the folder was already re-watched at its new path
+                if not os.path.isdir(directory):
+                    self.inotify.remove_watch(wd)
+                    self.pending.add(directory)
+                continue
+            if mask & IN_CREATE and not mask & IN_ISDIR:
+                # the file is still being written, IN_CLOSE_WRITE follows
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_MOVED_FROM:
+                self.__moves[cookie] = path
+            elif mask & IN_MOVED_TO and cookie in self.__moves:
+                self.renames[self.__moves.pop(cookie)] = path
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and self.recursive:
+                try:
+                    self.add_tree(path)
+                except OSError:
+                    self.__rescan = True
+                    self.use_polling()
+                    break
+            self.pending.add(path)
+        self.schedule()
+
+
+    def schedule(self):
+        if not self.pending and not self.__rescan:
+            return
+        self.timer.start()
+        if not self.limit.isActive():
+            self.limit.start()
+
+
+    def poll(self):
+        self.__rescan = True
+        self.flush()
+
+
+    def flush(self):
+        self.timer.stop()
+        self.limit.stop()
+        paths, renames = (None, {}) if self.__rescan else (self.pending, self.renames)
+        self.pending, self.renames, self.__moves, self.__rescan = set(), {}, {}, False
+        if paths is None or paths:
+            self.changed.emit(paths, renames)
+
+
+    def close(self):
+        self.poll_timer.stop()
+        self.timer.stop()
+        self.limit.stop()
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
@@ -0,0 +1,99 @@
+from collections import deque
+from time import perf_counter
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from keyboard import add_hotkey, remove_hotkey
+
+from src.utils.metrics import METRICS
+
+
+FRAME_MS = 16
+# presses of one action closer than this belong to the same held key
+REPEAT_WINDOW = 0.3
+MAX_ACCELERATION = 10
+
+
+class HotkeyDispatcher(QObject):
+    # global hotkeys fire on the keyboard library's thread; only pressed() is
+    # touched there, handlers run once per frame on the Qt thread
+    pressed = pyqtSignal(str, int, float)
+
+
+    def __init__(self, acceleration=0.0, frame=FRAME_MS, parent=None):
+        super().__init__(parent)
+        self.acceleration = acceleration
+        self.actions = {}
+        self.bindings = {}
+        self.hotkeys = []
+        self.unbound = []
+        self.pending = {}
+        self.__streaks = {}
+        self.latencies = deque(maxlen=1024)
+        self.presses = 0
+        self.dispatches = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(frame)
+        self.timer.timeout.connect(self.flush)
+        self.pressed.connect(self.__pressed, Qt.QueuedConnection)
+
+
+    def register(self, action, handler, accelerate=False):
+        # handler(amount): the summed, possibly accelerated, steps since the last frame
+        self.actions[action] = (handler, accelerate)
+
+
+    def bind(self, key, action, direction=1):
+        self.bindings[key] = (action, direction)
+        try:
+            self.hotkeys.append(add_hotkey(key, lambda: self.press(action, direction)))
+        except Exception:
+            # no keyboard access (not root on Linux, no input device) or an unknown
+            # key name: the key stays unbound, inject() still reaches the action
+            self.unbound.append(key)
+
+
+    def unbind_all(self):
+        for hotkey in self.hotkeys:
+            remove_hotkey(hotkey)
+        self.hotkeys.clear()
+        self.bindings.clear()
+        self.unbound.clear()
+
+
+    def press(self, action, direction=1):
+        # any thread
+        if not METRICS.is_open('hotkey'):
+            METRICS.begin('hotkey', action=action)
+        self.pressed.emit(action, direction, perf_counter())
+
+
+    def inject(self, key):
+        # a synthetic key event, as the keyboard thread would deliver it
+        action, direction = self.bindings[key]
+        self.press(action, direction)
+
+
+    def __pressed(self, action, direction, stamp):
+        self.presses += 1
+        handler, accelerate = self.actions[action]
+        streak, last = self.__streaks.get(action, (0, 0.0))
+        streak = streak + 1 if stamp - last < REPEAT_WINDOW else 0
+        self.__streaks[action] = (streak, stamp)
+        step = min(MAX_ACCELERATION, 1 + self.acceleration * streak) if accelerate else 1
+        amount, first = self.pending.get(action, (0, stamp))
+        self.pending[action] = (amount + direction * step, first)
+        # the first press of a burst goes out at once, the rest once per frame
+        if not self.timer.isActive():
+            self.flush()
+
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        for action, (amount, first) in pending.items():
+            if amount:
+                self.actions[action][0](amount)
+                self.dispatches += 1
+            self.latencies.append((perf_counter() - first) * 1000)
+            METRICS.observe('hotkey.dispatch', self.latencies[-1], action=action)
+        if pending:
+            self.timer.start()
@@ -0,0 +1,120 @@
+import os
+import logging
+from threading import Thread
+from src.utils.library import Library
+from src.utils.metadata import extract_all
+
+
+log = logging.getLogger(__name__)
+# (table, extension) pairs already reported as undecodable, once per run of the player
+UNDECODABLE = set()
+
+
+class LibraryScanThread(Thread):
+    table = None
+
+
+    def __init__(self, library_path, folder_path, recursive=True, workers=None, batch=256, on_done=None):
+        super().__init__(daemon=True)
+        self.library_path = library_path
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.workers = workers
+        self.batch = batch
+        # on_done(thread) runs on this thread once the scan has ended, whichever way
+        self.on_done = on_done
+
+
+    def select(self, paths):
+        return paths
+
+
+    def extract(self, paths, workers):
+        raise NotImplementedError
+
+
+    def stale(self, library):
+        return library.stale(self.table, self.folder_path, self.recursive)
+
+
+    def store(self, library, items):
+        library.store(self.table, items)
+
+
+    def run(self):
+        # own connection: sqlite objects are not shared with the GUI thread
+        library = Library(self.library_path)
+        try:
+            paths = self.select(self.stale(library))
+            workers = 1 if len(paths) < self.batch else self.workers
+            pending = []
+            for item in self.extract(paths, workers):
+                pending.append(item)
+                if len(pending) >= self.batch:
+                    self.store(library, pending)
+                    pending.clear()
+            self.store(library, pending)
+        finally:
+            library.close()
+            on_done = self.on_done
+            if on_done is not None:
+                on_done(self)
+
+
+class MetadataScanThread(LibraryScanThread):
+    table = 'metadata'
+
+
+    def extract(self, paths, workers):
+        return extract_all(paths, workers)
+
+
+class LoudnessScanThread(LibraryScanThread):
+    table = 'loudness'
+
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('batch', 16)
+        super().__init__(*args, **kwargs)
+
+
+    def select(self, paths):
+        from src.utils.decoders import MISSING_DECODERS, can_decode
+        selected, skipped = [], {}
+        for path in paths:
+            if can_decode(path):
+                selected.append(path)
+            else:
+                extension = os.path.splitext(path)[1].lower()
+                skipped[extension] = skipped.get(extension, 0) + 1
+        for extension, count in skipped.items():
+            if (self.table, extension) not in UNDECODABLE:
+                UNDECODABLE.add((self.table, extension))
+                log.warning("%d %s files left out of the %s scan: %s", count, extension, self.table,
+                            f"{MISSING_DECODERS[extension]} is not installed" if extension in MISSING_DECODERS
+                            else "no decoder")
+        return selected
+
+
+    def extract(self, paths, workers):
+        from src.utils.loudness import analyze_all
+        return analyze_all(paths, workers)
+
+
+class FingerprintScanThread(LoudnessScanThread):
+    table = 'fingerprints'
+
+
+    def stale(self, library):
+        from src.utils.fingerprint import FingerprintIndex
+        self.index = FingerprintIndex(library)
+        return self.index.stale(self.folder_path, self.recursive)
+
+
+    def store(self, library, items):
+        self.index.store(items)
+
+
+    def extract(self, paths, workers):
+        from src.utils.fingerprint import fingerprint_all
+        return fingerprint_all(paths, workers)
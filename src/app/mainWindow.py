@@ -1,49 +1,69 @@
 import os
-import time
-from keyboard import add_hotkey
 
-from src.app.musicPlayback import MediaPlaybackThread
-from src.app.settingsWindow import SettingsWindow
-from src.app.downloaderWindow import DownloaderWindow
-from src.utils.parse import Settings, Language
-
-from PyQt5.QtCore import QSize, QTimer, Qt
-from PyQt5.QtGui import QIcon, QPixmap, QPalette, QBrush
-from PyQt5.QtMultimedia import QMediaPlayer
+from src.app.playerCore import PlayerCore
+from src.app.audioBackend import BUFFERED_MEDIA
+from src.app.uiScheduler import UiRefreshScheduler
+from src.app.waveformBar import WaveformBar
+from src.app.spectrumView import SpectrumView
+from src.app.downloadManager import DownloadManager
+from src.app.configWatcher import ConfigWatcher
+from src.app.seekCoalescer import SeekCoalescer
+from src.app.hotkeys import HotkeyDispatcher
+from src.app.assetRegistry import ASSETS
+from src.app.coverArt import MISSING, PREFETCH_TRACKS, CoverArtCache
+from src.utils.parse import Language
+from src.utils.metrics import METRICS
+
+from PyQt5.QtCore import QSize, QEvent, Qt
+from PyQt5.QtGui import QPalette, QBrush, QPixmap
 from PyQt5.QtWidgets import (QWidget,
                              QSlider,
                              QLabel, 
                              QVBoxLayout, 
                              QPushButton,
                              QFileDialog, 
-                             QProgressBar,
-                             QHBoxLayout)
-
+                             QHBoxLayout,
+                             QMenu,
+                             QMessageBox)
 
-ICONS_PATH = 'src\\app\\assets\\icons\\'
-STYLES_PATH = 'src\\app\\assets\\stylesheets\\'
-BACKGROUND_PATH = os.path.dirname(__file__) + '\\assets\\icons\\main_background.png'
       
         
 class MainWindow(QWidget):
     
-    def __init__(self, configPath, langPath):
+    def __init__(self, settings, langPath):
         super().__init__()
         
-        self.settings = Settings(configPath)
-        self.lang = Language(langPath, self.settings.get('language')).get
+        configPath = settings.filename
+        self.settings = settings
+        self.language = Language(langPath, self.settings.get('language'))
+        self.lang = self.language.get
+        self.core = PlayerCore(self.settings, fingerprints=True, parent=self)
+        self.cache_dir = os.path.join(os.path.dirname(configPath), 'cache')
+        self.download_manager = DownloadManager(os.path.join(os.path.dirname(configPath), 'downloads.json'),
+                                                self.settings.get('download_workers') or 2,
+                                                cache_bytes=(self.settings.get('download_cache_mb') or 0) * 1024 * 1024,
+                                                parent=self)
+        if self.settings.get('detect_duplicates'):
+            self.download_manager.check_duplicate = self.check_duplicate
+        self.download_manager.jobFinished.connect(self.core.refresh_music)
+        self.download_manager.start()
         
-        self.folder_path = self.settings.get('path_to_music')
-        self.current_song = self.settings.get('current_song')
         self.step_volume = self.settings.get('step_volume')
         self.step_music = self.settings.get('step_music')
         
         self.music_duration = 0
-        self.playing = False
-        self.music_files = []
         self.audio_trigger = True 
-        self.current_volume = None
-
+        self.ui_scheduler = UiRefreshScheduler(self.settings.get('interval_update_music'), self)
+        self.hotkeys = HotkeyDispatcher(self.settings.get('hotkey_acceleration') or 0, parent=self)
+        self.hotkeys.register('volume', self.change_volume)
+        self.hotkeys.register('seek', self.seek_steps, accelerate=True)
+        self.cover_path = None
+        self.covers = CoverArtCache(self.settings.get('win_width'), self.settings.get('win_height'),
+                                    (self.settings.get('cover_cache_mb') or 0) * 1024 * 1024,
+                                    os.path.join(self.cache_dir, 'covers'), parent=self)
+        self.covers.coverReady.connect(self.cover_ready)
+
+        self.init_metrics()
         self.init_background()
         self.init_media()
         self.init_buttons()
@@ -51,85 +71,171 @@ class MainWindow(QWidget):
         self.init_ui()
 
         # No music folder
-        if self.folder_path:
-            self.set_music()
+        if self.core.folder_path:
+            self.core.set_music()
         else:
             self.print_label(f"{self.lang('NoMeta')}")
+
+        self.settings.subscribe(self.apply_setting)
+        self.config_watcher = ConfigWatcher(self.settings, parent=self)
             
 
+    def init_metrics(self):
+        # off by default; every probe is then a single attribute check
+        if not self.settings.get('metrics_enabled'):
+            METRICS.close()
+            return
+        trace = self.settings.get('metrics_trace')
+        METRICS.enable(os.path.join(os.path.dirname(self.settings.filename), trace) if trace else None)
+        METRICS.stop_serving()
+        if self.settings.get('metrics_port'):
+            try:
+                METRICS.serve(self.settings.get('metrics_port'))
+            except OSError:
+                # port taken: keep the histogram and trace without the endpoint
+                pass
+
+
     def init_background(self):
         win_width, win_height = self.settings.get('win_width'), self.settings.get('win_height')
         self.setFixedSize(QSize(win_width, win_height))
-        
-        background_img = QPixmap(BACKGROUND_PATH).scaled(win_width, win_height)
+        self.covers.set_size(win_width, win_height)
+        cover = self.covers.request(self.cover_path) if self.cover_path else None
+        self.set_background(cover if cover is not MISSING else None)
+
+
+    def set_background(self, cover=None):
+        # the track's cover thumbnail, or the default background for a track without one
+        if cover is not None:
+            background_img = QPixmap.fromImage(cover)
+        else:
+            background_img = ASSETS.background(self.settings.get('win_width'), self.settings.get('win_height'))
         pal = self.palette()
         pal.setBrush(QPalette.Background, QBrush(background_img))
         self.setPalette(pal)
 
 
+    def show_cover(self, path):
+        self.cover_path = path
+        cover = self.covers.request(path)
+        # not loaded yet: the old background stays until cover_ready, usually a few ms
+        if cover is not MISSING:
+            self.set_background(cover)
+
+
+    def cover_ready(self, path, cover):
+        if path == self.cover_path:
+            self.set_background(cover)
+
+
     def init_media(self):
-        self.media_player = QMediaPlayer(None, QMediaPlayer.StreamPlayback)
-        self.media_player.mediaStatusChanged.connect(self.print_media_data)
-        self.media_player.positionChanged.connect(self.update_position)
-        self.media_player.durationChanged.connect(self.update_duration)
-        self.media_player.stateChanged.connect(self.media_state_changed)
-        self.current_volume = self.media_player.setVolume(self.settings.get('current_volume'))
+        self.playback = self.core.playback
+        self.playback.mediaStatusChanged.connect(self.media_status_changed)
+        self.playback.positionChanged.connect(self.update_position)
+        self.playback.durationChanged.connect(self.update_duration)
+        self.core.trackChanged.connect(self.track_changed)
+        self.core.playingChanged.connect(self.playing_changed)
+        self.core.playlistOpened.connect(self.playlist_opened)
+        self.core.upcomingChanged.connect(self.prefetch_covers)
+        self.seeker = SeekCoalescer(self.playback, os.path.join(self.cache_dir, 'seek'), parent=self)
 
 
     def init_assets(self):
-        self.menu_icon = QIcon(ICONS_PATH + 'menu.png')
-        self.play_icon = QIcon(ICONS_PATH + 'play.png')
-        self.stop_icon = QIcon(ICONS_PATH + 'pause.png')
-        self.next_icon = QIcon(ICONS_PATH + 'next.png')
-        self.prev_icon = QIcon(ICONS_PATH + 'prev.png')
-        self.folder_icon = QIcon(ICONS_PATH + 'folder_filled.png')
-        self.downloader_icon = QIcon(ICONS_PATH + 'downloader.png')
-        self.settings_icon = QIcon(ICONS_PATH + 'settings.png')
-        self.volume_on_icon = QIcon(ICONS_PATH + 'vol_on.png')
-        self.volume_off_icon = QIcon(ICONS_PATH + 'vol_off.png')
+        # icons are made on first use by the shared registry
         self.setStyleSheet(self.get_style_file('styles'))
         
         
     def init_buttons(self):
-        self.volume_up = add_hotkey(self.settings.get('btn_volume_up'), self.volume_up)
-        self.volume_down = add_hotkey(self.settings.get("btn_volume_down"), self.volume_down)
-        self.position_plus_shortcut = add_hotkey(self.settings.get('btn_music_plus'), self.position_plus)
-        self.position_plus_shortcut = add_hotkey(self.settings.get('btn_music_minus'), self.position_minus)
+        # the dispatcher runs the actions on this thread, at most once per frame
+        self.hotkeys.unbind_all()
+        self.hotkeys.bind(self.settings.get('btn_volume_up'), 'volume', 1)
+        self.hotkeys.bind(self.settings.get("btn_volume_down"), 'volume', -1)
+        self.hotkeys.bind(self.settings.get('btn_music_plus'), 'seek', 1)
+        self.hotkeys.bind(self.settings.get('btn_music_minus'), 'seek', -1)
+
+
+    def apply_setting(self, key, value):
+        # live reconfiguration; nothing here touches the current track
+        if key == 'language':
+            self.language.set_language(value)
+            playlist = self.core.playlist
+            self.print_label(" {}".format(self.get_music()) if playlist and len(playlist) else f"{self.lang('NoMeta')}")
+        elif key == 'theme':
+            self.init_assets()
+            for name, window in (('settings', getattr(self, 'settings_window', None)),
+                                 ('styles', getattr(self, 'downloader_window', None))):
+                if window is not None:
+                    window.setStyleSheet(self.get_style_file(name))
+        elif key in ('step_volume', 'step_music'):
+            setattr(self, key, value)
+        elif key == 'interval_update_music':
+            self.ui_scheduler.set_interval(value)
+        elif key.startswith('btn_'):
+            self.init_buttons()
+        elif key == 'hotkey_acceleration':
+            self.hotkeys.acceleration = value
+        elif key == 'visualizer_fps':
+            self.spectrum.set_fps(value)
+            if not value:
+                self.spectrum.detach()
+            elif self.core.playing:
+                self.spectrum.attach(self.playback)
+        elif key.startswith('metrics_'):
+            self.init_metrics()
+        elif key in ('win_width', 'win_height'):
+            self.init_background()
+        elif key == 'current_volume':
+            self.set_volume_icon(value)
+            self.print_volume_label(value)
+        elif key == 'cover_cache_mb':
+            self.covers.set_max_bytes(value * 1024 * 1024)
+        elif key == 'download_cache_mb':
+            self.download_manager.set_cache_bytes(value * 1024 * 1024)
+        elif key == 'detect_duplicates':
+            self.download_manager.check_duplicate = self.check_duplicate if value else None
         
 
     def init_ui(self):
         layout = QVBoxLayout()
         controlLayout = QHBoxLayout()
         
-        self.positionProgressBar = QProgressBar()
+        self.positionProgressBar = WaveformBar(os.path.join(self.cache_dir, 'peaks'))
         self.positionProgressBar.setRange(0, 0)
         self.positionProgressBar.setValue(0)
         self.positionProgressBar.setTextVisible(False)
         self.positionProgressBar.setFixedHeight(7)
+        self.positionProgressBar.seekRequested.connect(self.seeker.seek_to)
         layout.addWidget(self.positionProgressBar)
+
+        self.spectrum = SpectrumView(self.settings.get('visualizer_fps') or 0)
+        self.spectrum.setFixedHeight(16)
+        self.spectrum.setVisible(bool(self.spectrum.fps))
+        layout.addWidget(self.spectrum)
                 
         self.openFolderButton = QPushButton()
-        self.openFolderButton.setIcon(self.folder_icon)
+        self.openFolderButton.setIcon(ASSETS.icon('folder_filled'))
         self.openFolderButton.clicked.connect(self.open_folder)
+        self.openFolderButton.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.openFolderButton.customContextMenuRequested.connect(self.open_playlist_menu)
         controlLayout.addWidget(self.openFolderButton, stretch=2)
 
         self.prevButton = QPushButton()
-        self.prevButton.setIcon(self.prev_icon)
-        self.prevButton.clicked.connect(self.prev_song)
+        self.prevButton.setIcon(ASSETS.icon('prev'))
+        self.prevButton.clicked.connect(self.core.prev_song)
         controlLayout.addWidget(self.prevButton, stretch=2)
 
         self.playStopButton = QPushButton()
-        self.playStopButton.setIcon(self.play_icon)
+        self.playStopButton.setIcon(ASSETS.icon('play'))
         self.playStopButton.clicked.connect(self.play_stop_song)
         controlLayout.addWidget(self.playStopButton, stretch=1)
 
         self.nextButton = QPushButton()
-        self.nextButton.setIcon(self.next_icon)
-        self.nextButton.clicked.connect(self.next_song)
+        self.nextButton.setIcon(ASSETS.icon('next'))
+        self.nextButton.clicked.connect(self.core.next_song)
         controlLayout.addWidget(self.nextButton, stretch=2)
         
         self.volumeButton = QPushButton()
-        self.volumeButton.setIcon(self.volume_on_icon)
+        self.volumeButton.setIcon(ASSETS.icon('vol_on'))
         # self.volumeButton.clicked.connect(self.volume_on_off)
         controlLayout.addWidget(self.volumeButton)
         
@@ -142,110 +248,116 @@ class MainWindow(QWidget):
         self.setLayout(layout)
         self.enabled_widget(False)
         self.play_stop_song()
-        
-        self.timer = QTimer()
-        self.timer.setInterval(self.step_music)
-        self.timer.timeout.connect(self.update_position_slider)
-        self.timer.start()
 
 
-    @staticmethod
-    def get_style_file(nameStyle:str)->dict[str]:
-        with open(f'{STYLES_PATH + nameStyle}.css', 'r') as styleFile:
-            return styleFile.read()
+    def get_style_file(self, nameStyle:str)->dict[str]:
+        # the light theme is a few colour overrides laid over the dark sheets
+        style = ASSETS.stylesheet(nameStyle)
+        if self.settings.get('theme') == 'light':
+            style += '\n' + ASSETS.stylesheet('light')
+        return style
 
 
     def print_label(self, text):
         # self.statusLabel.setText(text)
-        self.setWindowTitle(text)
+        self.ui_scheduler.post('title', self.setWindowTitle, text)
 
 
     def print_volume_label(self, text):
-        self.volumeInfo.setText(f"{text}") 
+        self.ui_scheduler.post('volume', self.volumeInfo.setText, f"{text}") 
     
 
     def enabled_widget(self, enabled: bool):
-        if self.playing:
+        if self.core.playing:
             self.playStopButton.setEnabled(enabled)
             self.prevButton.setEnabled(enabled)
             self.nextButton.setEnabled(enabled)
             self.positionProgressBar.setEnabled(enabled)
             
             
-    def set_music(self):
-        self.music_files = [f for f in os.listdir(self.folder_path) if f.endswith('.mp3') or f.endswith('.wav')]
-        if self.music_files:
+    def playlist_opened(self, name, count):
+        if count:
             self.enabled_widget(True)
-            self.current_song = 0
-            self.play_song(self.music_files[self.current_song])
-            self.settings.set('path_to_music', self.folder_path)
-            self.settings.set('current_song', self.current_song)
-            self.settings.set("count_musics", len(self.music_files))
         else:
             self.print_label(f" {self.lang('NoMusicFiles')}.")
 
 
-    def play_song(self, filename):    
-        if self.playing:
-            self.media_player.stop()
-            
-        # self.media_player.setVolume(self.volumeProgressBar.value())
-        
-        thread = MediaPlaybackThread(self.media_player, 
-                                     self.folder_path, 
-                                     filename, 
-                                     self.positionProgressBar)
-        thread.start()
-        self.playStopButton.setIcon(self.stop_icon)
-        self.playing = True
+    def check_duplicate(self, path):
+        # called on a download worker before the file reaches the music folder
+        from src.utils.fingerprint import find_duplicate
+        return find_duplicate(self.core.library.filename, path)
+
+
+    def show_duplicates(self):
+        from src.utils.fingerprint import FingerprintIndex
+        folder_path = self.core.folder_path
+        groups = FingerprintIndex(self.core.library).duplicates(folder_path)
+        text = '\n\n'.join('\n'.join(os.path.relpath(path, folder_path) for path in group) for group in groups)
+        QMessageBox.information(self, self.lang('FindDuplicates'), text or self.lang('NoDuplicates'))
+
+
+    def track_changed(self, path):
+        self.positionProgressBar.set_track(path)
+        self.seeker.set_track(path)
+        self.show_cover(path)
+        self.prefetch_covers()
+        self.print_label(" {}".format(self.get_music()))
+
+
+    def playing_changed(self, playing):
+        self.playStopButton.setIcon(ASSETS.icon('pause' if playing else 'play'))
+        if playing and self.spectrum.fps and self.spectrum.playback is None:
+            self.spectrum.attach(self.playback)
 
 
     def play_stop_song(self):
-        if self.playing:
-            self.media_player.pause()
-            self.playStopButton.setIcon(self.play_icon)
-            self.playing = False
-        else:
-            self.media_player.play()
-            self.playStopButton.setIcon(self.stop_icon)
-            self.playing = True
+        self.core.toggle()
+
+
+    def media_status_changed(self, status):
+        if status == BUFFERED_MEDIA:
+            self.print_media_data()
 
 
-    def media_state_changed(self, state):
-        if state == QMediaPlayer.StoppedState and self.media_player.mediaStatus() == QMediaPlayer.EndOfMedia:
-            self.next_song()
-            time.sleep(0.1)
+    def prefetch_covers(self):
+        # decoded on the pool while this track plays, so the next play_song swaps instantly
+        playlist = self.core.playlist
+        if playlist is not None:
+            self.covers.prefetch(os.path.join(self.core.folder_path, filename)
+                                 for filename in playlist.upcoming(PREFETCH_TRACKS))
 
 
-    def prev_song(self):
-        if len(self.music_files) > 0:
-            self.current_song = (self.current_song - 1) % len(self.music_files)
-            self.media_player.stop()
-            self.play_song(self.music_files[self.current_song])
-            self.settings.set('current_song', self.current_song)
+    def enqueue(self):
+        # a track picked from the open playlist plays after the current one
+        core = self.core
+        path, _ = QFileDialog.getOpenFileName(self, self.lang('PlayNext'), core.folder_path or '')
+        if not path:
+            return
+        if core.playlist.tracks is core.music_files:
+            path = os.path.relpath(path, core.folder_path)
+        try:
+            core.enqueue(path)
+        except ValueError:
+            QMessageBox.information(self, self.lang('PlayNext'), self.lang('NotInPlaylist'))
 
 
-    def next_song(self):
-        if len(self.music_files) > 0:
-            self.current_song = (self.current_song + 1) % len(self.music_files)
-            self.media_player.stop()
-            self.play_song(self.music_files[self.current_song])
-            self.settings.set('current_song', self.current_song)
+    def toggle_shuffle(self, shuffle):
+        self.core.set_shuffle(shuffle)
 
 
     def print_media_data(self):
-        if self.media_player.mediaStatus() == 6:
-            if self.media_player.isMetaDataAvailable():
+        if self.playback.media_player.mediaStatus() == BUFFERED_MEDIA:
+            if self.playback.media_player.isMetaDataAvailable():
                 title = self.get_music()
-                # author = self.media_player.metaData('Author')
+                # author = self.playback.media_player.metaData('Author')
                 self.print_label(" {}".format(title))
             else:
                 self.print_label(f" {self.lang('NoMeta')}")
 
 
     def update_position(self, position):
-        if self.playing:
-            self.positionProgressBar.setValue(position)
+        if self.core.playing:
+            self.ui_scheduler.post('position', self.positionProgressBar.setValue, position)
 
 
     def update_duration(self, duration):
@@ -253,72 +365,144 @@ class MainWindow(QWidget):
         self.music_duration = duration
 
 
-    def update_position_slider(self):
-        position = self.media_player.position()
-        self.positionProgressBar.setValue(position)
+    def hideEvent(self, event):
+        self.ui_scheduler.pause()
+        self.spectrum.pause()
+        super().hideEvent(event)
+
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.isMinimized():
+            self.ui_scheduler.resume()
+            self.spectrum.resume()
+
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            if self.isMinimized():
+                self.ui_scheduler.pause()
+                self.spectrum.pause()
+            elif self.isVisible():
+                self.ui_scheduler.resume()
+                self.spectrum.resume()
+        super().changeEvent(event)
     
                 
+    def seek_steps(self, steps):
+        # steps may be fractional once a held key accelerates
+        if self.core.playing:
+            self.seeker.seek_by(round(steps * self.step_music))
+        else:
+            METRICS.end('hotkey')
+
+
     def position_plus(self):
-        if self.playing:
-            position = self.media_player.position()
-            self.media_player.pause()
-            self.media_player.setPosition(position + self.step_music) 
-            self.media_player.play()
+        self.seek_steps(1)
 
 
     def position_minus(self):
-        if self.playing:
-            position = self.media_player.position()
-            self.media_player.pause()  
-            self.media_player.setPosition(position - self.step_music)
-            self.media_player.play()
-        
-        
-    def volume_up(self):
-        current_volume = self.settings.get('current_volume')
-        if current_volume < 100:
-            current_volume += self.step_volume
+        self.seek_steps(-1)
+
+
+    def change_volume(self, steps):
+        # a burst of presses arrives as one summed step count
+        previous = self.settings.get('current_volume')
+        current_volume = max(0, min(100, previous + steps * self.step_volume))
+        if current_volume != previous:
             self.set_volume_icon(current_volume)
-            self.media_player.setVolume(current_volume)
+            self.core.apply_volume(current_volume)
             self.settings.set("current_volume", current_volume)
             self.print_volume_label(current_volume)
+        else:
+            METRICS.end('hotkey')
+
+
+    def volume_up(self):
+        self.change_volume(1)
 
 
     def volume_down(self):
-        current_volume = self.settings.get('current_volume')
-        if current_volume > 0:
-            current_volume -= self.step_volume
-            self.set_volume_icon(current_volume)
-            self.media_player.setVolume(current_volume)
-            self.settings.set("current_volume", current_volume)
-            self.print_volume_label(current_volume)
+        self.change_volume(-1)
 
 
     def set_volume_icon(self, c_volume):
-        self.volumeButton.setIcon(self.volume_on_icon if c_volume != 0 else self.volume_off_icon)
+        self.ui_scheduler.post('volume_icon', self.volumeButton.setIcon,
+                               ASSETS.icon('vol_on') if c_volume != 0 else ASSETS.icon('vol_off'))
 
 
     def get_music(self) -> list:
         __max_len_text = 28
-        __text = self.music_files[self.current_song].split('.')[0]
+        __text = self.core.title(self.core.playlist.current())
         return __text[:__max_len_text] + '...' if len(__text) > __max_len_text else __text[:__max_len_text]
             
             
     def open_settings(self):
-        self.settings_window = SettingsWindow(self.get_style_file('settings'))
+        from src.app.settingsWindow import SettingsWindow
+        self.settings.flush()
+        self.settings_window = SettingsWindow(self.get_style_file('settings'), self.settings, self.language)
         self.settings_window.show()
     
             
     def open_downloader(self):
-        self.downloader_window = DownloaderWindow(self.get_style_file('styles'), self.folder_path)
-        self.downloader_window.destroyed.connect(self.set_music)
+        from src.app.downloaderWindow import DownloaderWindow
+        self.downloader_window = DownloaderWindow(self.get_style_file('styles'), self.core.folder_path,
+                                                  self.download_manager)
         self.downloader_window.show()
         
     
+    def closeEvent(self, event):
+        self.positionProgressBar.shutdown()
+        self.covers.shutdown()
+        self.spectrum.detach()
+        self.seeker.shutdown()
+        self.download_manager.shutdown()
+        self.hotkeys.unbind_all()
+        self.core.close()
+        self.settings.close()
+        METRICS.close()
+        super().closeEvent(event)
+
+
     def open_folder(self):
-        self.folder_path = QFileDialog.getExistingDirectory(self, "Open Folder")
-        if self.folder_path:
-            self.set_music()
+        folder_path = QFileDialog.getExistingDirectory(self, "Open Folder")
+        if folder_path:
+            self.core.folder_path = folder_path
+            self.settings.set('playlist', '')
+            self.core.set_music()
+
+
+    def open_playlist_menu(self, point):
+        menu = QMenu(self)
+        menu.addAction(self.lang('OpenPlaylist'), self.import_playlist)
+        export = menu.addAction(self.lang('ExportPlaylist'), self.export_playlist)
+        play_next = menu.addAction(self.lang('PlayNext'), self.enqueue)
+        shuffle = menu.addAction(self.lang('Shuffle'))
+        shuffle.setCheckable(True)
+        shuffle.setChecked(bool(self.core.playlist and self.core.playlist.shuffle))
+        shuffle.toggled.connect(self.toggle_shuffle)
+        duplicates = menu.addAction(self.lang('FindDuplicates'), self.show_duplicates)
+        duplicates.setEnabled(bool(self.core.folder_path and self.settings.get('detect_duplicates')))
+        export.setEnabled(self.core.playlist is not None)
+        shuffle.setEnabled(self.core.playlist is not None)
+        play_next.setEnabled(bool(self.core.playlist))
+        menu.exec_(self.openFolderButton.mapToGlobal(point))
+
+
+    def import_playlist(self):
+        path, _ = QFileDialog.getOpenFileName(self, self.lang('OpenPlaylist'), self.core.folder_path or '',
+                                              "Playlists (*.m3u *.m3u8)")
+        if path:
+            self.core.open_playlist(self.core.playlists.import_m3u(path))
+
+
+    def export_playlist(self):
+        path, _ = QFileDialog.getSaveFileName(self, self.lang('ExportPlaylist'), self.core.folder_path or '',
+                                              "Playlists (*.m3u8 *.m3u)")
+        if path:
+            core = self.core
+            root = core.folder_path if core.playlist.tracks is core.music_files else ''
+            core.playlists.export_m3u(core.playlist.tracks, path, root)
             
             
         
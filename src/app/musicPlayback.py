@@ -1,22 +1,249 @@
-from threading import Thread
-from os.path import join
-from PyQt5.QtMultimedia import QMediaContent
-from PyQt5.QtCore import QUrl
+from threading import Lock
+from collections import deque
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from src.app.audioBackend import LOADED_MEDIA, STALLED_MEDIA, BUFFERING_MEDIA, BUFFERED_MEDIA
+from src.utils.metrics import METRICS
 
 
-class MediaPlaybackThread(Thread):
-    def __init__(self, media_player, folder_path, filename, position_slider):
-        super().__init__()
+class TrackPreloader:
+    def __init__(self, media_player):
         self.media_player = media_player
-        self.folder_path = folder_path
-        self.filename = filename
-        self.position_slider = position_slider
+        self.path = None
 
 
-    def run(self):
-        self.media_player.stop()  # Остановка предыдущей песни
-        url = QUrl.fromLocalFile(join(self.folder_path, self.filename))
-        content = QMediaContent(url)
-        self.media_player.setMedia(content)
+    def preload(self, path):
+        # open() on an idle player buffers the file without playing it
+        if path != self.path:
+            self.path = path
+            self.media_player.open(path)
+
+
+    def release(self, path):
+        # the preloaded decode itself, for a player that mixes it in (crossfade)
+        ready = self.media_player.mediaStatus() in (LOADED_MEDIA, BUFFERED_MEDIA)
+        if path != self.path or not ready:
+            return None
+        self.path = None
+        return self.media_player.release()
+
+
+    def take(self, path, replacement):
+        ready = self.media_player.mediaStatus() in (LOADED_MEDIA, BUFFERED_MEDIA)
+        if path != self.path or not ready:
+            return None
+        player, self.media_player, self.path = self.media_player, replacement, None
+        return player
+
+
+class PlaybackController(QObject):
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    mediaStatusChanged = pyqtSignal(int)
+    aboutToFinish = pyqtSignal()
+    commandQueued = pyqtSignal()
+
+    COMMANDS = ('load', 'play', 'pause', 'seek', 'stop', 'volume')
+
+
+    def __init__(self, create_player, parent=None):
+        super().__init__(parent)
+        self.media_player = create_player()
+        self.preloader = TrackPreloader(create_player())
+        self.path = None
+        self.tap = None
+        self.submitted = 0
+        self.executed = 0
+        self.__commands = deque()
+        self.__lock = Lock()
+        self.__connect(self.media_player)
+        # submit() may run on any thread, the queue is always drained on ours
+        self.commandQueued.connect(self.drain, Qt.QueuedConnection)
+
+
+    def submit(self, command, *args):
+        if command not in self.COMMANDS:
+            raise ValueError(f"Unknown playback command: {command}")
+        with self.__lock:
+            self.__commands.append((command, args))
+            self.submitted += 1
+            wake = len(self.__commands) == 1
+        if wake:
+            self.commandQueued.emit()
+
+
+    def load(self, path):
+        self.submit('load', path)
+
+
+    def play(self):
+        self.submit('play')
+
+
+    def pause(self):
+        self.submit('pause')
+
+
+    def stop(self):
+        self.submit('stop')
+
+
+    def seek(self, position):
+        self.submit('seek', position)
+
+
+    def set_volume(self, volume):
+        self.submit('volume', volume)
+
+
+    def position(self):
+        return self.media_player.position()
+
+
+    def duration(self):
+        return self.media_player.duration()
+
+
+    def volume(self):
+        return self.media_player.volume()
+
+
+    def pending(self):
+        with self.__lock:
+            return len(self.__commands)
+
+
+    @staticmethod
+    def collapse(commands):
+        # a load supersedes everything queued before it; runs of seeks or
+        # volume changes only need their last value
+        loads = [index for index, (command, _) in enumerate(commands) if command == 'load']
+        if loads:
+            commands = commands[loads[-1]:]
+        collapsed = []
+        for command, args in commands:
+            if collapsed and command in ('seek', 'volume') and collapsed[-1][0] == command:
+                collapsed[-1] = (command, args)
+            else:
+                collapsed.append((command, args))
+        return collapsed
+
+
+    def drain(self):
+        with self.__lock:
+            commands = list(self.__commands)
+            self.__commands.clear()
+        for command, args in self.collapse(commands):
+            getattr(self, f'_{command}')(*args)
+            self.executed += 1
+
+
+    def _load(self, path):
+        self.path = path
+        if self.media_player.crossfades():
+            # the playing player mixes the new track in itself, taking over the preloaded decode
+            self.media_player.open(path, self.preloader.release(path))
+            METRICS.phase('track_switch', 'load')
+            return
+        player = self.preloader.take(path, self.media_player)
+        if player is not None:
+            self.__swap(player)
+        else:
+            self.media_player.stop()
+            self.media_player.open(path)
+        METRICS.phase('track_switch', 'load')
+
+
+    def _play(self):
         self.media_player.play()
-        
\ No newline at end of file
+
+
+    def _pause(self):
+        self.media_player.pause()
+
+
+    def _seek(self, position):
+        self.media_player.setPosition(max(0, position))
+        METRICS.end('hotkey')
+
+
+    def _stop(self):
+        self.media_player.stop()
+
+
+    def _volume(self, volume):
+        self.media_player.setVolume(volume)
+        METRICS.end('hotkey')
+
+
+    def preload(self, path):
+        self.preloader.preload(path)
+
+
+    def set_tap(self, tap):
+        # tap(block, sample_rate, scale=1.0) follows the playing player across swaps
+        self.tap = tap
+        return self.media_player.set_tap(tap)
+
+
+    def set_seek_index(self, path, index):
+        return self.media_player.set_seek_index(path, index) if path == self.path else False
+
+
+    def set_crossfade(self, ms, curve='equal_power'):
+        self.preloader.media_player.set_crossfade(ms, curve)
+        return self.media_player.set_crossfade(ms, curve)
+
+
+    def set_notify_interval(self, interval):
+        self.media_player.setNotifyInterval(interval)
+        self.preloader.media_player.setNotifyInterval(interval)
+
+
+    def __swap(self, player):
+        # the preloaded player is already buffered, so play() starts without a gap
+        previous = self.media_player
+        self.__disconnect(previous)
+        if self.tap is not None:
+            previous.set_tap(None)
+            player.set_tap(self.tap)
+        player.setVolume(previous.volume())
+        previous.stop()
+        self.media_player = player
+        self.__connect(player)
+        self.durationChanged.emit(player.duration())
+
+
+    def __connect(self, player):
+        player.mediaStatusChanged.connect(self.__media_status_changed)
+        player.positionChanged.connect(self.__position_changed)
+        player.durationChanged.connect(self.durationChanged)
+        if hasattr(player, 'aboutToFinish'):
+            player.aboutToFinish.connect(self.aboutToFinish)
+
+
+    def __disconnect(self, player):
+        player.mediaStatusChanged.disconnect(self.__media_status_changed)
+        player.positionChanged.disconnect(self.__position_changed)
+        player.durationChanged.disconnect(self.durationChanged)
+        if hasattr(player, 'aboutToFinish'):
+            player.aboutToFinish.disconnect(self.aboutToFinish)
+
+
+    def __media_status_changed(self, status):
+        if status == LOADED_MEDIA:
+            METRICS.phase('track_switch', 'loaded')
+        elif status == BUFFERED_MEDIA:
+            METRICS.phase('track_switch', 'buffered')
+            METRICS.end('playback.stall')
+        elif status == STALLED_MEDIA:
+            METRICS.count('playback.stalls')
+            METRICS.begin('playback.stall', path=self.path)
+        elif status == BUFFERING_MEDIA:
+            METRICS.end('playback.stall')
+        self.mediaStatusChanged.emit(status)
+
+
+    def __position_changed(self, position):
+        if position:
+            METRICS.end('track_switch')
+        self.positionChanged.emit(position)
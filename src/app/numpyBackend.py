@@ -0,0 +1,173 @@
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+from src.app.audioBackend import (NO_MEDIA, LOADING_MEDIA, LOADED_MEDIA, BUFFERED_MEDIA, END_OF_MEDIA, INVALID_MEDIA,
+                                  STOPPED, PLAYING, PAUSED)
+from src.utils.audioEngine import BUFFER_MS, PERIOD_FRAMES, AudioEngine, create_sink
+
+
+class NumpyBackend(QObject):
+    # the QMediaPlayer surface PlaybackController uses, driven by AudioEngine
+    mediaStatusChanged = pyqtSignal(int)
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    stateChanged = pyqtSignal(int)
+    # crossfade_ms before the end, time to open the next track
+    aboutToFinish = pyqtSignal()
+    engineEvent = pyqtSignal(str)
+
+    EVENTS = {'buffered': BUFFERED_MEDIA, 'end': END_OF_MEDIA, 'invalid': INVALID_MEDIA}
+
+
+    def __init__(self, settings=None, sink=None, parent=None):
+        super().__init__(parent)
+        get = settings.get if settings is not None else (lambda key: None)
+        self.engine = AudioEngine(sink or create_sink(get('audio_sink') or 'auto'),
+                                  get('audio_buffer_ms') or BUFFER_MS, get('audio_period') or PERIOD_FRAMES,
+                                  on_event=self.engineEvent.emit)
+        self.set_crossfade(get('crossfade_ms') or 0, get('crossfade_curve') or 'equal_power')
+        self.__status = NO_MEDIA
+        self.__state = STOPPED
+        self.__volume = 100
+        # engine events come from the decoder and sink threads
+        self.engineEvent.connect(self.__engine_event, Qt.QueuedConnection)
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(lambda: self.positionChanged.emit(self.position()))
+
+
+    def open(self, path, preloaded=None):
+        # while playing with a crossfade set, the current track fades out under the new one;
+        # `preloaded` is what release() returned on the player that preloaded `path`
+        crossfade = self.crossfades()
+        if not crossfade:
+            self.__set_state(STOPPED)
+        self.__set_status(LOADING_MEDIA)
+        try:
+            self.engine.open(path, crossfade, preloaded)
+        except (OSError, ValueError):
+            self.engine.close()
+            self.__set_status(INVALID_MEDIA)
+            return
+        self.__set_status(LOADED_MEDIA)
+        self.durationChanged.emit(self.duration())
+
+
+    def release(self):
+        self.timer.stop()
+        self.__set_state(STOPPED)
+        self.__set_status(NO_MEDIA)
+        return self.engine.release()
+
+
+    def mediaStatus(self):
+        return self.__status
+
+
+    def state(self):
+        return self.__state
+
+
+    def isMetaDataAvailable(self):
+        # tags come from the library index, not from the backend
+        return self.__status in (LOADED_MEDIA, BUFFERED_MEDIA)
+
+
+    def play(self):
+        if self.__status == END_OF_MEDIA:
+            self.engine.seek(0)
+            self.__set_status(BUFFERED_MEDIA)
+        self.engine.play()
+        if self.engine.playing:
+            self.timer.start()
+            self.__set_state(PLAYING)
+
+
+    def pause(self):
+        self.engine.pause()
+        self.timer.stop()
+        self.__set_state(PAUSED)
+
+
+    def stop(self):
+        self.engine.stop()
+        self.timer.stop()
+        self.__set_state(STOPPED)
+        self.positionChanged.emit(0)
+
+
+    def setPosition(self, position):
+        self.engine.seek(position * self.engine.sample_rate // 1000)
+        self.positionChanged.emit(self.position())
+
+
+    def position(self):
+        rate = self.engine.sample_rate
+        return self.engine.frame * 1000 // rate if rate else 0
+
+
+    def duration(self):
+        rate, frames = self.engine.sample_rate, self.engine.frames
+        return frames * 1000 // rate if rate and frames is not None else 0
+
+
+    def set_crossfade(self, ms, curve='equal_power'):
+        self.engine.crossfade_ms = max(0, ms)
+        self.engine.curve = curve
+        return True
+
+
+    def crossfades(self):
+        return self.__state == PLAYING and self.engine.crossfade_ms > 0
+
+
+    def set_tap(self, tap):
+        # called on the GUI thread; the engine calls tap() on the sink thread
+        self.engine.tap = tap
+        return True
+
+
+    def set_seek_index(self, path, index):
+        return self.engine.set_seek_index(path, index)
+
+
+    def setVolume(self, volume):
+        self.__volume = max(0, min(100, volume))
+        self.engine.volume = self.__volume / 100
+
+
+    def volume(self):
+        return self.__volume
+
+
+    def setNotifyInterval(self, interval):
+        self.timer.setInterval(interval)
+
+
+    def notifyInterval(self):
+        return self.timer.interval()
+
+
+    def __engine_event(self, event):
+        if event == 'ending':
+            # queued: a track switched in meanwhile has not reached its end
+            if self.engine.track is not None and self.engine.track.ending:
+                self.aboutToFinish.emit()
+            return
+        status = self.EVENTS[event]
+        if status == END_OF_MEDIA:
+            self.timer.stop()
+            self.positionChanged.emit(self.duration())
+            self.__set_state(STOPPED)
+        self.__set_status(status)
+
+
+    def __set_status(self, status):
+        if status != self.__status:
+            self.__status = status
+            self.mediaStatusChanged.emit(status)
+
+
+    def __set_state(self, state):
+        if state != self.__state:
+            self.__state = state
+            self.stateChanged.emit(state)
@@ -0,0 +1,310 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from src.app.musicPlayback import PlaybackController
+from src.app.audioBackend import BUFFERED_MEDIA, END_OF_MEDIA, create_backend
+from src.app.libraryScan import MetadataScanThread, LoudnessScanThread, FingerprintScanThread
+from src.app.folderWatcher import FolderWatcher
+from src.utils.library import Library
+from src.utils.playlist import PlaylistStore
+from src.utils.metrics import METRICS
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+
+SCANS = {'metadata': MetadataScanThread, 'loudness': LoudnessScanThread, 'fingerprints': FingerprintScanThread}
+
+
+class PlayerCore(QObject):
+    # library, playlists, folder watching and playback without any widgets;
+    # MainWindow and PlayerDaemon each put their own surface on top of one
+    trackChanged = pyqtSignal(str)
+    playingChanged = pyqtSignal(bool)
+    playlistOpened = pyqtSignal(str, int)
+    # the track after the current one may have changed and has been preloaded
+    upcomingChanged = pyqtSignal()
+    scanFinished = pyqtSignal(str, object)
+    # (folder, renames, stats) of a watcher batch applied on the update thread
+    libraryUpdated = pyqtSignal(str, object, object)
+
+
+    def __init__(self, settings, autoplay=True, fingerprints=False, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.library = Library(os.path.join(os.path.dirname(settings.filename), 'library.sqlite'))
+        self.playlists = PlaylistStore(self.library)
+        self.folder_path = self.settings.get('path_to_music')
+        self.music_files = []
+        self.playlist = None
+        self.folder_watcher = None
+        self.playing = False
+        self.track_gain = 1.0
+        # the window starts the restored track, a headless player waits to be told
+        self.autoplay = autoplay
+        # fingerprints only serve the downloader's duplicate check
+        self.fingerprints = fingerprints
+        self.scans = {}
+        self.rescans = set()
+        # scan threads report back here, on this thread
+        self.scanFinished.connect(self.scan_finished, Qt.QueuedConnection)
+        # watcher batches go to the library one at a time, in order, off this thread
+        self.updates = ThreadPoolExecutor(max_workers=1, thread_name_prefix='library')
+        self.libraryUpdated.connect(self.library_updated, Qt.QueuedConnection)
+        self.closed = False
+
+        # every session starts at the start volume; a change to it waits for the next start
+        if self.settings.get('def_volume') is not None:
+            self.settings.set('current_volume', max(0, min(100, self.settings.get('def_volume'))))
+        self.playback = PlaybackController(self.create_player, self)
+        self.playback.mediaStatusChanged.connect(self.media_status_changed)
+        # only the numpy backend fades; it asks for the next track crossfade_ms early
+        self.playback.aboutToFinish.connect(self.next_song)
+        self.playback.set_volume(self.settings.get('current_volume'))
+        self.settings.subscribe(self.apply_setting)
+
+
+    def create_player(self):
+        player = create_backend(self.settings.get('audio_backend') or 'qt', self.settings)
+        player.setNotifyInterval(self.settings.get('interval_update_music'))
+        return player
+
+
+    def apply_setting(self, key, value):
+        if key == 'interval_update_music':
+            self.playback.set_notify_interval(value)
+        elif key in ('crossfade_ms', 'crossfade_curve'):
+            self.playback.set_crossfade(self.settings.get('crossfade_ms') or 0,
+                                        self.settings.get('crossfade_curve') or 'equal_power')
+        elif key == 'current_volume':
+            self.apply_volume(value)
+        elif key == 'detect_duplicates':
+            if value and self.fingerprints and self.music_files:
+                self.scan_fingerprints()
+        elif key == 'path_to_music' and value != self.folder_path:
+            self.folder_path = value
+            self.set_music()
+
+
+    def set_music(self):
+        recursive = bool(self.settings.get('recursive_scan'))
+        self.library.scan(self.folder_path, recursive)
+        self.music_files = self.library.tracks(self.folder_path, recursive)
+        self.watch_folder()
+        self.start_scans()
+        with self.settings.transaction():
+            self.settings.set('path_to_music', self.folder_path)
+            self.settings.set("count_musics", len(self.music_files))
+        self.open_playlist(self.settings.get('playlist') or self.folder_path)
+
+
+    def open_playlist(self, name):
+        # the folder itself is a playlist named after its path; anything else was imported
+        if name != self.folder_path and name in self.playlists.names():
+            self.playlist = self.playlists.open(name)
+        else:
+            name, self.playlist = '', self.playlists.open(self.folder_path, self.music_files)
+        self.settings.set('playlist', name)
+        self.playlistOpened.emit(name, len(self.playlist))
+        if len(self.playlist):
+            self.play_song(self.playlist.current(), start=self.autoplay)
+            self.playlists.save(self.playlist)
+
+
+    def refresh_music(self):
+        # picks up finished downloads without restarting the current track
+        if not self.folder_path:
+            return
+        if not self.music_files:
+            return self.set_music()
+        self.library.scan(self.folder_path, self.music_files.recursive)
+        self.refresh_tracks()
+
+
+    def watch_folder(self):
+        if self.folder_watcher is not None:
+            self.folder_watcher.close()
+            self.folder_watcher.deleteLater()
+        self.folder_watcher = FolderWatcher(self.folder_path, self.music_files.recursive, parent=self)
+        self.folder_watcher.changed.connect(self.folder_changed)
+
+
+    def folder_changed(self, paths, renames):
+        folder = self.folder_path
+        future = self.updates.submit(self.update_library, folder, self.music_files.recursive, paths)
+        future.add_done_callback(lambda done: self.__updated(folder, renames, done))
+
+
+    def update_library(self, folder, recursive, paths):
+        # on the update thread, with its own connection: only the touched files are
+        # applied; None means the watcher lost track and polls
+        library = Library(self.library.filename)
+        try:
+            return library.scan(folder, recursive) if paths is None else library.update(paths)
+        finally:
+            library.close()
+
+
+    def __updated(self, folder, renames, future):
+        if not self.closed and not future.cancelled() and future.exception() is None:
+            self.libraryUpdated.emit(folder, renames, future.result())
+
+
+    def library_updated(self, folder, renames, stats):
+        # a batch for a folder that has been switched away from meanwhile is dropped
+        if folder == self.folder_path and (stats['added'] or stats['removed'] or stats['updated']):
+            self.refresh_tracks(renames)
+
+
+    def refresh_tracks(self, renames=None):
+        # the current track and its position are left alone
+        was_empty = not len(self.music_files)
+        next_song = self.playlist.peek_next() if self.playlist is not None else None
+        if self.playlist is not None and self.playlist.tracks is self.music_files:
+            self.playlist.refresh({os.path.relpath(old, self.folder_path): os.path.relpath(new, self.folder_path)
+                                   for old, new in (renames or {}).items()})
+        else:
+            self.music_files.refresh()
+        self.settings.set("count_musics", len(self.music_files))
+        self.start_scans()
+        if was_empty and len(self.music_files):
+            self.open_playlist(self.settings.get('playlist') or self.folder_path)
+        elif self.playlist is not None and self.playlist.peek_next() != next_song:
+            self.preload_next()
+
+
+    def start_scans(self):
+        # each thread only analyses new or changed tracks
+        self.start_scan('metadata')
+        if self.settings.get('normalize_volume'):
+            self.start_scan('loudness')
+        if self.fingerprints and self.settings.get('detect_duplicates'):
+            self.scan_fingerprints()
+
+
+    def scan_fingerprints(self):
+        # only new or changed tracks are decoded, the rest come from the index
+        self.start_scan('fingerprints')
+
+
+    def start_scan(self, kind):
+        # one thread (and worker pool) per kind: a request while it runs becomes a
+        # single pass after it, over whatever folder is current by then
+        running = self.scans.get(kind)
+        if running is not None and running.is_alive():
+            self.rescans.add(kind)
+            return
+        self.scans[kind] = SCANS[kind](self.library.filename, self.folder_path, self.music_files.recursive,
+                                       on_done=lambda thread: self.scanFinished.emit(kind, thread))
+        self.scans[kind].start()
+
+
+    def scan_finished(self, kind, thread):
+        if self.scans.get(kind) is thread:
+            del self.scans[kind]
+        if kind in self.rescans:
+            self.rescans.discard(kind)
+            self.start_scan(kind)
+
+
+    def play_song(self, filename, start=True):
+        path = os.path.join(self.folder_path, filename)
+        METRICS.begin('track_switch', path=path)
+        self.track_gain = 1.0
+        loudness = self.library.loudness(path) if self.settings.get('normalize_volume') else None
+        if loudness:
+            # numpy only comes in once a track has been analysed
+            from src.utils.loudness import gain_factor
+            self.track_gain = gain_factor(loudness['gain'])
+        self.trackChanged.emit(path)
+        self.playback.load(path)
+        self.apply_volume(self.settings.get('current_volume'))
+        if start:
+            self.playback.play()
+        self.set_playing(start)
+
+
+    def set_playing(self, playing):
+        if playing != self.playing:
+            self.playing = playing
+            self.playingChanged.emit(playing)
+
+
+    def play(self):
+        if self.playlist is not None and len(self.playlist) and not self.playing:
+            self.playback.play()
+            self.set_playing(True)
+
+
+    def pause(self):
+        if self.playing:
+            self.playback.pause()
+            self.set_playing(False)
+
+
+    def toggle(self):
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+
+
+    def next_song(self):
+        if self.playlist is not None and len(self.playlist) > 0:
+            self.play_song(self.playlist.next())
+            self.playlists.save(self.playlist)
+
+
+    def prev_song(self):
+        if self.playlist is not None and len(self.playlist) > 0:
+            self.play_song(self.playlist.prev())
+            self.playlists.save(self.playlist)
+
+
+    def enqueue(self, path):
+        self.playlist.enqueue(self.playlist.tracks.index(path))
+        self.preload_next()
+
+
+    def set_shuffle(self, shuffle):
+        self.playlist.set_shuffle(shuffle)
+        self.playlists.save(self.playlist)
+        self.preload_next()
+
+
+    def apply_volume(self, volume):
+        # per-track normalization gain on top of the user's volume
+        self.playback.set_volume(max(0, min(100, round(volume * self.track_gain))))
+
+
+    def media_status_changed(self, status):
+        if status == END_OF_MEDIA:
+            self.next_song()
+        elif status == BUFFERED_MEDIA:
+            self.preload_next()
+
+
+    def preload_next(self):
+        if self.playlist is not None and len(self.playlist) > 1:
+            self.playback.preload(os.path.join(self.folder_path, self.playlist.peek_next()))
+            self.upcomingChanged.emit()
+
+
+    def title(self, filename):
+        # "artist - title" from the library, else the file name
+        meta = self.library.metadata(os.path.join(self.folder_path, filename)) or {}
+        if meta.get('title'):
+            return ' - '.join(filter(None, (meta.get('artist'), meta['title'])))
+        return os.path.splitext(os.path.basename(filename))[0]
+
+
+    def close(self):
+        # scans and updates still running finish on their own, without reporting to a deleted core
+        self.closed = True
+        self.updates.shutdown(wait=False, cancel_futures=True)
+        for thread in self.scans.values():
+            thread.on_done = None
+        self.rescans.clear()
+        if self.folder_watcher is not None:
+            self.folder_watcher.close()
+        self.playback.stop()
+        self.playback.drain()
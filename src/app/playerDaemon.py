@@ -0,0 +1,104 @@
+import math
+
+from src.app.playerCore import PlayerCore
+from src.app.audioBackend import PLAYING, PAUSED
+from src.app.configWatcher import ConfigWatcher
+from src.utils.metrics import METRICS
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class PlayerDaemon(QObject):
+    # the player without a window: the same PlayerCore as MainWindow, on a
+    # QCoreApplication. State changes go out as playerEvent(name, data) for
+    # the control server to forward
+    playerEvent = pyqtSignal(str, object)
+
+
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        # loaded but silent: a headless box starts playing when told to
+        self.core = PlayerCore(settings, autoplay=False, parent=self)
+        self.core.trackChanged.connect(lambda path: self.playerEvent.emit('track', self.track()))
+        self.core.playingChanged.connect(lambda playing: self.playerEvent.emit('state', {'state': self.state()}))
+        self.core.playlistOpened.connect(lambda name, count: self.playerEvent.emit('playlist',
+                                                                                 {'name': name, 'count': count}))
+        self.core.playback.positionChanged.connect(self.position_changed)
+
+        if self.core.folder_path:
+            self.core.set_music()
+        self.settings.subscribe(self.apply_setting)
+        self.config_watcher = ConfigWatcher(self.settings, parent=self)
+
+
+    def apply_setting(self, key, value):
+        if key == 'current_volume':
+            self.playerEvent.emit('volume', {'volume': value})
+
+
+    def play(self):
+        self.core.play()
+
+
+    def pause(self):
+        self.core.pause()
+
+
+    def toggle(self):
+        self.core.toggle()
+
+
+    def next_song(self):
+        self.core.next_song()
+
+
+    def prev_song(self):
+        self.core.prev_song()
+
+
+    def seek(self, position):
+        position, duration = max(0, int(finite(position))), self.core.playback.duration()
+        self.core.playback.seek(min(position, duration) if duration else position)
+
+
+    def set_volume(self, volume):
+        # stored like a GUI change; apply_setting then applies it and emits 'volume'
+        self.settings.set('current_volume', max(0, min(100, int(finite(volume)))))
+
+
+    def position_changed(self, position):
+        if self.core.playing:
+            self.playerEvent.emit('position', {'position': position, 'duration': self.core.playback.duration()})
+
+
+    def state(self):
+        state = self.core.playback.media_player.state()
+        return 'playing' if self.core.playing else 'paused' if state in (PLAYING, PAUSED) else 'stopped'
+
+
+    def track(self):
+        playlist = self.core.playlist
+        current = playlist.current() if playlist is not None else None
+        if current is None:
+            return {'track': None, 'title': None, 'index': None}
+        return {'track': current, 'title': self.core.title(current), 'index': playlist.current_index}
+
+
+    def status(self):
+        return dict(self.track(), state=self.state(), position=self.core.playback.position(),
+                    duration=self.core.playback.duration(), volume=self.settings.get('current_volume'),
+                    playlist=self.settings.get('playlist'), count=len(self.core.playlist or ()))
+
+
+    def close(self):
+        self.core.close()
+        self.settings.close()
+        METRICS.close()
+
+
+def finite(value) -> float:
+    # JSON numbers from a client: 1e999 parses as inf, which int() cannot take
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"expected a finite number, got {value!r}")
+    return value
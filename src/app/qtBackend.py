@@ -0,0 +1,68 @@
+from PyQt5.QtCore import QUrl
+from PyQt5.QtMultimedia import QAudioFormat, QAudioProbe, QMediaContent, QMediaPlayer
+
+
+SAMPLE_TYPES = {
+    (QAudioFormat.SignedInt, 8): ('i1', 1 / 128),
+    (QAudioFormat.SignedInt, 16): ('<i2', 1 / 32768),
+    (QAudioFormat.SignedInt, 32): ('<i4', 1 / 2147483648),
+    (QAudioFormat.UnSignedInt, 8): ('u1', 1 / 128),
+    (QAudioFormat.Float, 32): ('<f4', 1.0),
+}
+
+
+class QtMediaBackend(QMediaPlayer):
+    # QMediaPlayer already is the backend interface, it only lacks open()
+    def __init__(self, settings=None):
+        super().__init__(None, QMediaPlayer.StreamPlayback)
+        self.probe = None
+        self.tap = None
+
+
+    def open(self, path):
+        self.setMedia(QMediaContent(QUrl.fromLocalFile(path)))
+
+
+    def set_crossfade(self, ms, curve='equal_power'):
+        # one QMediaPlayer plays one source; fading between two needs the numpy backend
+        return False
+
+
+    def crossfades(self):
+        return False
+
+
+    def set_seek_index(self, path, index):
+        # QMediaPlayer seeks inside the platform's decoder
+        return False
+
+
+    def set_tap(self, tap):
+        # False where the platform's media service can't be probed (DirectShow, some
+        # GStreamer builds); the tap then simply never sees audio
+        self.tap = tap
+        if tap is None:
+            if self.probe is not None:
+                self.probe.audioBufferProbed.disconnect(self.__probed)
+                self.probe.deleteLater()
+                self.probe = None
+            return True
+        if self.probe is None:
+            self.probe = QAudioProbe(self)
+            self.probe.audioBufferProbed.connect(self.__probed)
+        return self.probe.setSource(self)
+
+
+    def __probed(self, buffer):
+        # GUI thread; the buffer is only valid during this call
+        import numpy as np
+        form = buffer.format()
+        sample = SAMPLE_TYPES.get((form.sampleType(), form.sampleSize()))
+        if sample is None or not buffer.frameCount() or self.tap is None:
+            return
+        data = buffer.constData()
+        data.setsize(buffer.byteCount())
+        block = np.frombuffer(data, dtype=sample[0]).reshape(-1, form.channelCount())
+        if form.sampleType() == QAudioFormat.UnSignedInt:
+            block = block.astype(np.float32) - 128
+        self.tap(block, form.sampleRate(), sample[1])
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from src.utils.seekIndex import SeekIndexCache
+
+
+class SeekCoalescer(QObject):
+    indexReady = pyqtSignal(str, object)
+    seekRequested = pyqtSignal('qint64', bool)
+
+
+    def __init__(self, playback, cache_dir, delay=40, parent=None):
+        super().__init__(parent)
+        self.playback = playback
+        self.cache = SeekIndexCache(cache_dir)
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='seek-index')
+        self.path = None
+        self.index = None
+        self.target = None
+        self.requests = 0
+        self.seeks = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.flush)
+        self.indexReady.connect(self.set_index)
+        # hotkeys fire on the keyboard thread, the timer lives on ours
+        self.seekRequested.connect(self.__request, Qt.QueuedConnection)
+
+
+    def set_track(self, path):
+        self.path = path
+        self.index = None
+        self.target = None
+        self.timer.stop()
+        if path.lower().endswith('.mp3'):
+            future = self.pool.submit(self.cache.load, path)
+            future.add_done_callback(lambda done: self.__loaded(path, done))
+
+
+    def __loaded(self, path, future):
+        if not future.cancelled() and future.exception() is None:
+            self.indexReady.emit(path, future.result())
+
+
+    def set_index(self, path, index):
+        if path == self.path and len(index):
+            self.index = index
+            # the decoder then seeks straight to time_to_byte() instead of decoding from the top
+            self.playback.set_seek_index(path, index)
+
+
+    def duration(self):
+        return self.index.duration() if self.index is not None else self.playback.duration()
+
+
+    def seek_by(self, delta):
+        self.seekRequested.emit(delta, True)
+
+
+    def seek_to(self, position):
+        self.seekRequested.emit(position, False)
+
+
+    def __request(self, value, relative):
+        # a held arrow key keeps moving one pending target instead of queueing seeks
+        if relative:
+            value += self.target if self.target is not None else self.playback.position()
+        duration = self.duration()
+        self.target = max(0, min(value, duration)) if duration > 0 else max(0, value)
+        self.requests += 1
+        if not self.timer.isActive():
+            self.timer.start()
+
+
+    def flush(self):
+        if self.target is None:
+            return
+        target, self.target = self.target, None
+        if self.index is not None:
+            target = self.index.snap(target)
+        self.playback.seek(target)
+        self.seeks += 1
+
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,3 @@
-from os import execl as osExecl
-from sys import executable as sysExct, argv as sysArgv
-from src.utils.parse import Settings, Language
 from PyQt5.QtWidgets import (QWidget, 
                              QVBoxLayout, 
                              QPushButton, 
@@ -11,11 +8,12 @@ from PyQt5.QtWidgets import (QWidget,
 
 
 class SettingsWindow(QWidget):
-    def __init__(self, style):
+    def __init__(self, style, settings, language):
         super().__init__()
 
-        self.settings = Settings('config\\settings.toml')
-        self.lang = Language('config\\language.toml', self.settings.get('language'))
+        # shared with MainWindow, which applies every change as it is set
+        self.settings = settings
+        self.lang = language
         self.lg = self.lang.get 
         self.setStyleSheet(style)
         self.setWindowTitle('Settings')
@@ -36,7 +34,7 @@ class SettingsWindow(QWidget):
              "type": int},
             
             {"label": f"{self.lg('IntervalToMoveMusic')}:", 
-             "key": 'interval_move_music', 
+             "key": 'step_music', 
              "type": int},
             
             {"label": f"{self.lg('StartVolume')}:", 
@@ -93,20 +91,18 @@ class SettingsWindow(QWidget):
 
 
     def saveSettings(self):
-        for field in self.settings_fields:
-            if "options" in field:
-                self.settings.set(field["key"], field["edit"].currentText())
-                
-            # elif isinstance(field["key"], tuple):
-                # self.settings.set(field["key"], field["edit"].text())
-                # self.settings.set(field["key"], field["edit"][1].text())
-                # print(field["edit"][0],field["edit"][1], 2)
-                
-            else:
-                self.settings.set(field["key"], field["type"](field["edit"].text()))
+        with self.settings.transaction():
+            for field in self.settings_fields:
+                if "options" in field:
+                    self.settings.set(field["key"], field["edit"].currentText())
+                    
+                # elif isinstance(field["key"], tuple):
+                    # self.settings.set(field["key"], field["edit"].text())
+                    # self.settings.set(field["key"], field["edit"][1].text())
+                    # print(field["edit"][0],field["edit"][1], 2)
+                    
+                else:
+                    self.settings.set(field["key"], field["type"](field["edit"].text()))
                 
         self.close()
-        
-        __win = sysExct
-        osExecl(__win, __win, *sysArgv)
         
\ No newline at end of file
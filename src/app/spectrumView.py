@@ -0,0 +1,99 @@
+from time import perf_counter
+from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QWidget
+
+
+class SpectrumView(QWidget):
+    # bars redrawn at `fps` from whatever the playback tap collected since the last
+    # frame; the frame budget trades FFT size and bar count for CPU under load
+    BAR_COLOR = QColor('#c0c0c0')
+
+
+    def __init__(self, fps=30, parent=None):
+        super().__init__(parent)
+        self.fps = fps
+        self.tap = None
+        self.analyzer = None
+        self.budget = None
+        self.playback = None
+        self.frames = 0
+        self.__due = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+
+    def attach(self, playback):
+        # NumPy is only needed once something plays
+        from src.utils.spectrum import FrameBudget, SampleTap, SpectrumAnalyzer
+        if self.tap is None:
+            self.tap = SampleTap()
+            self.analyzer = SpectrumAnalyzer()
+            self.budget = FrameBudget(self.fps or 30)
+        self.playback = playback
+        playback.set_tap(self.tap.write)
+        self.resume()
+
+
+    def detach(self):
+        self.timer.stop()
+        if self.playback is not None:
+            self.playback.set_tap(None)
+            self.playback = None
+
+
+    def set_fps(self, fps):
+        self.fps = fps
+        self.setVisible(bool(fps))
+        if not fps:
+            self.timer.stop()
+            return
+        if self.budget is not None:
+            self.budget.set_fps(fps)
+        self.resume()
+
+
+    def pause(self):
+        self.timer.stop()
+
+
+    def resume(self):
+        if self.fps and self.playback is not None and not self.timer.isActive():
+            self.__due = None
+            self.timer.start(round(1000 / self.fps))
+
+
+    def level(self):
+        return self.analyzer.level if self.analyzer is not None else 0
+
+
+    def tick(self):
+        now = perf_counter()
+        late = (now - self.__due) * 1000 if self.__due is not None else 0.0
+        self.__due = now + 1 / self.fps
+        if self.analyzer.update(self.tap):
+            # synchronous, so the painting counts against the budget too
+            self.repaint()
+            self.frames += 1
+            step = self.budget.record((perf_counter() - now) * 1000, max(0.0, late))
+            if step:
+                self.analyzer.set_level(self.analyzer.level + step)
+
+
+    def paintEvent(self, event):
+        if self.analyzer is None:
+            return
+        levels = self.analyzer.levels
+        count = len(levels)
+        if not count:
+            return
+        width, height = self.width(), self.height()
+        painter = QPainter(self)
+        for index in range(count):
+            left = index * width // count
+            right = (index + 1) * width // count - 1
+            bar = int(levels[index] * height)
+            if bar:
+                painter.fillRect(left, height - bar, max(1, right - left), bar, self.BAR_COLOR)
+        painter.end()
@@ -0,0 +1,75 @@
+from time import perf_counter, process_time
+from PyQt5.QtCore import QObject, QTimer
+
+
+class UiRefreshScheduler(QObject):
+    def __init__(self, interval, parent=None):
+        super().__init__(parent)
+        self.__pending = {}
+        self.__paused = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+        self.reset_stats()
+
+
+    def set_interval(self, interval):
+        self.timer.setInterval(interval)
+
+
+    def post(self, key, callback, value):
+        # only the latest value per key survives until the next frame
+        if key in self.__pending:
+            self.coalesced += 1
+        self.__pending[key] = (callback, value)
+        self.posted += 1
+        if not self.__paused and not self.timer.isActive():
+            self.timer.start()
+
+
+    def flush(self):
+        if not self.__pending:
+            return
+        pending, self.__pending = self.__pending, {}
+        for callback, value in pending.values():
+            callback(value)
+        self.frames += 1
+        self.repaints += len(pending)
+
+
+    def pause(self):
+        self.__paused = True
+        self.timer.stop()
+
+
+    def resume(self):
+        if self.__paused:
+            self.__paused = False
+            self.flush()
+
+
+    def is_paused(self):
+        return self.__paused
+
+
+    def reset_stats(self):
+        self.posted = 0
+        self.coalesced = 0
+        self.frames = 0
+        self.repaints = 0
+        self.__wall_started = perf_counter()
+        self.__cpu_started = process_time()
+
+
+    def stats(self):
+        wall = max(perf_counter() - self.__wall_started, 1e-9)
+        return {
+            'posted': self.posted,
+            'coalesced': self.coalesced,
+            'frames': self.frames,
+            'repaints': self.repaints,
+            'frame_rate': self.frames / wall,
+            'repaint_rate': self.repaints / wall,
+            'cpu_percent': (process_time() - self.__cpu_started) / wall * 100,
+        }
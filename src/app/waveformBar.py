@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QProgressBar
+
+
+class WaveformBar(QProgressBar):
+    peaksReady = pyqtSignal(str, object)
+    # a click or drag on the bar, in ms of the track
+    seekRequested = pyqtSignal('qint64')
+
+    PLAYED_COLOR = QColor('#c0c0c0')
+    REMAINING_COLOR = QColor('#555555')
+    # the wheel halves or doubles the visible span, down to this many ms
+    MIN_ZOOM_MS = 1000
+
+
+    def __init__(self, cache_dir, workers=1, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.cache = None
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='peaks')
+        self.path = None
+        self.peaks = None
+        self.zoom = None
+        self.peaksReady.connect(self.set_peaks)
+
+
+    def set_track(self, path):
+        self.path = path
+        self.peaks = None
+        self.zoom = None
+        self.update()
+        future = self.pool.submit(self.load_peaks, path)
+        future.add_done_callback(lambda done: self.__loaded(path, done))
+
+
+    def load_peaks(self, path):
+        # NumPy and the decoders are imported on the pool thread, off the startup path
+        from src.utils.decoders import can_decode
+        from src.utils.peaks import PeakCache
+        if not can_decode(path):
+            return None
+        if self.cache is None:
+            self.cache = PeakCache(self.cache_dir)
+        return self.cache.load(path)
+
+
+    def __loaded(self, path, future):
+        # runs on the pool thread; the signal delivers the result on the GUI thread
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            self.peaksReady.emit(path, future.result())
+
+
+    def set_peaks(self, path, peaks):
+        if path == self.path:
+            self.peaks = peaks
+            self.update()
+
+
+    def set_zoom(self, start_ms=None, end_ms=None):
+        self.zoom = (start_ms, end_ms) if start_ms is not None else None
+        self.update()
+
+
+    def visible_range(self):
+        if self.zoom is not None:
+            return self.zoom
+        return 0, self.peaks.duration() if self.peaks is not None else self.maximum()
+
+
+    def position_at(self, x):
+        start, end = self.visible_range()
+        return start + max(0, min(x, self.width())) * (end - start) // max(1, self.width())
+
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.maximum():
+            self.seekRequested.emit(self.position_at(event.x()))
+
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton and self.maximum():
+            self.seekRequested.emit(self.position_at(event.x()))
+
+
+    def wheelEvent(self, event):
+        # zooms in and out around the point under the cursor
+        delta = event.angleDelta().y()
+        total = self.peaks.duration() if self.peaks is not None else 0
+        if not delta or not total:
+            return
+        start, end = self.visible_range()
+        at = self.position_at(event.x())
+        span = max(self.MIN_ZOOM_MS, (end - start) // 2 if delta > 0 else (end - start) * 2)
+        if span >= total:
+            return self.set_zoom()
+        start = max(0, min(at - (at - start) * span // max(1, end - start), total - span))
+        self.set_zoom(start, start + span)
+
+
+    def paintEvent(self, event):
+        if self.peaks is None:
+            return super().paintEvent(event)
+
+        width, height = self.width(), self.height()
+        start, end = self.visible_range()
+        rows = self.peaks.window(start, end, width)
+        played = (self.value() - start) * width // max(1, end - start) if self.maximum() else 0
+        middle = height / 2
+
+        painter = QPainter(self)
+        for x, (low, high, _) in enumerate(rows):
+            painter.setPen(self.PLAYED_COLOR if x < played else self.REMAINING_COLOR)
+            painter.drawLine(x, int(middle - high * middle), x, int(middle - low * middle))
+        painter.end()
+
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
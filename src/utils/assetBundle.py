@@ -0,0 +1,82 @@
+import os
+import json
+import mmap
+import struct
+
+
+MAGIC = b'PYAB'
+VERSION = 1
+# magic, version, index length; the JSON index follows, then the data
+HEADER = struct.Struct('<4sII')
+ALIGN = 16
+
+
+def write_bundle(path:str, entries:list[tuple[str, bytes, dict]]) -> int:
+    # entries: (name, data, meta); meta is stored in the index as is (width, height, format...)
+    index, offset = {}, 0
+    for name, data, meta in entries:
+        index[name] = dict(meta, offset=offset, length=len(data))
+        offset += -(-len(data) // ALIGN) * ALIGN
+    index_bytes = json.dumps(index, separators=(',', ':')).encode()
+    # the data starts aligned so image rows can be used straight from the map
+    start = -(-(HEADER.size + len(index_bytes)) // ALIGN) * ALIGN
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        f.write(b'\0' * (start - HEADER.size - len(index_bytes)))
+        for name, data, _ in entries:
+            f.write(data)
+            f.write(b'\0' * (-len(data) % ALIGN))
+    os.replace(tmp_path, path)
+    return start + offset
+
+
+class AssetBundle:
+    # a read-only memory map of a bundle written by write_bundle(): opening it
+    # reads the index only, the pages of an asset are touched when it is used
+    def __init__(self, path:str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, index_length = HEADER.unpack_from(self.__map)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path}: not a version {VERSION} asset bundle")
+            self.index = json.loads(self.__map[HEADER.size:HEADER.size + index_length])
+        except (struct.error, ValueError):
+            self.__map.close()
+            raise
+        self.__start = -(-(HEADER.size + index_length) // ALIGN) * ALIGN
+        self.__view = memoryview(self.__map)
+
+
+    def __contains__(self, name:str) -> bool:
+        return name in self.index
+
+
+    def names(self) -> list[str]:
+        return list(self.index)
+
+
+    def meta(self, name:str) -> dict | None:
+        return self.index.get(name)
+
+
+    def get(self, name:str) -> memoryview | None:
+        # a view into the map, valid until close()
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        start = self.__start + entry['offset']
+        return self.__view[start:start + entry['length']]
+
+
+    def text(self, name:str) -> str | None:
+        data = self.get(name)
+        return None if data is None else str(data, 'utf-8')
+
+
+    def close(self) -> None:
+        self.__view.release()
+        self.__map.close()
@@ -0,0 +1,487 @@
+import wave
+from collections import deque
+from importlib.util import find_spec
+from threading import Event, Thread
+from time import perf_counter
+
+import numpy as np
+
+from src.utils.decoders import open_pcm
+from src.utils.metrics import METRICS
+from src.utils.mixer import RAMP_MS, Crossfade, GainRamp, Mixer
+
+
+BUFFER_MS = 250
+PERIOD_FRAMES = 1024
+
+
+class RingBuffer:
+    # single producer / single consumer: each side only ever advances its own
+    # counter, so neither needs a lock
+    def __init__(self, frames:int, channels:int):
+        self.data = np.zeros((frames, channels), dtype=np.float32)
+        self.capacity = frames
+        self.read_index = 0
+        self.write_index = 0
+
+
+    def available(self) -> int:
+        return self.write_index - self.read_index
+
+
+    def free(self) -> int:
+        return self.capacity - self.available()
+
+
+    def writable(self, count:int) -> list[np.ndarray]:
+        # up to two views into the free space, filled in place by the producer
+        count = min(count, self.free())
+        start = self.write_index % self.capacity
+        first = min(count, self.capacity - start)
+        views = [self.data[start:start + first]]
+        if count > first:
+            views.append(self.data[:count - first])
+        return views
+
+
+    def commit(self, count:int) -> None:
+        self.write_index += count
+
+
+    def write(self, block:np.ndarray) -> int:
+        written = 0
+        for view in self.writable(len(block)):
+            view[:] = block[written:written + len(view)]
+            written += len(view)
+        self.commit(written)
+        return written
+
+
+    def read(self, out:np.ndarray) -> int:
+        count = min(len(out), self.available())
+        start = self.read_index % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        out[first:count] = self.data[:count - first]
+        self.read_index += count
+        return count
+
+
+    def skip_to(self, index:int) -> None:
+        self.read_index = max(self.read_index, min(index, self.write_index))
+
+
+class ThreadSink:
+    # pulls one period at a time on its own thread, paced like a sound card
+    # when `realtime` is set, otherwise as fast as the decoder can fill it
+    def __init__(self, realtime:bool = True):
+        self.realtime = realtime
+        self.frames = 0
+        self.__thread = None
+        self.__stop = Event()
+
+
+    def start(self, sample_rate:int, channels:int, period:int, pull) -> None:
+        self.stop()
+        self.open(sample_rate, channels)
+        self.__stop.clear()
+        self.__thread = Thread(target=self.__run, args=(sample_rate, channels, period, pull),
+                               name='audio-sink', daemon=True)
+        self.__thread.start()
+
+
+    def stop(self) -> None:
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+            self.close()
+
+
+    def __run(self, sample_rate, channels, period, pull):
+        buffer = np.zeros((period, channels), dtype=np.float32)
+        deadline = perf_counter()
+        while not self.__stop.is_set():
+            pull(buffer, not self.realtime)
+            self.write(buffer)
+            self.frames += period
+            if self.realtime:
+                deadline += period / sample_rate
+                delay = deadline - perf_counter()
+                if delay > 0:
+                    self.__stop.wait(delay)
+
+
+    def open(self, sample_rate:int, channels:int) -> None:
+        pass
+
+
+    def write(self, block:np.ndarray) -> None:
+        pass
+
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(ThreadSink):
+    pass
+
+
+class FileSink(ThreadSink):
+    def __init__(self, path:str, realtime:bool = False):
+        super().__init__(realtime)
+        self.path = path
+        self.file = None
+
+
+    def open(self, sample_rate:int, channels:int) -> None:
+        self.file = wave.open(self.path, 'wb')
+        self.file.setnchannels(channels)
+        self.file.setsampwidth(2)
+        self.file.setframerate(sample_rate)
+
+
+    def write(self, block:np.ndarray) -> None:
+        self.file.writeframes((np.clip(block, -1, 1) * 32767).astype('<i2').tobytes())
+
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class SoundDeviceSink:
+    # the device callback is the consumer, no extra thread on our side
+    def __init__(self):
+        self.frames = 0
+        self.stream = None
+
+
+    def start(self, sample_rate:int, channels:int, period:int, pull) -> None:
+        import sounddevice
+
+        def callback(outdata, frames, time, status):
+            pull(outdata)
+            self.frames += frames
+
+        self.stop()
+        self.stream = sounddevice.OutputStream(samplerate=sample_rate, channels=channels, blocksize=period,
+                                               dtype='float32', callback=callback)
+        self.stream.start()
+
+
+    def stop(self) -> None:
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+def create_sink(name:str = 'auto'):
+    # "auto", "sounddevice", "null" or "file:<path>"
+    if name.startswith('file:'):
+        return FileSink(name[5:])
+    if name == 'sounddevice' or name == 'auto' and find_spec('sounddevice') is not None:
+        return SoundDeviceSink()
+    if name in ('auto', 'null'):
+        return NullSink()
+    raise ValueError(f"Unknown audio sink: {name}")
+
+
+class EngineTrack:
+    # everything the decoder thread shares with the sink for one opened file;
+    # a new track object per open() keeps a finishing decoder from touching the next
+    def __init__(self, stream, ring:RingBuffer):
+        self.stream = stream
+        self.ring = ring
+        self.closed = False
+        self.eof = False
+        # seeks are numbered: the decoder answers request n with jump n, which
+        # the sink applies by skipping the ring past everything decoded before it
+        self.requested = 0
+        self.seek_request = (0, 0)
+        self.jump = (0, 0, 0)
+        self.applied = 0
+        self.ending = False
+        self.space = Event()
+        self.filled = Event()
+
+
+class AudioEngine:
+    # decoder thread -> RingBuffer -> sink; `on_event` receives 'buffered', 'end',
+    # 'invalid' and, with a crossfade set, 'ending' from audio threads
+    def __init__(self, sink, buffer_ms:int = BUFFER_MS, period:int = PERIOD_FRAMES, on_event=None, history:int = 100):
+        self.sink = sink
+        self.buffer_ms = buffer_ms
+        self.period = period
+        self.on_event = on_event or (lambda event: None)
+        # tap(block, sample_rate) sees every played block before the volume is applied
+        self.tap = None
+        self.track = None
+        self.ramp = GainRamp(period)
+        # open(path, crossfade=True) while playing keeps the old track decoding
+        # and fades between the two for crossfade_ms
+        self.crossfade_ms = 0
+        self.curve = 'equal_power'
+        self.fade = None
+        self.mixer = None
+        self.playing = False
+        self.frame = 0
+        self.underruns = 0
+        self.start_latencies = deque(maxlen=history)
+        self.seek_latencies = deque(maxlen=history)
+        self.__sink_format = None
+        self.__waiting = None
+
+
+    @property
+    def sample_rate(self) -> int:
+        return self.track.stream.sample_rate if self.track is not None else 0
+
+
+    @property
+    def frames(self) -> int | None:
+        return self.track.stream.frames if self.track is not None else None
+
+
+    @property
+    def volume(self) -> float:
+        return self.ramp.target
+
+
+    @volume.setter
+    def volume(self, volume:float) -> None:
+        # ramped while playing; before that it simply applies from the first block
+        self.ramp.set(volume, (self.sample_rate or 44100) * RAMP_MS // 1000 if self.playing else 0)
+
+
+    def open(self, path:str, crossfade:bool = False, preloaded:EngineTrack = None) -> bool:
+        # True when the new track fades in over the still playing one; `preloaded`
+        # is another engine's released track for `path`, decoder thread included
+        outgoing = self.track if crossfade and self.crossfade_ms > 0 and self.playing else None
+        if outgoing is None:
+            self.close()
+        stream = preloaded.stream if preloaded is not None else open_pcm(path)
+        if outgoing is not None and (stream.sample_rate, stream.channels) != (outgoing.stream.sample_rate,
+                                                                             outgoing.stream.channels):
+            # different formats would need a resampler, switch hard instead
+            outgoing = None
+            self.close()
+        if preloaded is not None:
+            track = preloaded
+        else:
+            ring = RingBuffer(max(self.period * 2, stream.sample_rate * self.buffer_ms // 1000), stream.channels)
+            track = EngineTrack(stream, ring)
+        if outgoing is not None:
+            if self.mixer is None or not self.mixer.fits(self.period, stream.channels):
+                self.mixer = Mixer(self.period, stream.channels)
+            self.__drop_fade()
+            # published before the track: the sink only mixes a fade whose incoming is the current track
+            self.fade = Crossfade(track, outgoing, stream.sample_rate * self.crossfade_ms // 1000, self.curve)
+        self.track, self.frame = track, 0
+        if preloaded is None:
+            Thread(target=self.__produce, args=(track,), name='audio-decoder', daemon=True).start()
+        else:
+            # its decoder reports to the engine that opened it, which let go of it
+            self.on_event('buffered')
+        return outgoing is not None
+
+
+    def release(self) -> EngineTrack | None:
+        # hands the open track, still decoding, to another engine's open()
+        self.playing = False
+        track, self.track = self.track, None
+        return track
+
+
+    def close(self) -> None:
+        self.playing = False
+        self.__drop_fade()
+        track, self.track = self.track, None
+        if track is not None:
+            track.closed = True
+            track.space.set()
+
+
+    def __drop_fade(self) -> None:
+        fade, self.fade = self.fade, None
+        if fade is not None:
+            fade.outgoing.closed = True
+            fade.outgoing.space.set()
+
+
+    def play(self) -> None:
+        if self.track is None:
+            return
+        self.__waiting = (self.start_latencies, perf_counter(), self.track.requested)
+        self.playing = True
+        form = (self.track.stream.sample_rate, self.track.stream.channels)
+        if form != self.__sink_format:
+            self.sink.start(*form, self.period, self.pull)
+            self.__sink_format = form
+
+
+    def pause(self) -> None:
+        # the sink keeps pulling silence so resuming costs no device restart
+        self.playing = False
+
+
+    def stop(self) -> None:
+        self.playing = False
+        self.sink.stop()
+        self.__sink_format = None
+        self.__drop_fade()
+        self.seek(0)
+
+
+    def seek(self, frame:int) -> None:
+        track = self.track
+        if track is not None:
+            frames = track.stream.frames
+            self.frame = max(0, min(frame, frames)) if frames is not None else max(0, frame)
+            track.requested += 1
+            track.seek_request = (track.requested, self.frame)
+            track.space.set()
+            if self.playing:
+                self.__waiting = (self.seek_latencies, perf_counter(), track.requested)
+
+
+    def set_seek_index(self, path:str, index) -> bool:
+        # streams that can jump to a frame's byte offset take the index; the rest seek as before
+        track = self.track
+        if track is None or getattr(track.stream, 'path', None) != path or not hasattr(track.stream, 'seek_index'):
+            return False
+        track.stream.seek_index = index
+        return True
+
+
+    def buffered_ms(self) -> int:
+        track = self.track
+        if track is None:
+            return 0
+        return (track.ring.available() + self.period) * 1000 // track.stream.sample_rate
+
+
+    def pull(self, out:np.ndarray, wait:bool = False) -> int:
+        # runs on the sink thread: copy, mix and scale in place, never allocate;
+        # offline sinks `wait` for the decoder instead of taking an underrun
+        track = self.track
+        if track is None or not self.playing:
+            out.fill(0)
+            return 0
+        ring = track.ring
+        count = self.__read(track, out, wait)
+        if count < len(out):
+            out[count:] = 0
+            if track.eof and not ring.available() and track.applied == track.requested:
+                self.playing = False
+                self.on_event('end')
+            elif self.__waiting is None:
+                # silence before the first audio after play/seek is latency, not an underrun
+                self.underruns += 1
+                METRICS.count('audio.underruns')
+        fade = self.fade
+        if fade is not None and fade.incoming is track:
+            self.__mix(fade, out, wait)
+        if count:
+            tap = self.tap
+            if tap is not None:
+                tap(out, track.stream.sample_rate)
+            self.frame += count
+            waiting = self.__waiting
+            if waiting is not None and track.applied >= waiting[2]:
+                self.__waiting = None
+                waiting[0].append((perf_counter() - waiting[1]) * 1000)
+            self.__check_ending(track)
+        self.ramp.apply(out)
+        return count
+
+
+    def __read(self, track:EngineTrack, out:np.ndarray, wait:bool) -> int:
+        ring = track.ring
+        sequence, mark, frame = track.jump
+        if sequence != track.applied:
+            ring.skip_to(mark)
+            track.applied = sequence
+            if track is self.track:
+                self.frame = frame
+        count = ring.read(out)
+        track.space.set()
+        while wait and count < len(out) and not track.eof and not track.closed:
+            track.filled.wait(0.05)
+            track.filled.clear()
+            count += ring.read(out[count:])
+            track.space.set()
+        return count
+
+
+    def __mix(self, fade:Crossfade, out:np.ndarray, wait:bool) -> None:
+        # the outgoing track keeps its own ring; once it runs dry it mixes as silence
+        second = self.mixer.second[:len(out)]
+        count = self.__read(fade.outgoing, second, wait)
+        second[count:] = 0
+        self.mixer.crossfade(out, second, fade)
+        if fade.done() and self.fade is fade:
+            self.__drop_fade()
+
+
+    def __check_ending(self, track:EngineTrack) -> None:
+        # asks for the next track crossfade_ms before the end, unless the track
+        # is too short to fade out of and into
+        frames = track.stream.frames
+        if not self.crossfade_ms or track.ending or frames is None or track.applied != track.requested:
+            return
+        fade = track.stream.sample_rate * self.crossfade_ms // 1000
+        if frames > 2 * fade and self.frame >= frames - fade:
+            track.ending = True
+            self.on_event('ending')
+
+
+    def __produce(self, track:EngineTrack):
+        stream, ring = track.stream, track.ring
+        position, blocks, pending, buffered = 0, None, None, False
+        try:
+            while not track.closed:
+                sequence, request = track.seek_request
+                if sequence != track.jump[0]:
+                    position, blocks, pending, track.eof = request, None, None, False
+                    track.jump = (sequence, ring.write_index, request)
+                    track.filled.set()
+                if track.eof or ring.free() < self.period:
+                    if not buffered and track is self.track:
+                        buffered = True
+                        self.on_event('buffered')
+                    track.space.wait(0.05)
+                    track.space.clear()
+                    continue
+
+                if hasattr(stream, 'read'):
+                    # memory-mapped sources decode straight into the ring
+                    for view in ring.writable(ring.free()):
+                        count = len(stream.read(position, len(view), out=view))
+                        ring.commit(count)
+                        track.filled.set()
+                        position += count
+                        if count < len(view):
+                            track.eof = True
+                            track.filled.set()
+                            break
+                else:
+                    if pending is None:
+                        blocks = blocks or stream.blocks_from(position)
+                        pending = next(blocks, None)
+                        if pending is None:
+                            track.eof = True
+                            track.filled.set()
+                            continue
+                    written = ring.write(pending)
+                    track.filled.set()
+                    position += written
+                    pending = pending[written:] if written < len(pending) else None
+        except (OSError, ValueError):
+            if track is self.track:
+                self.on_event('invalid')
+        finally:
+            stream.close()
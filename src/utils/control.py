@@ -0,0 +1,48 @@
+import json
+import socket
+from collections import deque
+
+
+class PlayerControl:
+    # a client for the headless player's control socket, standard library only
+    def __init__(self, path:str, timeout:float = 5):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.file = self.sock.makefile('rb')
+        self.pending = deque()
+        self.__next_id = 0
+
+
+    def request(self, cmd:str, **args):
+        # the command's result; events that arrive first are kept for next_event()
+        self.__next_id += 1
+        self.sock.sendall(json.dumps(dict(args, cmd=cmd, id=self.__next_id)).encode() + b'\n')
+        while True:
+            message = self.__read()
+            if 'event' in message:
+                self.pending.append(message)
+            elif message.get('id') == self.__next_id:
+                if not message['ok']:
+                    raise RuntimeError(message['error'])
+                return message['result']
+
+
+    def subscribe(self, *events:str) -> list[str]:
+        return self.request('subscribe', events=list(events) or None)
+
+
+    def next_event(self) -> dict:
+        return self.pending.popleft() if self.pending else self.__read()
+
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+
+    def __read(self):
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('the player closed the connection')
+        return json.loads(line)
@@ -0,0 +1,232 @@
+import os
+import subprocess
+from shutil import which
+from struct import unpack
+
+import numpy as np
+
+
+DECODERS = {}
+# extension -> the missing program that would decode it
+MISSING_DECODERS = {}
+BLOCK_FRAMES = 64 * 1024
+PREROLL_FRAMES = 2
+
+
+def register_decoder(extension:str, opener) -> None:
+    DECODERS[extension.lower()] = opener
+
+
+def open_pcm(path:str) -> 'PcmStream':
+    opener = DECODERS.get(os.path.splitext(path)[1].lower())
+    if opener is None:
+        raise ValueError(f"No decoder for {path}")
+    return opener(path)
+
+
+def can_decode(path:str) -> bool:
+    return os.path.splitext(path)[1].lower() in DECODERS
+
+
+class PcmStream:
+    # float32 blocks shaped (frames, channels), values in [-1, 1]
+    sample_rate = 0
+    channels = 0
+    frames = None
+
+
+    def blocks(self, block_frames:int = BLOCK_FRAMES):
+        raise NotImplementedError
+
+
+    def blocks_from(self, start:int, block_frames:int = BLOCK_FRAMES):
+        # a stream that cannot seek decodes from the top and drops frames up to `start`
+        for block in self.blocks(block_frames):
+            if start >= len(block):
+                start -= len(block)
+                continue
+            yield block[start:]
+            start = 0
+
+
+    def close(self) -> None:
+        pass
+
+
+    def duration(self) -> float | None:
+        return self.frames / self.sample_rate if self.frames is not None else None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WavStream(PcmStream):
+    DTYPES = {1: np.uint8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+
+
+    def __init__(self, path:str):
+        self.path = path
+        fmt, offset, size = self.read_chunks(path)
+        if len(fmt) < 16:
+            raise ValueError(f"Truncated fmt chunk in {path}")
+        tag, self.channels, self.sample_rate = unpack('<HHI', fmt[:8])
+        self.sample_width = unpack('<H', fmt[14:16])[0] // 8
+        if tag == 0xfffe and len(fmt) >= 26:
+            tag = unpack('<H', fmt[24:26])[0]
+        # float samples are 32-bit only
+        if (tag not in (1, 3) or self.sample_width not in (1, 2, 3, 4) or tag == 3 and self.sample_width != 4
+                or not self.channels or not self.sample_rate):
+            raise ValueError(f"Unsupported WAV encoding in {path}")
+        self.is_float = tag == 3
+        self.frames = size // (self.sample_width * self.channels)
+        # the data chunk is memory-mapped, blocks are views until converted
+        self.raw = np.memmap(path, dtype=np.uint8, mode='r', offset=offset,
+                             shape=(self.frames * self.channels * self.sample_width,)) if self.frames else np.zeros(0, np.uint8)
+
+
+    @staticmethod
+    def read_chunks(path:str) -> tuple[bytes, int, int]:
+        fmt = None
+        with open(path, 'rb') as f:
+            head = f.read(12)
+            if head[:4] != b'RIFF' or head[8:12] != b'WAVE':
+                raise ValueError(f"Not a WAV file: {path}")
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    break
+                chunk_id, size = chunk[:4], unpack('<I', chunk[4:])[0]
+                if chunk_id == b'fmt ':
+                    fmt = f.read(size)
+                    f.seek(size & 1, os.SEEK_CUR)
+                elif chunk_id == b'data':
+                    if fmt is None:
+                        break
+                    offset = f.tell()
+                    return fmt, offset, min(size, os.fstat(f.fileno()).st_size - offset)
+                else:
+                    f.seek(size + (size & 1), os.SEEK_CUR)
+        raise ValueError(f"Missing fmt or data chunk in {path}")
+
+
+    def read(self, start:int, count:int, out:np.ndarray = None) -> np.ndarray:
+        start = max(0, min(start, self.frames))
+        count = max(0, min(count, self.frames - start))
+        width = self.sample_width * self.channels
+        raw = self.raw[start * width:(start + count) * width]
+
+        if self.sample_width == 3:
+            triplets = raw.reshape(-1, 3).astype(np.int32)
+            samples = (triplets[:, 0] | triplets[:, 1] << 8 | triplets[:, 2] << 16) << 8 >> 8
+            scale = 1 << 23
+        elif self.is_float:
+            samples = raw.view('<f4')
+            scale = 1
+        else:
+            samples = raw.view(self.DTYPES[self.sample_width])
+            scale = 1 << (8 * self.sample_width - 1)
+
+        if out is None:
+            out = np.empty((count, self.channels), dtype=np.float32)
+        else:
+            out = out[:count]
+        flat = out.reshape(-1)
+        np.copyto(flat, samples, casting='unsafe')
+        if self.sample_width == 1:
+            flat -= 128
+        if scale != 1:
+            flat *= 1.0 / scale
+        return out
+
+
+    def blocks(self, block_frames:int = BLOCK_FRAMES):
+        for start in range(0, self.frames, block_frames):
+            yield self.read(start, block_frames)
+
+
+    def close(self) -> None:
+        self.raw = None
+
+
+class FfmpegStream(PcmStream):
+    # any format ffmpeg understands, decoded as a stream into fixed-rate stereo
+    def __init__(self, path:str, sample_rate:int = 44100, channels:int = 2):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.process = None
+        # an MP3's SeekIndex, once the player has one: seeks then start at a frame's byte offset
+        self.seek_index = None
+
+
+    def blocks(self, block_frames:int = BLOCK_FRAMES):
+        return self.__decode(['-i', self.path], None, 0, block_frames)
+
+
+    def blocks_from(self, start:int, block_frames:int = BLOCK_FRAMES):
+        index = self.seek_index
+        if start <= 0:
+            return self.blocks(block_frames)
+        if index is None or not len(index):
+            # ffmpeg seeks the demuxer and trims to the exact sample itself
+            return self.__decode(['-ss', f'{start / self.sample_rate:.6f}', '-i', self.path], None, 0, block_frames)
+        # the bit reservoir reaches back into earlier frames, so decoding starts
+        # PREROLL_FRAMES early and the surplus is trimmed off
+        frame = index.frame_at(start * 1000 // self.sample_rate)
+        frame = max(0, frame - PREROLL_FRAMES)
+        skip = max(0, start - index.samples[frame] * self.sample_rate // index.sample_rate)
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.lseek(fd, index.offsets[frame], os.SEEK_SET)
+            return self.__decode(['-f', 'mp3', '-i', 'pipe:0'], fd, skip, block_frames)
+        finally:
+            # the child keeps its own copy of the descriptor
+            os.close(fd)
+
+
+    def __decode(self, source:list[str], stdin, skip:int, block_frames:int):
+        self.close()
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-v', 'quiet', *source, '-f', 's16le',
+             '-ac', str(self.channels), '-ar', str(self.sample_rate), '-'],
+            stdout=subprocess.PIPE, stdin=subprocess.DEVNULL if stdin is None else stdin)
+        return self.__read(self.process, skip, block_frames)
+
+
+    def __read(self, process, skip:int, block_frames:int):
+        frame_bytes = 2 * self.channels
+        try:
+            while True:
+                raw = process.stdout.read(block_frames * frame_bytes)
+                if not raw:
+                    break
+                usable = len(raw) - len(raw) % frame_bytes
+                samples = np.frombuffer(raw[:usable], dtype='<i2').reshape(-1, self.channels)
+                if skip:
+                    dropped = min(skip, len(samples))
+                    samples, skip = samples[dropped:], skip - dropped
+                    if not len(samples):
+                        continue
+                yield samples.astype(np.float32) * (1.0 / 32768)
+        finally:
+            if process is self.process:
+                self.close()
+
+
+    def close(self) -> None:
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+
+register_decoder('.wav', WavStream)
+if which('ffmpeg'):
+    register_decoder('.mp3', FfmpegStream)
+else:
+    MISSING_DECODERS['.mp3'] = 'ffmpeg'
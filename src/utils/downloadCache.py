@@ -0,0 +1,283 @@
+import os
+import re
+import time
+import shutil
+import sqlite3
+import hashlib
+from threading import Lock
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+
+CHUNK_SIZE = 64 * 1024
+MAX_BYTES = 1024 * 1024 * 1024
+TIMEOUT = 30
+# a partial file nobody has resumed for this long is dropped
+PARTIAL_MAX_AGE = 7 * 24 * 3600
+VIDEO_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def video_id(url:str) -> str:
+    # watch?v=ID, youtu.be/ID, /shorts/ID and /embed/ID; anything else is keyed by a
+    # hash of the URL, since the id ends up in file names
+    parsed = urlparse(url)
+    candidates = parse_qs(parsed.query).get('v') or []
+    parts = [part for part in parsed.path.split('/') if part]
+    if parsed.netloc.endswith('youtu.be') and parts:
+        candidates.append(parts[0])
+    if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v'):
+        candidates.append(parts[1])
+    for candidate in candidates:
+        if VIDEO_ID.fullmatch(candidate):
+            return candidate
+    return 'url-' + hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+class DownloadCache:
+    # downloaded streams by (video id, itag), stored once per sha256 under
+    # objects/; a repeat request is a hard link from there without any network.
+    # Unfinished downloads stay in partial/ and resume with a Range request
+    def __init__(self, root:str, max_bytes:int = MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.partial_dir = os.path.join(root, 'partial')
+        self.objects_dir = os.path.join(root, 'objects')
+        os.makedirs(self.partial_dir, exist_ok=True)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS downloads (
+                video_id  TEXT NOT NULL,
+                itag      INTEGER NOT NULL,
+                kind      TEXT NOT NULL,
+                sha256    TEXT NOT NULL,
+                size      INTEGER NOT NULL,
+                filename  TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (video_id, itag)
+            );
+            CREATE INDEX IF NOT EXISTS downloads_kind ON downloads (video_id, kind, last_used);
+            CREATE INDEX IF NOT EXISTS downloads_used ON downloads (last_used);
+            CREATE INDEX IF NOT EXISTS downloads_sha ON downloads (sha256);
+        """)
+        self.__lock = Lock()
+        self.__fetching = {}
+        self.__writing = set()
+        self.hits = 0
+        self.misses = 0
+        self.resumed = 0
+
+
+    def object_path(self, sha256:str, filename:str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256 + os.path.splitext(filename)[1])
+
+
+    def lookup(self, video_id:str, kind:str) -> dict | None:
+        # the stream last used for this video and kind ('audio'/'video'), if its object is still there
+        with self.__lock:
+            row = self.db.execute("""SELECT video_id, itag, kind, sha256, size, filename FROM downloads
+                                     WHERE video_id = ? AND kind = ? ORDER BY last_used DESC LIMIT 1""",
+                                  (video_id, kind)).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(('video_id', 'itag', 'kind', 'sha256', 'size', 'filename'), row))
+        try:
+            present = os.path.getsize(self.object_path(entry['sha256'], entry['filename'])) == entry['size']
+        except OSError:
+            present = False
+        if not present:
+            self.forget(entry['video_id'], entry['itag'])
+            return None
+        return entry
+
+
+    def resolve(self, video_id:str, kind:str, select, directory:str, on_progress=None) -> tuple[str, bool]:
+        # (filename in `directory`, True when no byte was downloaded); select() -> (stream, filename)
+        # is only called on a miss, so a hit never touches the network
+        with self.__claim(video_id, kind):
+            entry = self.lookup(video_id, kind)
+            hit = entry is not None
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                stream, filename = select()
+                entry = self.fetch(video_id, kind, stream, filename, on_progress)
+            return self.place(entry, directory), hit
+
+
+    def fetch(self, video_id:str, kind:str, stream, filename:str, on_progress=None) -> dict:
+        # stream: anything with url, filesize and itag, like a pytube Stream.
+        # on_progress(done, total) may raise to stop; the partial file is kept for the next attempt
+        part = os.path.join(self.partial_dir, f'{video_id}-{int(stream.itag)}.part')
+        with self.__lock:
+            self.__writing.add(part)
+        try:
+            return self.__fetch(part, video_id, kind, stream, filename, on_progress)
+        finally:
+            with self.__lock:
+                self.__writing.discard(part)
+
+
+    def __fetch(self, part:str, video_id:str, kind:str, stream, filename:str, on_progress) -> dict:
+        size = stream.filesize or None
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if size is not None and offset > size:
+            offset = 0
+        digest = hashlib.sha256()
+        if offset:
+            with open(part, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+
+        if size is None or offset < size:
+            try:
+                response = urlopen(Request(stream.url, headers={'Range': f'bytes={offset}-'} if offset else {}),
+                                   timeout=TIMEOUT)
+            except HTTPError as e:
+                # 416: nothing past what we already have; anything else is a real failure
+                if e.code != 416 or not offset:
+                    raise
+                response = None
+            if response is not None:
+                with response:
+                    if offset and response.status != 206:
+                        # the server ignored the range: start over
+                        offset, digest = 0, hashlib.sha256()
+                    elif offset:
+                        self.resumed += 1
+                    with open(part, 'ab' if offset else 'wb') as f:
+                        for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            offset += len(chunk)
+                            if on_progress is not None:
+                                on_progress(offset, size or offset)
+        if size is not None and offset != size:
+            raise OSError(f'incomplete download: {offset} of {size} bytes')
+
+        sha256 = digest.hexdigest()
+        target = self.object_path(sha256, filename)
+        if os.path.exists(target):
+            # the same bytes under another itag or video: stored once
+            os.remove(part)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(part, target)
+        entry = {'video_id': video_id, 'itag': stream.itag, 'kind': kind, 'sha256': sha256,
+                 'size': offset, 'filename': filename}
+        with self.__lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (video_id, stream.itag, kind, sha256, offset, filename, time.time()))
+        self.evict(keep=(video_id, stream.itag))
+        return entry
+
+
+    def place(self, entry:dict, directory:str) -> str:
+        # the file in `directory` under the cached name: kept if it is already there,
+        # otherwise hard-linked (copied across file systems) from the object
+        with self.__lock, self.db:
+            self.db.execute("UPDATE downloads SET last_used = ? WHERE video_id = ? AND itag = ?",
+                            (time.time(), entry['video_id'], entry['itag']))
+        filename = entry['filename']
+        path = os.path.join(directory, filename)
+        if os.path.exists(path) and os.path.getsize(path) == entry['size']:
+            return filename
+        source = self.object_path(entry['sha256'], filename)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, path)
+        return filename
+
+
+    def forget(self, video_id:str, itag:int) -> None:
+        with self.__lock, self.db:
+            row = self.db.execute("SELECT sha256, filename FROM downloads WHERE video_id = ? AND itag = ?",
+                                  (video_id, itag)).fetchone()
+            self.db.execute("DELETE FROM downloads WHERE video_id = ? AND itag = ?", (video_id, itag))
+            if row is not None:
+                self.__drop_object(*row)
+
+
+    def size(self) -> int:
+        # bytes on disk: an object shared by several entries counts once, plus unfinished downloads
+        with self.__lock:
+            objects = self.db.execute("SELECT coalesce(sum(size), 0) FROM (SELECT DISTINCT sha256, size FROM downloads)"
+                                      ).fetchone()[0]
+        return objects + sum(size for _, _, size in self.partials())
+
+
+    def partials(self) -> list[tuple[str, float, int]]:
+        # (path, mtime, size) of the partial files no download is writing to, oldest first
+        found = []
+        with os.scandir(self.partial_dir) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((entry.path, stat.st_mtime, stat.st_size))
+        with self.__lock:
+            return sorted((item for item in found if item[0] not in self.__writing), key=lambda item: item[1])
+
+
+    def evict(self, keep:tuple = (None, None)) -> int:
+        # abandoned partial files first, then least recently used objects until everything
+        # fits in max_bytes, never the `keep` entry being placed; files already in the music
+        # folder are separate links and stay
+        evicted = 0
+        expired = time.time() - PARTIAL_MAX_AGE
+        for path, mtime, _ in self.partials():
+            if mtime < expired:
+                evicted += self.__drop_partial(path)
+        while self.size() > self.max_bytes:
+            with self.__lock, self.db:
+                row = self.db.execute("""SELECT video_id, itag, sha256, filename FROM downloads
+                                         WHERE NOT (video_id IS ? AND itag IS ?)
+                                         ORDER BY last_used LIMIT 1""", keep).fetchone()
+                if row is not None:
+                    self.db.execute("DELETE FROM downloads WHERE video_id = ? AND itag = ?", row[:2])
+                    self.__drop_object(row[2], row[3])
+            if row is None:
+                # only unfinished downloads left to give up
+                partials = self.partials()
+                if not partials:
+                    break
+                self.__drop_partial(partials[0][0])
+            evicted += 1
+        return evicted
+
+
+    def close(self) -> None:
+        self.db.close()
+
+
+    def __drop_object(self, sha256, filename):
+        # lock held; the object goes with the last entry pointing at it
+        if self.db.execute("SELECT 1 FROM downloads WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone() is None:
+            try:
+                os.remove(self.object_path(sha256, filename))
+            except FileNotFoundError:
+                pass
+
+
+    @staticmethod
+    def __drop_partial(path) -> int:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return 1
+
+
+    def __claim(self, video_id, kind):
+        # one download per video and kind at a time; a second request waits and then hits
+        with self.__lock:
+            lock = self.__fetching.setdefault((video_id, kind), Lock())
+        return lock
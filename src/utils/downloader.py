@@ -1,38 +1,74 @@
-from pytube import YouTube
 from datetime import datetime
 
+from src.utils.downloadCache import VIDEO_ID, video_id
+
 class Downloader:
-    def __init__(self, url:str, path_save_audio:str, path_save_video:str = None):
+    def __init__(self, url:str, path_save_audio:str, path_save_video:str = None, on_progress = None, youtube = None,
+                 cache = None):
+        if youtube is None:
+            # pytube is only needed once something is actually downloaded
+            from pytube import YouTube as youtube
         self.url = url
-        self.youtube = YouTube(self.url)
-        self.title = "".join(str(self.youtube.title).split())
+        self.on_progress = on_progress
+        # a DownloadCache: repeat requests are served from it without the network
+        self.cache = cache
+        self.youtube = youtube(self.url, on_progress_callback=self.progress)
+        # pytube's id is parsed from the URL without a request; ours covers objects
+        # without one. Either way only [A-Za-z0-9_-] reaches a file name
+        pytube_id = getattr(self.youtube, 'video_id', None)
+        self.videoId = pytube_id if isinstance(pytube_id, str) and VIDEO_ID.fullmatch(pytube_id) else video_id(url)
+        self.__title = None
         self.filepathAudio = path_save_audio
         self.filepathVideo = path_save_video
-    
-    
+
+
+    @property
+    def title(self)->str:
+        # fetching the title is a request of its own, a cache hit never needs it
+        if self.__title is None:
+            self.__title = "".join(str(self.youtube.title).split())
+        return self.__title
+
+
     def downloadAudio(self)->str:
-        audioId = self.getIdTime()
-        filename = "{}_{}.mp3".format(self.title, audioId)
-        self.youtube.streams.filter(only_audio=True).first().download(self.filepathAudio, filename)
-        
-        return filename
-    
-    
+        return self.download('audio', 'mp3', self.filepathAudio,
+                             lambda: self.youtube.streams.filter(only_audio=True).first())
+
+
     def downloadVideo(self)->str:
-        videoId = self.getIdTime()
-        filename = "{}_{}.mp4".format(self.title, videoId)
-        self.youtube.streams.filter(progressive=True, file_extension='mp4').first().download(self.filepathVideo, filename)
-        
+        return self.download('video', 'mp4', self.filepathVideo or self.filepathAudio,
+                             lambda: self.youtube.streams.filter(progressive=True, file_extension='mp4').first())
+
+
+    def download(self, kind:str, extension:str, directory:str, select)->str:
+        if self.cache is None:
+            filename = "{}_{}.{}".format(self.title, self.getIdTime(), extension)
+            select().download(directory, filename)
+            return filename
+        # cached files are named after the video, so the same request lands on the same file
+        filename, _ = self.cache.resolve(self.videoId, kind,
+                                         lambda: (select(), "{}_{}.{}".format(self.title, self.videoId, extension)),
+                                         directory, self.cacheProgress)
         return filename
 
 
+    def progress(self, stream, chunk, bytes_remaining) -> None:
+        if self.on_progress is not None and stream.filesize:
+            self.on_progress(100 * (stream.filesize - bytes_remaining) // stream.filesize)
+
+
+    def cacheProgress(self, done:int, total:int) -> None:
+        if self.on_progress is not None and total:
+            self.on_progress(100 * done // total)
+
+
     def getTitle(self)->str:
         return self.title
-    
-    
+
+
     @staticmethod
     def getIdTime()->str:
         return datetime.now().strftime("%Y%m%d%H%M%S")
-    
 
-        
+
+
@@ -0,0 +1,250 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.utils.decoders import open_pcm
+from src.utils.library import Library
+
+
+# analysis runs on mono audio decimated to about 11 kHz
+ANALYSIS_RATE = 11025
+N_FFT = 1024
+HOP_SECONDS = 0.04
+# peaks are picked per band, quantized to FREQ_STEP Hz so the hashes do not depend on the sample rate
+BANDS_HZ = (40, 250, 500, 1000, 2000, 3500, 5500)
+FREQ_STEP = 10
+PEAK_NEIGHBOURHOOD = 8
+PEAK_DB = 6.0
+SILENCE_DB = -70.0
+# each anchor is paired with the next FAN_OUT peaks at most MAX_DT frames ahead
+FAN_OUT = 3
+MAX_DT = 63
+MIN_MATCHES = 20
+MIN_RATIO = 0.05
+
+
+def spectral_peaks(path:str) -> tuple[np.ndarray, np.ndarray, int]:
+    # streams the file; only the per-frame band maxima (frames x bands) are kept
+    with open_pcm(path) as stream:
+        factor = max(1, stream.sample_rate // ANALYSIS_RATE)
+        rate = stream.sample_rate / factor
+        hop = int(round(rate * HOP_SECONDS))
+        window = np.hanning(N_FFT).astype(np.float32)
+        edges = [min(int(hz * N_FFT / rate), N_FFT // 2) for hz in BANDS_HZ]
+        pending = carry = np.zeros(0, dtype=np.float32)
+        levels, bins = [], []
+
+        for block in stream.blocks():
+            mono = np.concatenate((pending, block.mean(axis=1)))
+            usable = len(mono) - len(mono) % factor
+            pending = mono[usable:]
+            samples = np.concatenate((carry, mono[:usable].reshape(-1, factor).mean(axis=1)))
+            if len(samples) < N_FFT:
+                carry = samples
+                continue
+            frames = sliding_window_view(samples, N_FFT)[::hop]
+            carry = samples[len(frames) * hop:]
+            magnitude = np.abs(np.fft.rfft(frames * window, axis=1))
+            band_bins = np.empty((len(frames), len(edges) - 1), dtype=np.int32)
+            for band, (low, high) in enumerate(zip(edges, edges[1:])):
+                band_bins[:, band] = magnitude[:, low:high].argmax(axis=1) + low
+            band_levels = np.take_along_axis(magnitude, band_bins, axis=1)
+            # a band maximum on the band's edge is usually leakage from the next band
+            for shift in (-1, 1):
+                neighbours = np.take_along_axis(magnitude, np.clip(band_bins + shift, 0, N_FFT // 2), axis=1)
+                band_levels[neighbours > band_levels] = 0
+            with np.errstate(divide='ignore'):
+                levels.append(20 * np.log10(band_levels / (N_FFT / 4)))
+            bins.append(band_bins)
+
+    if not levels:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), 0
+    levels, bins = np.concatenate(levels), np.concatenate(bins)
+    # a peak is the loudest point of its band within +-PEAK_NEIGHBOURHOOD frames
+    padded = np.pad(levels, ((PEAK_NEIGHBOURHOOD, PEAK_NEIGHBOURHOOD), (0, 0)), constant_values=-np.inf)
+    local = sliding_window_view(padded, 2 * PEAK_NEIGHBOURHOOD + 1, axis=0).max(axis=2)
+    threshold = np.maximum(np.median(levels, axis=0) + PEAK_DB, SILENCE_DB)
+    times, bands = np.nonzero((levels == local) & (levels > threshold))
+    freqs = (bins[times, bands] * rate / N_FFT / FREQ_STEP).astype(np.int32)
+    return times.astype(np.int32), freqs, len(levels)
+
+
+def peak_hashes(times:np.ndarray, freqs:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # (f1, f2, dt) packed into one integer, anchored at the first peak's frame
+    hashes, offsets = [], []
+    for step in range(1, FAN_OUT + 1):
+        dt = times[step:] - times[:-step]
+        pair = (dt > 0) & (dt <= MAX_DT)
+        hashes.append((freqs[:-step][pair].astype(np.int64) << 16) | (freqs[step:][pair] << 6) | dt[pair])
+        offsets.append(times[:-step][pair])
+    if not hashes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    pairs = np.unique((np.concatenate(hashes) << 32) | np.concatenate(offsets))
+    return pairs >> 32, (pairs & 0xffffffff).astype(np.int32)
+
+
+def fingerprint(path:str) -> dict[str]:
+    times, freqs, frames = spectral_peaks(path)
+    hashes, offsets = peak_hashes(times, freqs)
+    return {'hashes': hashes, 'offsets': offsets, 'frames': frames}
+
+
+def safe_fingerprint(path:str) -> dict[str] | None:
+    try:
+        return fingerprint(path)
+    except (OSError, ValueError):
+        return None
+
+
+def fingerprint_all(paths:list[str], workers:int = None, chunksize:int = 4):
+    if workers == 1:
+        for path in paths:
+            yield path, safe_fingerprint(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from zip(paths, pool.map(safe_fingerprint, paths, chunksize=chunksize))
+
+
+class FingerprintIndex:
+    # per-file fingerprints (valid while the track's mtime matches) and an
+    # inverted hash -> (track, offset) index, both next to the library index
+    def __init__(self, library:Library):
+        self.library = library
+        self.db = library.db
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                id     INTEGER PRIMARY KEY,
+                path   TEXT UNIQUE NOT NULL,
+                mtime  INTEGER NOT NULL,
+                frames INTEGER NOT NULL,
+                hashes INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fingerprint_hashes (
+                hash   INTEGER NOT NULL,
+                track  INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                PRIMARY KEY (hash, track, offset)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS fingerprint_hashes_track ON fingerprint_hashes (track);
+        """)
+
+
+    def stale(self, root:str, recursive:bool = True) -> list[str]:
+        self.prune()
+        return self.library.stale('fingerprints', root, recursive)
+
+
+    def store(self, items) -> None:
+        with self.db:
+            for path, data in items:
+                row = self.db.execute("SELECT mtime FROM tracks WHERE path = ?", (path,)).fetchone()
+                if row is None:
+                    continue
+                hashes = data['hashes'] if data else np.zeros(0, dtype=np.int64)
+                offsets = data['offsets'] if data else np.zeros(0, dtype=np.int32)
+                self.db.execute("INSERT INTO fingerprints (path, mtime, frames, hashes) VALUES (?, ?, ?, ?) "
+                                "ON CONFLICT (path) DO UPDATE SET mtime = excluded.mtime, "
+                                "frames = excluded.frames, hashes = excluded.hashes",
+                                (path, row[0], data['frames'] if data else 0, len(hashes)))
+                track, = self.db.execute("SELECT id FROM fingerprints WHERE path = ?", (path,)).fetchone()
+                self.db.execute("DELETE FROM fingerprint_hashes WHERE track = ?", (track,))
+                self.db.executemany("INSERT INTO fingerprint_hashes (hash, track, offset) VALUES (?, ?, ?)",
+                                    zip(hashes.tolist(), repeat(track), offsets.tolist()))
+
+
+    def prune(self) -> None:
+        # tracks the library scan dropped
+        with self.db:
+            gone = self.db.execute("SELECT id FROM fingerprints WHERE path NOT IN (SELECT path FROM tracks)").fetchall()
+            self.db.executemany("DELETE FROM fingerprint_hashes WHERE track = ?", gone)
+            self.db.executemany("DELETE FROM fingerprints WHERE id = ?", gone)
+
+
+    def match(self, data:dict[str], exclude:str = None) -> list[tuple[str, int]]:
+        # the query only touches the posting lists of its own hashes, so the cost
+        # follows the matches rather than the library size
+        if not data or not len(data['hashes']):
+            return []
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS query_hashes (hash INTEGER, offset INTEGER)")
+        self.db.execute("DELETE FROM query_hashes")
+        self.db.executemany("INSERT INTO query_hashes (hash, offset) VALUES (?, ?)",
+                            zip(data['hashes'].tolist(), data['offsets'].tolist()))
+        # CROSS JOIN keeps sqlite from scanning the whole index in GROUP BY order; tracks
+        # with fewer hits than MIN_MATCHES in total cannot match and never leave sqlite
+        rows = self.db.execute("""
+            WITH hits AS (SELECT h.track AS track, h.offset - q.offset AS delta FROM query_hashes q
+                          CROSS JOIN fingerprint_hashes h ON h.hash = q.hash)
+            SELECT track, delta, COUNT(*) FROM hits
+            WHERE track IN (SELECT track FROM hits GROUP BY track HAVING COUNT(*) >= ?)
+            GROUP BY track, delta""", (MIN_MATCHES,)).fetchall()
+        self.db.execute("DELETE FROM query_hashes")
+
+        matches = []
+        for track, score in self.aligned_scores(rows).items():
+            path, hashes = self.db.execute("SELECT path, hashes FROM fingerprints WHERE id = ?", (track,)).fetchone()
+            if path != exclude and self.is_match(score, len(data['hashes']), hashes):
+                matches.append((path, score))
+        return sorted(matches, key=lambda match: -match[1])
+
+
+    def duplicates(self, root:str = None) -> list[list[str]]:
+        # one self-join over the inverted index, grouped into connected sets
+        self.prune()
+        rows = self.db.execute("""
+            WITH pairs AS (SELECT a.track AS a, b.track AS b, b.offset - a.offset AS delta FROM fingerprint_hashes a
+                           JOIN fingerprint_hashes b ON b.hash = a.hash AND b.track > a.track)
+            SELECT a, b, delta, COUNT(*) FROM pairs
+            WHERE (a, b) IN (SELECT a, b FROM pairs GROUP BY a, b HAVING COUNT(*) >= ?)
+            GROUP BY a, b, delta""", (MIN_MATCHES,))
+        scores = self.aligned_scores(((a, b), delta, count) for a, b, delta, count in rows)
+        info = {track: (path, hashes) for track, path, hashes in self.db.execute("SELECT id, path, hashes FROM fingerprints")}
+        prefix = os.path.abspath(root) + os.sep if root else ''
+
+        parent = {}
+        def find(track):
+            while parent.get(track, track) != track:
+                track = parent[track]
+            return track
+
+        for (a, b), score in scores.items():
+            if self.is_match(score, info[a][1], info[b][1]) and info[a][0].startswith(prefix) \
+                    and info[b][0].startswith(prefix):
+                parent[find(b)] = find(a)
+        groups = defaultdict(list)
+        for track in parent:
+            groups[find(track)].append(info[track][0])
+        for track in groups:
+            groups[track].append(info[track][0])
+        return sorted(sorted(set(paths)) for paths in groups.values())
+
+
+    @staticmethod
+    def aligned_scores(rows) -> dict:
+        # best count of hashes agreeing on one time offset, +-1 frame for re-encodes
+        histograms = defaultdict(dict)
+        for key, delta, count in rows:
+            histograms[key][delta] = count
+        return {key: max(sum(deltas.get(delta + shift, 0) for shift in (-1, 0, 1)) for delta in deltas)
+                for key, deltas in histograms.items()}
+
+
+    @staticmethod
+    def is_match(score:int, hashes_a:int, hashes_b:int) -> bool:
+        return score >= MIN_MATCHES and score >= MIN_RATIO * min(hashes_a, hashes_b)
+
+
+def find_duplicate(library_path:str, path:str) -> str | None:
+    # a library track that sounds like `path`, checked on a private connection
+    data = safe_fingerprint(path)
+    if not data:
+        return None
+    library = Library(library_path)
+    try:
+        matches = FingerprintIndex(library).match(data, exclude=os.path.abspath(path))
+    finally:
+        library.close()
+    return matches[0][0] if matches else None
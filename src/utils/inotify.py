@@ -0,0 +1,76 @@
+import os
+import ctypes
+import ctypes.util
+from struct import calcsize, unpack_from
+
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# what a music folder needs: files appear on close/move-in, directories on create
+FOLDER_EVENTS = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                 | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = 'iIII'
+EVENT_SIZE = calcsize(EVENT_HEADER)
+READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    # a thin ctypes binding; OSError when the platform has no inotify
+    def __init__(self):
+        name = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(name, use_errno=True) if name else None
+        if libc is None or not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+
+    def fileno(self) -> int:
+        return self.fd
+
+
+    def add_watch(self, path:str, mask:int = FOLDER_EVENTS) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+
+    def remove_watch(self, wd:int) -> None:
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+
+    def read(self) -> list[tuple[int, int, int, str]]:
+        # (wd, mask, cookie, name) for everything queued, [] when nothing is
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset + EVENT_SIZE <= len(data):
+            wd, mask, cookie, length = unpack_from(EVENT_HEADER, data, offset)
+            name = data[offset + EVENT_SIZE:offset + EVENT_SIZE + length].rstrip(b'\0')
+            events.append((wd, mask, cookie, os.fsdecode(name)))
+            offset += EVENT_SIZE + length
+        return events
+
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -0,0 +1,328 @@
+import os
+import stat
+import sqlite3
+from collections.abc import Sequence
+from src.utils.metadata import FIELDS as METADATA_FIELDS
+
+
+MUSIC_EXTENSIONS = ('.mp3', '.wav')
+PAGE_SIZE = 256
+# per-track caches, each row is valid while its mtime matches the track's
+CACHE_TABLES = {
+    'metadata': METADATA_FIELDS,
+    'loudness': ('loudness', 'peak', 'gain'),
+}
+
+
+class Library:
+    def __init__(self, filename:str):
+        self.filename = filename
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS dirs (
+                path   TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime  INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+            CREATE TABLE IF NOT EXISTS tracks (
+                path   TEXT PRIMARY KEY,
+                dir    TEXT NOT NULL,
+                size   INTEGER NOT NULL,
+                mtime  INTEGER NOT NULL,
+                ext    TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tracks_dir ON tracks (dir, path);
+            CREATE TABLE IF NOT EXISTS metadata (
+                path     TEXT PRIMARY KEY,
+                mtime    INTEGER NOT NULL,
+                title    TEXT,
+                artist   TEXT,
+                album    TEXT,
+                duration INTEGER,
+                bitrate  INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS loudness (
+                path     TEXT PRIMARY KEY,
+                mtime    INTEGER NOT NULL,
+                loudness REAL,
+                peak     REAL,
+                gain     REAL
+            );
+        """)
+
+
+    def scan(self, root:str, recursive:bool = True) -> dict[str]:
+        # a directory's mtime only changes when its direct entries change,
+        # so an unchanged directory is taken from the index without listing it
+        root = os.path.abspath(root)
+        stats = {'listed': 0, 'skipped': 0, 'added': 0, 'removed': 0, 'updated': 0}
+        stack = [root]
+
+        with self.db:
+            while stack:
+                path = stack.pop()
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    self.forget(path)
+                    continue
+
+                row = self.db.execute("SELECT mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+                if row and row[0] == mtime:
+                    stats['skipped'] += 1
+                    if recursive:
+                        stack.extend(child for child, in self.db.execute(
+                            "SELECT path FROM dirs WHERE parent = ?", (path,)))
+                    continue
+
+                subdirs = self.__scan_dir(path, stats)
+                self.db.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime) VALUES (?, ?, ?)",
+                                (path, os.path.dirname(path), mtime))
+                stats['listed'] += 1
+                if recursive:
+                    stack.extend(subdirs)
+
+        return stats
+
+
+    def __scan_dir(self, path:str, stats:dict) -> list[str]:
+        files, subdirs = {}, []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(MUSIC_EXTENSIONS):
+                            st = entry.stat()
+                            files[entry.path] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+
+        known = {p: (size, mtime) for p, size, mtime in self.db.execute(
+            "SELECT path, size, mtime FROM tracks WHERE dir = ?", (path,))}
+
+        removed = [(p,) for p in known.keys() - files.keys()]
+        self.db.executemany("DELETE FROM tracks WHERE path = ?", removed)
+        for table in CACHE_TABLES:
+            self.db.executemany(f"DELETE FROM {table} WHERE path = ?", removed)
+        stats['removed'] += len(removed)
+
+        changed = []
+        for p, (size, mtime) in files.items():
+            if known.get(p) != (size, mtime):
+                stats['updated' if p in known else 'added'] += 1
+                changed.append((p, path, size, mtime, os.path.splitext(p)[1].lower()))
+        self.db.executemany("INSERT OR REPLACE INTO tracks (path, dir, size, mtime, ext) "
+                            "VALUES (?, ?, ?, ?, ?)", changed)
+
+        known_dirs = {child for child, in self.db.execute("SELECT path FROM dirs WHERE parent = ?", (path,))}
+        for gone in known_dirs - set(subdirs):
+            self.forget(gone)
+        self.db.executemany("INSERT OR IGNORE INTO dirs (path, parent, mtime) VALUES (?, ?, NULL)",
+                            [(sub, path) for sub in subdirs])
+        return subdirs
+
+
+    def update(self, paths) -> dict[str]:
+        # applies single file/directory changes reported by a watcher: changed
+        # files are stat'ed, only new directories are listed
+        stats = {'listed': 0, 'skipped': 0, 'added': 0, 'removed': 0, 'updated': 0}
+        new_dirs, parents = [], set()
+        with self.db:
+            for path in map(os.path.abspath, paths):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    st = None
+                parents.add(os.path.dirname(path))
+                if st is not None and stat.S_ISDIR(st.st_mode):
+                    new_dirs.append(path)
+                elif st is not None and path.lower().endswith(MUSIC_EXTENSIONS):
+                    row = self.db.execute("SELECT size, mtime FROM tracks WHERE path = ?", (path,)).fetchone()
+                    if row == (st.st_size, st.st_mtime_ns):
+                        continue
+                    stats['updated' if row else 'added'] += 1
+                    self.db.execute("INSERT OR REPLACE INTO tracks (path, dir, size, mtime, ext) VALUES (?, ?, ?, ?, ?)",
+                                    (path, os.path.dirname(path), st.st_size, st.st_mtime_ns,
+                                     os.path.splitext(path)[1].lower()))
+                elif st is None:
+                    removed = self.db.execute("DELETE FROM tracks WHERE path = ?", (path,)).rowcount
+                    for table in CACHE_TABLES:
+                        self.db.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+                    if removed:
+                        stats['removed'] += 1
+                    elif self.db.execute("SELECT 1 FROM dirs WHERE path = ?", (path,)).fetchone():
+                        stats['removed'] += self.count(path)
+                        self.forget(path)
+            # the watcher saw every change in these directories, a later scan can skip them
+            for parent in parents:
+                try:
+                    self.db.execute("UPDATE dirs SET mtime = ? WHERE path = ?", (os.stat(parent).st_mtime_ns, parent))
+                except OSError:
+                    pass
+        for path in new_dirs:
+            for key, value in self.scan(path).items():
+                stats[key] += value
+        return stats
+
+
+    def forget(self, path:str) -> None:
+        low, high = self.__bounds(path)
+        self.db.execute("DELETE FROM tracks WHERE dir = ? OR (dir > ? AND dir < ?)", (path, low, high))
+        self.db.execute("DELETE FROM dirs WHERE path = ? OR (path > ? AND path < ?)", (path, low, high))
+        for table in CACHE_TABLES:
+            self.db.execute(f"DELETE FROM {table} WHERE path > ? AND path < ?", (low, high))
+
+
+    def count(self, root:str, recursive:bool = True) -> int:
+        where, args = self.__where(root, recursive)
+        return self.db.execute(f"SELECT COUNT(*) FROM tracks WHERE {where}", args).fetchone()[0]
+
+
+    def page(self, root:str, offset:int, limit:int = PAGE_SIZE, recursive:bool = True) -> list[str]:
+        where, args = self.__where(root, recursive)
+        rows = self.db.execute(f"SELECT path FROM tracks WHERE {where} ORDER BY path LIMIT ? OFFSET ?",
+                               (*args, limit, offset))
+        return [path for path, in rows]
+
+
+    def rank(self, root:str, path:str, recursive:bool = True) -> int | None:
+        path = os.path.abspath(path)
+        where, args = self.__where(root, recursive)
+        if not self.db.execute(f"SELECT 1 FROM tracks WHERE {where} AND path = ?", (*args, path)).fetchone():
+            return None
+        return self.db.execute(f"SELECT COUNT(*) FROM tracks WHERE {where} AND path < ?", (*args, path)).fetchone()[0]
+
+
+    def stale(self, table:str, root:str, recursive:bool = True) -> list[str]:
+        # cached rows are keyed by path + mtime, a touched file gets analysed again
+        where, args = self.__where(root, recursive, 'tracks.')
+        rows = self.db.execute(f"SELECT tracks.path FROM tracks LEFT JOIN {table} ON {table}.path = tracks.path "
+                               f"WHERE {where} AND ({table}.mtime IS NULL OR {table}.mtime != tracks.mtime)", args)
+        return [path for path, in rows]
+
+
+    def store(self, table:str, items) -> None:
+        fields = CACHE_TABLES[table]
+        with self.db:
+            self.db.executemany(f"INSERT OR REPLACE INTO {table} (path, mtime, {', '.join(fields)}) "
+                                f"SELECT path, mtime, {', '.join('?' * len(fields))} FROM tracks WHERE path = ?",
+                                [(*(data[field] for field in fields), path) for path, data in items])
+
+
+    def cached(self, table:str, path:str) -> dict[str] | None:
+        fields = CACHE_TABLES[table]
+        row = self.db.execute(f"SELECT {', '.join(fields)} FROM {table} WHERE path = ?",
+                              (os.path.abspath(path),)).fetchone()
+        return dict(zip(fields, row)) if row else None
+
+
+    def stale_metadata(self, root:str, recursive:bool = True) -> list[str]:
+        return self.stale('metadata', root, recursive)
+
+
+    def store_metadata(self, items) -> None:
+        self.store('metadata', items)
+
+
+    def metadata(self, path:str) -> dict[str] | None:
+        return self.cached('metadata', path)
+
+
+    def loudness(self, path:str) -> dict[str] | None:
+        return self.cached('loudness', path)
+
+
+    def tracks(self, root:str, recursive:bool = True) -> 'LibraryView':
+        return LibraryView(self, os.path.abspath(root), recursive)
+
+
+    def close(self) -> None:
+        self.db.close()
+
+
+    def __where(self, root:str, recursive:bool, table:str = '') -> tuple[str, tuple]:
+        root = os.path.abspath(root)
+        if not recursive:
+            return f"{table}dir = ?", (root,)
+        low, high = self.__bounds(root)
+        return f"{table}path > ? AND {table}path < ?", (low, high)
+
+
+    @staticmethod
+    def __bounds(path:str) -> tuple[str, str]:
+        # every path below `path` sorts between "path/" and "path0" ('0' follows '/')
+        return path + os.sep, path + chr(ord(os.sep) + 1)
+
+
+class PagedView(Sequence):
+    # a read-only sequence fetched from sqlite a page at a time, keeping only
+    # the last few pages in memory
+    def __init__(self, cached_pages:int = 8):
+        self.__cached_pages = cached_pages
+        self.__pages = {}
+        self.__len = self.fetch_count()
+
+
+    def fetch_count(self) -> int:
+        raise NotImplementedError
+
+
+    def fetch_page(self, offset:int, limit:int) -> list[str]:
+        raise NotImplementedError
+
+
+    def __len__(self) -> int:
+        return self.__len
+
+
+    def __getitem__(self, index:int) -> str:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.__len))]
+        if index < 0:
+            index += self.__len
+        if not 0 <= index < self.__len:
+            raise IndexError(index)
+
+        number = index // PAGE_SIZE
+        page = self.__pages.pop(number, None)
+        if page is None:
+            page = self.fetch_page(number * PAGE_SIZE, PAGE_SIZE)
+            if len(self.__pages) >= self.__cached_pages:
+                self.__pages.pop(next(iter(self.__pages)))
+        self.__pages[number] = page
+        return page[index % PAGE_SIZE]
+
+
+    def refresh(self) -> None:
+        self.__pages.clear()
+        self.__len = self.fetch_count()
+
+
+class LibraryView(PagedView):
+    def __init__(self, library:Library, root:str, recursive:bool = True, cached_pages:int = 8):
+        self.library = library
+        self.root = root
+        self.recursive = recursive
+        super().__init__(cached_pages)
+
+
+    def fetch_count(self) -> int:
+        return self.library.count(self.root, self.recursive)
+
+
+    def fetch_page(self, offset:int, limit:int) -> list[str]:
+        return [os.path.relpath(path, self.root) for path in self.library.page(self.root, offset, limit, self.recursive)]
+
+
+    def index(self, path:str, *args) -> int:
+        # tracks are ordered by path, so a track's index is a COUNT over the path index
+        index = self.library.rank(self.root, os.path.join(self.root, path), self.recursive)
+        if index is None:
+            raise ValueError(f"{path} is not in the library view")
+        return index
@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from math import cos, log10, pi, sin, sqrt
+from struct import error as StructError
+
+import numpy as np
+
+from src.utils.decoders import open_pcm
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+
+# ReplayGain 2.0 reference level
+TARGET_LOUDNESS = -18.0
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+SUBBLOCK_SECONDS = 0.1
+
+
+def k_weighting(sample_rate:int) -> list[tuple[list[float], list[float]]]:
+    # BS.1770 pre-filter (high shelf) followed by the RLB high-pass
+    A = 10 ** (4.0 / 40)
+    w0 = 2 * pi * 1500 / sample_rate
+    alpha = sin(w0) / (2 / sqrt(2))
+    shelf = ([A * ((A + 1) + (A - 1) * cos(w0) + 2 * sqrt(A) * alpha),
+              -2 * A * ((A - 1) + (A + 1) * cos(w0)),
+              A * ((A + 1) + (A - 1) * cos(w0) - 2 * sqrt(A) * alpha)],
+             [(A + 1) - (A - 1) * cos(w0) + 2 * sqrt(A) * alpha,
+              2 * ((A - 1) - (A + 1) * cos(w0)),
+              (A + 1) - (A - 1) * cos(w0) - 2 * sqrt(A) * alpha])
+    w0 = 2 * pi * 38 / sample_rate
+    alpha = sin(w0) / (2 * 0.5)
+    highpass = ([(1 + cos(w0)) / 2, -(1 + cos(w0)), (1 + cos(w0)) / 2],
+                [1 + alpha, -2 * cos(w0), 1 - alpha])
+    return [shelf, highpass]
+
+
+def gated_loudness(energies:np.ndarray) -> float:
+    # energies: summed channel mean squares per 100 ms; gating blocks are 400 ms, 75 % overlap
+    if len(energies) < 4:
+        blocks = energies[:1] if len(energies) else np.zeros(1)
+    else:
+        blocks = np.convolve(energies, np.full(4, 0.25), mode='valid')
+    with np.errstate(divide='ignore'):
+        levels = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[levels > ABSOLUTE_GATE]
+    if not len(gated):
+        return float('-inf')
+    relative = -0.691 + 10 * log10(gated.mean()) + RELATIVE_GATE
+    with np.errstate(divide='ignore'):
+        gated = gated[-0.691 + 10 * np.log10(gated) > relative]
+    return -0.691 + 10 * log10(gated.mean()) if len(gated) else float('-inf')
+
+
+def analyze(path:str) -> dict[str]:
+    # streams the file: only one decoded block and one float per 100 ms are kept
+    energies, peak = [], 0.0
+    with open_pcm(path) as stream:
+        rate = stream.sample_rate
+        step = int(rate * SUBBLOCK_SECONDS)
+        filters = k_weighting(rate) if lfilter else []
+        states = [np.zeros((2, stream.channels)) for _ in filters]
+        carry = np.zeros((0, stream.channels), dtype=np.float32)
+
+        for block in stream.blocks(step * 50):
+            peak = max(peak, float(np.abs(block).max(initial=0.0)))
+            for index, (b, a) in enumerate(filters):
+                block, states[index] = lfilter(b, a, block, axis=0, zi=states[index])
+            if len(carry):
+                block = np.concatenate((carry, block))
+            usable = len(block) - len(block) % step
+            squares = np.square(block[:usable], dtype=np.float64).reshape(-1, step, block.shape[1])
+            energies.append(squares.mean(axis=1).sum(axis=1))
+            carry = block[usable:]
+
+    loudness = gated_loudness(np.concatenate(energies) if energies else np.zeros(0))
+    if loudness == float('-inf'):
+        return {'loudness': None, 'peak': peak, 'gain': 0.0}
+    gain = TARGET_LOUDNESS - loudness
+    if peak > 0:
+        # never push the sample peak above full scale
+        gain = min(gain, -20 * log10(peak))
+    return {'loudness': loudness, 'peak': peak, 'gain': gain}
+
+
+def safe_analyze(path:str) -> dict[str]:
+    try:
+        return analyze(path)
+    except (OSError, ValueError, StructError):
+        # one unreadable file must not end the pool.map it is analysed in
+        return {'loudness': None, 'peak': None, 'gain': 0.0}
+
+
+def analyze_all(paths:list[str], workers:int = None):
+    if workers == 1:
+        for path in paths:
+            yield path, safe_analyze(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from zip(paths, pool.map(safe_analyze, paths))
+
+
+def gain_factor(gain_db:float | None) -> float:
+    return 10 ** (gain_db / 20) if gain_db else 1.0
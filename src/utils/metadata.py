@@ -0,0 +1,307 @@
+import os
+from hashlib import blake2b
+from concurrent.futures import ProcessPoolExecutor
+from struct import unpack
+
+
+# only the tag region is read, never the audio payload
+MAX_FRAME_SEARCH = 64 * 1024
+KEY_SAMPLE_SIZE = 64 * 1024
+FIELDS = ('title', 'artist', 'album', 'duration', 'bitrate')
+
+ID3_TEXT_FRAMES = {
+    'TIT2': 'title', 'TPE1': 'artist', 'TALB': 'album', 'TLEN': 'duration',
+    'TT2': 'title', 'TP1': 'artist', 'TAL': 'album', 'TLE': 'duration',
+}
+ID3_PICTURE_FRAMES = {'APIC', 'PIC'}
+FRONT_COVER = 3
+RIFF_INFO_CHUNKS = {b'INAM': 'title', b'IART': 'artist', b'IPRD': 'album'}
+
+MPEG_VERSIONS = {0b00: 2.5, 0b10: 2, 0b11: 1}
+MPEG_LAYERS = {0b01: 3, 0b10: 2, 0b11: 1}
+MPEG_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MPEG_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+
+
+def file_key(path:str) -> str:
+    # size plus head/middle/tail samples: cheap to compute for hour-long files
+    digest = blake2b(digest_size=16)
+    size = os.path.getsize(path)
+    digest.update(str(size).encode())
+    with open(path, 'rb') as f:
+        for offset in (0, max(0, size // 2 - KEY_SAMPLE_SIZE // 2), max(0, size - KEY_SAMPLE_SIZE)):
+            f.seek(offset)
+            digest.update(f.read(KEY_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def read_metadata(path:str) -> dict[str]:
+    data = dict.fromkeys(FIELDS)
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(12)
+            if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+                read_riff(f, data)
+            else:
+                read_mpeg(f, data)
+    except (OSError, ValueError):
+        pass
+    return data
+
+
+def decode_text(raw:bytes) -> str:
+    encoding, raw = raw[:1], raw[1:]
+    if encoding == b'\x01':
+        text = raw.decode('utf-16', 'replace')
+    elif encoding == b'\x02':
+        text = raw.decode('utf-16-be', 'replace')
+    elif encoding == b'\x03':
+        text = raw.decode('utf-8', 'replace')
+    else:
+        text = raw.decode('latin-1', 'replace')
+    return text.split('\x00')[0].strip()
+
+
+def syncsafe(raw:bytes) -> int:
+    return (raw[0] & 0x7f) << 21 | (raw[1] & 0x7f) << 14 | (raw[2] & 0x7f) << 7 | (raw[3] & 0x7f)
+
+
+def iter_id3_frames(f, wanted:set = None):
+    # yields (frame id, payload) for an ID3v2 tag at the start of `f`;
+    # payloads of frames not in `wanted` are skipped with a seek
+    f.seek(0)
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return
+    version, flags = header[3], header[5]
+    end = 10 + syncsafe(header[6:10])
+    if flags & 0x40 and version >= 3:
+        ext = f.read(4)
+        if len(ext) < 4:
+            return
+        f.seek((syncsafe(ext) if version == 4 else unpack('>I', ext)[0] + 4) - 4, os.SEEK_CUR)
+
+    id_len, head_len = (3, 6) if version == 2 else (4, 10)
+    while f.tell() + head_len <= end:
+        head = f.read(head_len)
+        frame_id = head[:id_len]
+        if len(head) < head_len or not frame_id.strip(b'\x00') or not frame_id.isalnum():
+            return
+        if version == 2:
+            size = int.from_bytes(head[3:6], 'big')
+        elif version == 4:
+            size = syncsafe(head[4:8])
+        else:
+            size = unpack('>I', head[4:8])[0]
+        name = frame_id.decode('latin-1')
+        if wanted is None or name in wanted:
+            yield name, f.read(size)
+        else:
+            f.seek(size, os.SEEK_CUR)
+
+
+def read_cover(path:str) -> bytes | None:
+    # the embedded picture's encoded bytes, the front cover if there are several;
+    # only the picture frames are read, other frames and the audio are skipped
+    found = None
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(10)
+            unsynchronised = len(head) == 10 and bool(head[5] & 0x80)
+            for name, payload in iter_id3_frames(f, ID3_PICTURE_FRAMES):
+                picture_type, image = parse_picture(name, payload)
+                if image and (found is None or picture_type == FRONT_COVER):
+                    found = image
+                    if picture_type == FRONT_COVER:
+                        break
+    except (OSError, ValueError):
+        return None
+    if found is not None and unsynchronised:
+        found = found.replace(b'\xff\x00', b'\xff')
+    return found
+
+
+def parse_picture(name:str, payload:bytes) -> tuple[int, bytes]:
+    # APIC: encoding, MIME type\0, picture type, description\0, data;
+    # v2.2 PIC has a 3 letter image format instead of the MIME type
+    if name == 'PIC':
+        pos = 4
+    else:
+        pos = payload.find(b'\x00', 1) + 1
+        if not pos:
+            return 0, b''
+    if pos >= len(payload):
+        return 0, b''
+    picture_type, encoding = payload[pos], payload[:1]
+    pos += 1
+    if encoding in (b'\x01', b'\x02'):
+        # UTF-16 description: the terminator is a 0x0000 code unit
+        end = pos
+        while end + 1 < len(payload) and payload[end:end + 2] != b'\x00\x00':
+            end += 2
+        pos = end + 2
+    else:
+        pos = payload.find(b'\x00', pos) + 1
+        if not pos:
+            return picture_type, b''
+    return picture_type, payload[pos:]
+
+
+def id3v2_size(f) -> int:
+    f.seek(0)
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        return 10 + syncsafe(header[6:10]) + (10 if header[5] & 0x10 else 0)
+    return 0
+
+
+def parse_frame_header(raw:bytes) -> dict[str] | None:
+    if len(raw) < 4 or raw[0] != 0xff or raw[1] & 0xe0 != 0xe0:
+        return None
+    version = MPEG_VERSIONS.get(raw[1] >> 3 & 0b11)
+    layer = MPEG_LAYERS.get(raw[1] >> 1 & 0b11)
+    bitrate_index, rate_index = raw[2] >> 4, raw[2] >> 2 & 0b11
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = MPEG_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    padding = raw[2] >> 1 & 1
+    channels = 1 if raw[3] >> 6 == 0b11 else 2
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version != 1:
+        samples, length = 576, 72 * bitrate // sample_rate + padding
+    else:
+        samples, length = 1152, 144 * bitrate // sample_rate + padding
+    return {'version': version, 'layer': layer, 'bitrate': bitrate, 'sample_rate': sample_rate,
+            'channels': channels, 'samples': samples, 'length': length}
+
+
+def find_first_frame(f, start:int) -> tuple[int, dict[str]] | tuple[None, None]:
+    f.seek(start)
+    buffer = f.read(MAX_FRAME_SEARCH)
+    index = buffer.find(b'\xff')
+    while 0 <= index < len(buffer) - 4:
+        frame = parse_frame_header(buffer[index:index + 4])
+        if frame:
+            # require the following header to line up as well
+            follow = buffer[index + frame['length']:index + frame['length'] + 4]
+            if len(follow) < 4 or parse_frame_header(follow):
+                return start + index, frame
+        index = buffer.find(b'\xff', index + 1)
+    return None, None
+
+
+def read_vbr_header(f, offset:int, frame:dict[str]) -> bytes | None:
+    # Xing/Info header sits after the side info, VBRI 32 bytes after the frame header;
+    # the frame carrying it holds no audio
+    mono = frame['channels'] == 1
+    side_info = (17 if mono else 32) if frame['version'] == 1 else (9 if mono else 17)
+    f.seek(offset + 4 + side_info)
+    xing = f.read(12)
+    if xing[:4] in (b'Xing', b'Info') and len(xing) == 12:
+        return xing
+    f.seek(offset + 36)
+    vbri = f.read(18)
+    if vbri[:4] == b'VBRI' and len(vbri) == 18:
+        return vbri
+    return None
+
+
+def read_vbr_frames(f, offset:int, frame:dict[str]) -> int | None:
+    header = read_vbr_header(f, offset, frame)
+    if header is None:
+        return None
+    if header[:4] == b'VBRI':
+        return unpack('>I', header[14:18])[0]
+    return unpack('>I', header[8:12])[0] if unpack('>I', header[4:8])[0] & 1 else None
+
+
+def read_mpeg(f, data:dict[str]) -> None:
+    for name, payload in iter_id3_frames(f, set(ID3_TEXT_FRAMES)):
+        text = decode_text(payload)
+        if text and not data[ID3_TEXT_FRAMES[name]]:
+            data[ID3_TEXT_FRAMES[name]] = text
+    if data['duration']:
+        data['duration'] = int(data['duration']) if data['duration'].isdigit() else None
+
+    size = f.seek(0, os.SEEK_END)
+    tail = 0
+    if size >= 128:
+        f.seek(size - 128)
+        id3v1 = f.read(128)
+        if id3v1[:3] == b'TAG':
+            tail = 128
+            for key, raw in (('title', id3v1[3:33]), ('artist', id3v1[33:63]), ('album', id3v1[63:93])):
+                if not data[key]:
+                    data[key] = raw.split(b'\x00')[0].decode('latin-1').strip() or None
+
+    offset, frame = find_first_frame(f, id3v2_size(f))
+    if frame is None:
+        return
+    frames = read_vbr_frames(f, offset, frame)
+    audio_bytes = size - offset - tail
+    if frames:
+        seconds = frames * frame['samples'] / frame['sample_rate']
+        data['bitrate'] = int(audio_bytes * 8 / seconds) if seconds else frame['bitrate']
+    else:
+        seconds = audio_bytes * 8 / frame['bitrate']
+        data['bitrate'] = frame['bitrate']
+    if not data['duration']:
+        data['duration'] = int(seconds * 1000)
+
+
+def read_riff(f, data:dict[str]) -> None:
+    byte_rate = data_size = None
+    f.seek(12)
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        chunk_id, size = head[:4], unpack('<I', head[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt = f.read(size)
+            # a truncated fmt leaves the bitrate and duration unknown, the tags still count
+            byte_rate = unpack('<I', fmt[8:12])[0] if len(fmt) >= 16 else None
+            f.seek(size & 1, os.SEEK_CUR)
+        elif chunk_id == b'LIST':
+            if size < 4 or f.read(4) != b'INFO':
+                # an adtl or other list: skip the rest of it, the type is already read
+                f.seek(max(0, size - 4) + (size & 1), os.SEEK_CUR)
+                continue
+            chunk = f.read(size - 4)
+            pos = 0
+            while pos + 8 <= len(chunk):
+                sub_id, sub_size = chunk[pos:pos + 4], unpack('<I', chunk[pos + 4:pos + 8])[0]
+                if sub_id in RIFF_INFO_CHUNKS:
+                    text = chunk[pos + 8:pos + 8 + sub_size].split(b'\x00')[0]
+                    data[RIFF_INFO_CHUNKS[sub_id]] = text.decode('utf-8', 'replace').strip() or None
+                pos += 8 + sub_size + (sub_size & 1)
+            f.seek(size & 1, os.SEEK_CUR)
+        else:
+            if chunk_id == b'data':
+                data_size = size
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+    if byte_rate:
+        data['bitrate'] = byte_rate * 8
+        if data_size is not None:
+            data['duration'] = int(data_size * 1000 / byte_rate)
+
+
+def extract_all(paths:list[str], workers:int = None, chunksize:int = 64):
+    # yields (path, metadata) pairs; workers=1 parses in the calling process
+    if workers == 1:
+        for path in paths:
+            yield path, read_metadata(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from zip(paths, pool.map(read_metadata, paths, chunksize=chunksize))
@@ -0,0 +1,243 @@
+import json
+from bisect import bisect_left
+from collections import deque
+from threading import Lock, Thread
+from time import perf_counter, time
+
+
+WINDOW = 1024
+# upper bounds in ms for the exported histogram buckets
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    # the last `window` samples for percentiles, cumulative buckets for export
+    def __init__(self, window:int = WINDOW):
+        self.recent = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+
+    def add(self, value:float) -> None:
+        self.recent.append(value)
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+    def percentile(self, q:float) -> float | None:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+    def summary(self) -> dict[str]:
+        return {'count': self.count, 'mean': self.total / self.count if self.count else None,
+                'p50': self.percentile(0.5), 'p90': self.percentile(0.9), 'p99': self.percentile(0.99),
+                'max': max(self.recent) if self.recent else None}
+
+
+class Span:
+    def __init__(self, metrics:'Metrics', name:str):
+        self.metrics = metrics
+        self.name = name
+
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, (perf_counter() - self.start) * 1000)
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Metrics:
+    # every recording method returns on its first line while disabled
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.counters = {}
+        self.trace_path = None
+        self.__trace = None
+        self.__open = {}
+        self.__lock = Lock()
+        self.__server = None
+
+
+    def enable(self, trace_path:str = None) -> None:
+        with self.__lock:
+            if trace_path != self.trace_path:
+                self.__close_trace()
+                self.trace_path = trace_path
+            if trace_path and self.__trace is None:
+                self.__trace = open(trace_path, 'a', encoding='utf-8', buffering=1)
+            self.enabled = True
+
+
+    def disable(self) -> None:
+        with self.__lock:
+            self.enabled = False
+            self.__open.clear()
+            self.__close_trace()
+            self.trace_path = None
+
+
+    def count(self, name:str, value:int = 1) -> None:
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.__write({'name': name, 'count': value})
+
+
+    def observe(self, name:str, ms:float, **fields) -> None:
+        if not self.enabled:
+            return
+        with self.__lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(ms)
+            self.__write(dict(fields, name=name, ms=round(ms, 3)))
+
+
+    def span(self, name:str):
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+
+    def begin(self, name:str, **fields) -> None:
+        # spans that start and finish in different callbacks (signals, threads)
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__open[name] = (perf_counter(), fields)
+
+
+    def phase(self, name:str, label:str) -> None:
+        if not self.enabled:
+            return
+        opened = self.__open.get(name)
+        if opened is not None:
+            self.observe(f'{name}.{label}', (perf_counter() - opened[0]) * 1000, **opened[1])
+
+
+    def end(self, name:str) -> None:
+        if not self.enabled:
+            return
+        with self.__lock:
+            opened = self.__open.pop(name, None)
+        if opened is not None:
+            self.observe(name, (perf_counter() - opened[0]) * 1000, **opened[1])
+
+
+    def is_open(self, name:str) -> bool:
+        return name in self.__open
+
+
+    def snapshot(self) -> dict[str]:
+        with self.__lock:
+            return {'counters': dict(self.counters),
+                    'histograms': {name: h.summary() for name, h in self.histograms.items()}}
+
+
+    def prometheus(self) -> str:
+        lines = []
+        with self.__lock:
+            for name, value in sorted(self.counters.items()):
+                metric = self.metric_name(name) + '_total'
+                lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+            for name, histogram in sorted(self.histograms.items()):
+                metric = self.metric_name(name) + '_ms'
+                lines.append(f'# TYPE {metric} histogram')
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines += [f'{metric}_sum {histogram.total:.3f}', f'{metric}_count {histogram.count}']
+        return '\n'.join(lines) + '\n'
+
+
+    @staticmethod
+    def metric_name(name:str) -> str:
+        return 'pyaudioplayer_' + ''.join(c if c.isalnum() else '_' for c in name)
+
+
+    def serve(self, port:int, host:str = '127.0.0.1') -> int:
+        # text exposition on http://host:port/metrics, JSON summaries on /snapshot
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.stop_serving()
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, kind = metrics.prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/snapshot':
+                    body, kind = json.dumps(metrics.snapshot()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', kind)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+
+            def log_message(self, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        Thread(target=self.__server.serve_forever, name='metrics-http', daemon=True).start()
+        return self.__server.server_address[1]
+
+
+    def stop_serving(self) -> None:
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+
+    def close(self) -> None:
+        self.stop_serving()
+        self.disable()
+
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.__open.clear()
+
+
+    def __write(self, event:dict) -> None:
+        if self.__trace is not None:
+            event['t'] = round(time(), 6)
+            self.__trace.write(json.dumps(event) + '\n')
+
+
+    def __close_trace(self) -> None:
+        if self.__trace is not None:
+            self.__trace.close()
+            self.__trace = None
+
+
+# one process-wide registry, like the decoder and backend registries
+METRICS = Metrics()
@@ -0,0 +1,109 @@
+import numpy as np
+
+
+CURVES = ('linear', 'equal_power')
+RAMP_MS = 10
+
+
+class Crossfade:
+    # fades `outgoing` out and `incoming` in over `length` frames, counted from the
+    # first block mixed; equal power keeps the loudness of uncorrelated tracks flat
+    # through the middle, linear keeps the sum of identical material flat
+    def __init__(self, incoming, outgoing, length:int, curve:str = 'equal_power'):
+        if curve not in CURVES:
+            raise ValueError(f"Unknown crossfade curve: {curve}")
+        self.incoming = incoming
+        self.outgoing = outgoing
+        self.length = max(1, length)
+        self.curve = curve
+        self.position = 0
+
+
+    def done(self) -> bool:
+        return self.position >= self.length
+
+
+class Mixer:
+    # gain math for one sink period: everything is allocated here, the audio
+    # callback only writes into these arrays
+    def __init__(self, period:int, channels:int):
+        self.steps = np.arange(1, period + 1, dtype=np.float32)
+        self.progress = np.zeros(period, dtype=np.float32)
+        self.gain_in = np.zeros(period, dtype=np.float32)
+        self.gain_out = np.zeros(period, dtype=np.float32)
+        self.second = np.zeros((period, channels), dtype=np.float32)
+
+
+    def fits(self, period:int, channels:int) -> bool:
+        return len(self.steps) >= period and self.second.shape[1] == channels
+
+
+    def fade_gains(self, fade:Crossfade, count:int) -> tuple[np.ndarray, np.ndarray]:
+        # gains for the next `count` frames of the fade, clamped to the end of it
+        progress, gain_in, gain_out = self.progress[:count], self.gain_in[:count], self.gain_out[:count]
+        np.add(self.steps[:count], fade.position - 1, out=progress)
+        progress *= 1 / fade.length
+        np.minimum(progress, 1, out=progress)
+        if fade.curve == 'linear':
+            gain_in[:] = progress
+            np.subtract(1, progress, out=gain_out)
+        else:
+            progress *= np.pi / 2
+            np.sin(progress, out=gain_in)
+            np.cos(progress, out=gain_out)
+        return gain_in, gain_out
+
+
+    def crossfade(self, out:np.ndarray, second:np.ndarray, fade:Crossfade) -> None:
+        # out (incoming) and second (outgoing) are mixed into out
+        gain_in, gain_out = self.fade_gains(fade, len(out))
+        # channel by channel: broadcasting (frames, 1) gains makes NumPy buffer a copy
+        for channel, other in zip(out.T, second.T):
+            channel *= gain_in
+            other *= gain_out
+        out += second
+        fade.position += len(out)
+
+
+class GainRamp:
+    # volume changes glide linearly over `frames` instead of jumping between
+    # blocks, which clicks on anything but silence
+    def __init__(self, period:int, gain:float = 1.0):
+        self.steps = np.arange(1, period + 1, dtype=np.float32)
+        self.gains = np.zeros(period, dtype=np.float32)
+        self.gain = gain
+        self.target = gain
+        self.step = 0.0
+        self.remaining = 0
+        # numbered like engine seeks: set() publishes one tuple, apply() picks it up
+        self.request = (0, gain, 0)
+        self.applied = 0
+
+
+    def set(self, target:float, frames:int) -> None:
+        # any thread; the ramp starts from wherever the current one got to
+        self.request = (self.request[0] + 1, target, frames)
+
+
+    def apply(self, block:np.ndarray) -> None:
+        sequence, target, frames = self.request
+        if sequence != self.applied:
+            self.applied, self.target = sequence, target
+            self.remaining = max(0, frames)
+            self.step = (target - self.gain) / frames if frames > 0 else 0.0
+            if not self.remaining:
+                self.gain = target
+        count = len(block)
+        if not self.remaining:
+            if self.gain != 1.0:
+                block *= self.gain
+            return
+        ramp = min(count, self.remaining)
+        gains = self.gains[:count]
+        np.multiply(self.steps[:ramp], self.step, out=gains[:ramp])
+        gains[:ramp] += self.gain
+        gains[ramp:] = self.target
+        for channel in block.T:
+            channel *= gains
+        self.remaining -= ramp
+        self.gain = self.target if not self.remaining else float(gains[ramp - 1])
@@ -1,12 +1,35 @@
+import os
+from copy import deepcopy
+from atexit import register as atexitRegister, unregister as atexitUnregister
+from contextlib import contextmanager
+from tempfile import mkstemp
+from threading import RLock, Timer
+from src.utils.metrics import METRICS
 from toml import (load as tLoad, 
                   dump as tDump)
 
 # COUNT_WORDS = 8
 
 class Settings:
-    def __init__(self, filename:str):
+    def __init__(self, filename:str, write_behind:bool = False, delay:float = 0.5):
         self.__filename = filename
         self.__data = self.load()
+        self.__lock = RLock()
+        self.__write_behind = write_behind
+        self.__delay = delay
+        self.__timer = None
+        self.__dirty = False
+        self.__depth = 0
+        self.__saved = deepcopy(self.__data)
+        self.__observers = []
+        self.writes = 0
+        self.fsyncs = 0
+        atexitRegister(self.flush)
+
+
+    @property
+    def filename(self) -> str:
+        return self.__filename
 
 
     def load(self) -> dict[str]:
@@ -16,19 +39,121 @@ class Settings:
 
 
     def save(self) -> None:
-        with open(self.__filename, 'w') as f:
-            tDump(self.__data, f)
+        # temp file + rename: a crash mid-write leaves the old file intact
+        with self.__lock, METRICS.span('settings.write'):
+            directory = os.path.dirname(os.path.abspath(self.__filename))
+            fd, tmp_path = mkstemp(prefix='.settings-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    tDump(self.__data, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.__filename)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self.__saved = deepcopy(self.__data)
+            self.__dirty = False
+            self.writes += 1
+            self.fsyncs += 1
 
 
     def get(self, key:str) -> dict[str]:
         return self.__data.get(key)
-    
-    
+
+
     def set(self, key:str, value:int|str):
-        self.__data[key] = value
-        self.save()
-        return 
-    
+        with self.__lock:
+            if self.__data.get(key) == value and key in self.__data:
+                return
+            self.__data[key] = value
+            self.__dirty = True
+            METRICS.count('settings.set')
+            if not self.__depth:
+                if self.__write_behind:
+                    self.schedule_flush()
+                else:
+                    self.save()
+        self.notify(key, value)
+        return
+
+
+    def subscribe(self, callback, *keys) -> None:
+        # callback(key, value) runs on the thread that changed the value;
+        # no keys means every key
+        self.__observers.append((callback, set(keys)))
+
+
+    def unsubscribe(self, callback) -> None:
+        self.__observers = [(cb, keys) for cb, keys in self.__observers if cb != callback]
+
+
+    def notify(self, key:str, value) -> None:
+        for callback, keys in list(self.__observers):
+            if not keys or key in keys:
+                callback(key, value)
+
+
+    def reload(self) -> list[str]:
+        # only keys edited on disk since our last save are taken, so values
+        # still waiting in the write-behind buffer are not lost. Read under the
+        # lock: a save in between would otherwise look like an edit of the old values
+        with self.__lock:
+            data = self.load()
+            changed = [key for key in data.keys() | self.__saved.keys()
+                       if data.get(key) != self.__saved.get(key) and key in data]
+            for key in changed:
+                self.__data[key] = data[key]
+            self.__saved = deepcopy(data)
+        for key in changed:
+            self.notify(key, data[key])
+        return changed
+
+
+    def schedule_flush(self) -> None:
+        # the first dirty write arms the timer, later ones ride along with it
+        with self.__lock:
+            if self.__timer is None:
+                self.__timer = Timer(self.__delay, self.flush)
+                self.__timer.daemon = True
+                self.__timer.start()
+
+
+    def flush(self) -> None:
+        with self.__lock:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+            if self.__dirty:
+                self.save()
+
+
+    def close(self) -> None:
+        # the last write now, while the directory still exists; nothing left for exit
+        self.flush()
+        atexitUnregister(self.flush)
+
+
+    @contextmanager
+    def transaction(self):
+        with self.__lock:
+            self.__depth += 1
+        try:
+            yield self
+        finally:
+            with self.__lock:
+                self.__depth -= 1
+                if not self.__depth and self.__dirty:
+                    if self.__write_behind:
+                        self.schedule_flush()
+                    else:
+                        self.save()
+
+
+    def is_dirty(self) -> bool:
+        return self.__dirty
+
 
 class Language:
     def __init__(self, filename:str, language:str):
@@ -44,6 +169,14 @@ class Language:
         
     def get(self, word:str) -> str:
         return self.__data.get(self.__language)[word]
+
+
+    def set_language(self, language:str) -> None:
+        self.__language = language
+
+
+    def get_language(self) -> str:
+        return self.__language
     
     
     def get_lang(self) -> list[str]:
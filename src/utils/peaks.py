@@ -0,0 +1,191 @@
+import os
+import json
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.utils.decoders import open_pcm
+from src.utils.metadata import file_key
+
+
+BASE_BLOCK = 256
+CHUNK_BLOCKS = 1024
+MAX_BYTES = 128 * 1024 * 1024
+
+
+def level_sizes(count:int) -> list[int]:
+    sizes = [count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def reduce_level(level:np.ndarray) -> np.ndarray:
+    if len(level) % 2:
+        level = np.concatenate((level, level[-1:]))
+    pairs = level.reshape(-1, 2, 3)
+    reduced = np.empty((len(pairs), 3), dtype=np.float32)
+    np.minimum(pairs[:, 0, 0], pairs[:, 1, 0], out=reduced[:, 0])
+    np.maximum(pairs[:, 0, 1], pairs[:, 1, 1], out=reduced[:, 1])
+    np.sqrt((pairs[:, 0, 2] ** 2 + pairs[:, 1, 2] ** 2) * 0.5, out=reduced[:, 2])
+    return reduced
+
+
+def block_peaks(samples:np.ndarray) -> np.ndarray:
+    blocks = samples.reshape(-1, BASE_BLOCK)
+    peaks = np.empty((len(blocks), 3), dtype=np.float32)
+    blocks.min(axis=1, out=peaks[:, 0])
+    blocks.max(axis=1, out=peaks[:, 1])
+    np.sqrt(np.einsum('ij,ij->i', blocks, blocks) / BASE_BLOCK, out=peaks[:, 2])
+    return peaks
+
+
+class Peaks:
+    # every level holds (min, max, rms) rows; level n covers BASE_BLOCK * 2**n frames per row
+    def __init__(self, data:np.ndarray, sample_rate:int, frames:int):
+        self.data = data
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.levels = []
+        offset = 0
+        for size in level_sizes(max(1, -(-frames // BASE_BLOCK))):
+            self.levels.append(data[offset:offset + size])
+            offset += size
+
+
+    def duration(self) -> int:
+        return self.frames * 1000 // self.sample_rate if self.sample_rate else 0
+
+
+    def window(self, start_ms:int, end_ms:int, width:int) -> np.ndarray:
+        # cost depends on `width` only: pick the level with ~1 row per column
+        width = max(1, width)
+        start = start_ms * self.sample_rate / 1000 / BASE_BLOCK
+        end = max(start + 1, end_ms * self.sample_rate / 1000 / BASE_BLOCK)
+        level = max(0, min(len(self.levels) - 1, int(np.log2(max(1.0, (end - start) / width)))))
+        rows = self.levels[level]
+        scale = 2 ** level
+        indices = np.linspace(start / scale, end / scale, width, endpoint=False).astype(np.intp)
+        np.clip(indices, 0, len(rows) - 1, out=indices)
+        return rows[indices]
+
+
+class PeakCache:
+    # a .npy/.json pair per track; the .npy sizes are capped at max_bytes,
+    # evicting the least recently loaded track first
+    def __init__(self, directory:str, max_bytes:int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.__lock = Lock()
+        self.__files = None
+        os.makedirs(directory, exist_ok=True)
+
+
+    def paths(self, key:str) -> tuple[str, str]:
+        base = os.path.join(self.directory, key)
+        return base + '.npy', base + '.json'
+
+
+    def get(self, path:str, key:str = None) -> Peaks | None:
+        key = key or file_key(path)
+        data_path, info_path = self.paths(key)
+        try:
+            with open(info_path, 'r') as f:
+                info = json.load(f)
+            peaks = Peaks(np.load(data_path, mmap_mode='r'), info['sample_rate'], info['frames'])
+        except (OSError, ValueError, KeyError):
+            return None
+        self.__touch(key)
+        return peaks
+
+
+    def load(self, path:str) -> Peaks:
+        key = file_key(path)
+        return self.get(path, key) or self.compute(path, key)
+
+
+    def compute(self, path:str, key:str = None) -> Peaks:
+        key = key or file_key(path)
+        chunks, carry, frames = [], np.zeros(0, dtype=np.float32), 0
+        with open_pcm(path) as stream:
+            sample_rate = stream.sample_rate
+            for block in stream.blocks(BASE_BLOCK * CHUNK_BLOCKS):
+                frames += len(block)
+                mono = block.mean(axis=1, dtype=np.float32) if block.shape[1] > 1 else block[:, 0]
+                if len(carry):
+                    mono = np.concatenate((carry, mono))
+                usable = len(mono) - len(mono) % BASE_BLOCK
+                if usable:
+                    chunks.append(block_peaks(mono[:usable]))
+                carry = mono[usable:]
+        if len(carry) or not chunks:
+            tail = np.zeros(BASE_BLOCK, dtype=np.float32)
+            tail[:len(carry)] = carry
+            chunks.append(block_peaks(tail))
+
+        levels = [np.concatenate(chunks)]
+        while len(levels[-1]) > 1:
+            levels.append(reduce_level(levels[-1]))
+
+        data_path, info_path = self.paths(key)
+        tmp_path = data_path + '.tmp.npy'
+        data = open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(sum(map(len, levels)), 3))
+        offset = 0
+        for level in levels:
+            data[offset:offset + len(level)] = level
+            offset += len(level)
+        data.flush()
+        del data
+        os.replace(tmp_path, data_path)
+        with open(info_path, 'w') as f:
+            json.dump({'path': path, 'sample_rate': sample_rate, 'frames': frames}, f)
+        self.__store(key)
+        return Peaks(np.load(data_path, mmap_mode='r'), sample_rate, frames)
+
+
+    def size(self) -> int:
+        with self.__lock:
+            return sum(self.__index().values())
+
+
+    def __index(self):
+        # lock held; oldest first, rebuilt from mtimes on first use
+        if self.__files is None:
+            files = []
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.npy') and not entry.name.endswith('.tmp.npy'):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            self.__files = OrderedDict((key, size) for _, key, size in sorted(files))
+        return self.__files
+
+
+    def __touch(self, key):
+        with self.__lock:
+            files = self.__index()
+            if key in files:
+                files.move_to_end(key)
+        try:
+            os.utime(self.paths(key)[0])
+        except OSError:
+            pass
+
+
+    def __store(self, key):
+        with self.__lock:
+            files = self.__index()
+            files[key] = os.path.getsize(self.paths(key)[0])
+            files.move_to_end(key)
+            total = sum(files.values())
+            # the newest pair stays even if it alone is over the limit
+            while total > self.max_bytes and len(files) > 1:
+                old, size = files.popitem(last=False)
+                total -= size
+                for path in self.paths(old):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
@@ -0,0 +1,310 @@
+import os
+import random
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+from urllib.parse import unquote, urlparse
+
+from src.utils.library import Library, PagedView
+
+
+FEISTEL_ROUNDS = 4
+IMPORT_BATCH = 1024
+PLAYLIST_EXTENSIONS = ('.m3u', '.m3u8')
+
+
+class Permutation(Sequence):
+    # a seeded bijection on range(size), evaluated per index: a balanced Feistel
+    # network over the next even power of two, cycle-walking values >= size
+    def __init__(self, size:int, seed:int):
+        self.size = size
+        self.seed = seed
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + (bits & 1)) // 2
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(32) for _ in range(FEISTEL_ROUNDS)]
+
+
+    def __len__(self) -> int:
+        return self.size
+
+
+    def __getitem__(self, index:int) -> int:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        value = self.__encrypt(index)
+        while value >= self.size:
+            value = self.__encrypt(value)
+        return value
+
+
+    def index(self, value:int, *args) -> int:
+        if not 0 <= value < self.size:
+            raise ValueError(value)
+        index = self.__decrypt(value)
+        while index >= self.size:
+            index = self.__decrypt(index)
+        return index
+
+
+    def __round(self, value:int, key:int) -> int:
+        value = (value * 0x9e3779b1 + key) & 0xffffffff
+        value ^= value >> 15
+        value = (value * 0x85ebca77) & 0xffffffff
+        value ^= value >> 13
+        return value & self.mask
+
+
+    def __encrypt(self, value:int) -> int:
+        left, right = value >> self.half, value & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self.__round(right, key)
+        return left << self.half | right
+
+
+    def __decrypt(self, value:int) -> int:
+        left, right = value >> self.half, value & self.mask
+        for key in reversed(self.keys):
+            left, right = right ^ self.__round(left, key), left
+        return left << self.half | right
+
+
+class Playlist:
+    # `tracks` is any sequence of paths (a LibraryView, a PlaylistView); the play
+    # order is either range(len) or a Permutation over it, never a copy
+    def __init__(self, name:str, tracks:Sequence, position:int = 0, shuffle:bool = False, seed:int = 0):
+        self.name = name
+        self.tracks = tracks
+        self.shuffle = shuffle
+        self.seed = seed
+        self.queue = deque()
+        self.order = self.__order()
+        self.position = position % len(self.order) if self.order else 0
+        self.current_index = self.order[self.position] if self.order else None
+
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+
+    def __order(self) -> Sequence:
+        return Permutation(len(self.tracks), self.seed) if self.shuffle else range(len(self.tracks))
+
+
+    def current(self) -> str | None:
+        return self.tracks[self.current_index] if self.current_index is not None else None
+
+
+    def next(self) -> str | None:
+        if self.queue:
+            self.current_index = self.queue.popleft()
+        elif self.order:
+            self.position = (self.position + 1) % len(self.order)
+            self.current_index = self.order[self.position]
+        return self.current()
+
+
+    def prev(self) -> str | None:
+        if self.order:
+            self.position = (self.position - 1) % len(self.order)
+            self.current_index = self.order[self.position]
+        return self.current()
+
+
+    def peek_next(self) -> str | None:
+        if self.queue:
+            return self.tracks[self.queue[0]]
+        return self.tracks[self.order[(self.position + 1) % len(self.order)]] if self.order else None
+
+
+    def upcoming(self, count:int) -> list[str]:
+        # what next() would return the next `count` times, queued tracks first
+        indexes = list(self.queue)[:count]
+        if self.order:
+            size = len(self.order)
+            indexes += [self.order[(self.position + step) % size] for step in range(1, min(count - len(indexes), size) + 1)]
+        return [self.tracks[index] for index in indexes]
+
+
+    def enqueue(self, index:int) -> None:
+        self.queue.append(index)
+
+
+    def jump(self, index:int) -> str | None:
+        if self.order:
+            self.position = self.order.index(index)
+            self.current_index = index
+        return self.current()
+
+
+    def set_shuffle(self, shuffle:bool, seed:int = None) -> None:
+        # the current track keeps playing; only what comes after it changes
+        self.shuffle = shuffle
+        if seed is not None:
+            self.seed = seed
+        self.order = self.__order()
+        if self.current_index is not None and self.order:
+            self.jump(self.current_index)
+
+
+    def refresh(self, renames:dict = None) -> None:
+        # the source grew or shrank: keep playing the same path if it still exists,
+        # under its new name if it was renamed
+        renames = renames or {}
+        path = self.current()
+        path = renames.get(path, path)
+        queued = [renames.get(self.tracks[index], self.tracks[index]) for index in self.queue]
+        self.tracks.refresh()
+        self.order = self.__order()
+        self.queue = deque()
+        for queued_path in queued:
+            try:
+                self.queue.append(self.tracks.index(queued_path))
+            except ValueError:
+                pass
+        try:
+            index = self.tracks.index(path) if path is not None else 0
+        except ValueError:
+            index = min(self.current_index or 0, len(self.tracks) - 1)
+        if self.order:
+            self.jump(index)
+        else:
+            self.position, self.current_index = 0, None
+
+
+class PlaylistView(PagedView):
+    def __init__(self, library:Library, name:str, cached_pages:int = 8):
+        self.library = library
+        self.name = name
+        super().__init__(cached_pages)
+
+
+    def fetch_count(self) -> int:
+        return self.library.db.execute("SELECT COUNT(*) FROM playlist_entries WHERE playlist = ?",
+                                       (self.name,)).fetchone()[0]
+
+
+    def fetch_page(self, offset:int, limit:int) -> list[str]:
+        rows = self.library.db.execute("SELECT path FROM playlist_entries WHERE playlist = ? AND idx >= ? "
+                                       "ORDER BY idx LIMIT ?", (self.name, offset, limit))
+        return [path for path, in rows]
+
+
+    def index(self, path:str, *args) -> int:
+        row = self.library.db.execute("SELECT MIN(idx) FROM playlist_entries WHERE playlist = ? AND path = ?",
+                                      (self.name, path)).fetchone()
+        if row[0] is None:
+            raise ValueError(f"{path} is not in playlist {self.name}")
+        return row[0]
+
+
+class PlaylistStore:
+    # imported playlists and the play state of every playlist, folders included,
+    # live next to the library index
+    def __init__(self, library:Library):
+        self.library = library
+        self.db = library.db
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS playlists (
+                name     TEXT PRIMARY KEY,
+                position INTEGER NOT NULL DEFAULT 0,
+                path     TEXT,
+                shuffle  INTEGER NOT NULL DEFAULT 0,
+                seed     INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS playlist_entries (
+                playlist TEXT NOT NULL,
+                idx      INTEGER NOT NULL,
+                path     TEXT NOT NULL,
+                PRIMARY KEY (playlist, idx)
+            );
+        """)
+
+
+    def open(self, name:str, tracks:Sequence = None) -> Playlist:
+        tracks = tracks if tracks is not None else PlaylistView(self.library, name)
+        row = self.db.execute("SELECT position, path, shuffle, seed FROM playlists WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return Playlist(name, tracks, seed=random.getrandbits(31))
+        position, path, shuffle, seed = row
+        playlist = Playlist(name, tracks, position, bool(shuffle), seed)
+        if path is not None and playlist.current() != path:
+            # the source changed since the last run, find the track again
+            try:
+                playlist.jump(tracks.index(path))
+            except ValueError:
+                pass
+        return playlist
+
+
+    def save(self, playlist:Playlist) -> None:
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO playlists (name, position, path, shuffle, seed) "
+                            "VALUES (?, ?, ?, ?, ?)", (playlist.name, playlist.position, playlist.current(),
+                                                       int(playlist.shuffle), playlist.seed))
+
+
+    def names(self) -> list[str]:
+        return [name for name, in self.db.execute("SELECT DISTINCT playlist FROM playlist_entries ORDER BY playlist")]
+
+
+    def import_m3u(self, path:str, name:str = None) -> str:
+        # entries go to sqlite in batches straight from the file reader
+        name = name or os.path.abspath(path)
+        entries = read_m3u(path)
+        with self.db:
+            self.db.execute("DELETE FROM playlist_entries WHERE playlist = ?", (name,))
+            self.db.execute("DELETE FROM playlists WHERE name = ?", (name,))
+            index = 0
+            while True:
+                batch = list(islice(entries, IMPORT_BATCH))
+                if not batch:
+                    break
+                self.db.executemany("INSERT INTO playlist_entries (playlist, idx, path) VALUES (?, ?, ?)",
+                                    ((name, index + offset, entry) for offset, entry in enumerate(batch)))
+                index += len(batch)
+        return name
+
+
+    def export_m3u(self, tracks:Sequence, path:str, root:str = '') -> int:
+        return write_m3u(path, (os.path.join(root, track) for track in tracks), self.library.metadata)
+
+
+def read_m3u(path:str):
+    # yields absolute paths; relative entries are resolved against the playlist's folder
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('file://'):
+                line = unquote(urlparse(line).path)
+            elif '://' in line:
+                continue
+            yield os.path.normpath(os.path.join(base, line.replace('\\', os.sep)))
+
+
+def write_m3u(path:str, tracks, metadata=None) -> int:
+    # extended M3U, one #EXTINF per entry when the library knows the track
+    count = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('#EXTM3U\n')
+        for track in tracks:
+            meta = metadata(track) if metadata else None
+            if meta and meta.get('title'):
+                seconds = meta['duration'] // 1000 if meta.get('duration') else -1
+                title = ' - '.join(filter(None, (meta.get('artist'), meta['title'])))
+                f.write(f'#EXTINF:{seconds},{title}\n')
+            f.write(track + '\n')
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def is_playlist(path:str) -> bool:
+    return path.lower().endswith(PLAYLIST_EXTENSIONS)
@@ -0,0 +1,201 @@
+import os
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from struct import pack, unpack
+from threading import Lock
+
+from src.utils.metadata import file_key, find_first_frame, id3v2_size, parse_frame_header, read_vbr_header
+
+
+READ_SIZE = 1024 * 1024
+INDEX_MAGIC = b'SIDX2'
+MAX_BYTES = 64 * 1024 * 1024
+FRAME_TABLE = None
+
+
+class SeekIndex:
+    # one entry per MPEG frame: byte offset and first sample of the frame
+    def __init__(self, sample_rate:int, offsets:array, samples:array, total_samples:int):
+        self.sample_rate = sample_rate
+        self.offsets = offsets
+        self.samples = samples
+        self.total_samples = total_samples
+
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+    def duration(self) -> int:
+        return self.total_samples * 1000 // self.sample_rate if self.sample_rate else 0
+
+
+    def frame_at(self, position_ms:int) -> int:
+        sample = position_ms * self.sample_rate // 1000
+        return max(0, bisect_right(self.samples, sample) - 1)
+
+
+    def time_to_byte(self, position_ms:int) -> tuple[int, int]:
+        # byte offset of the frame containing `position_ms` and that frame's start time
+        if not self.offsets:
+            return 0, 0
+        frame = self.frame_at(max(0, position_ms))
+        return self.offsets[frame], self.samples[frame] * 1000 // self.sample_rate
+
+
+    def byte_to_time(self, offset:int) -> int:
+        if not self.offsets:
+            return 0
+        frame = max(0, bisect_right(self.offsets, offset) - 1)
+        return self.samples[frame] * 1000 // self.sample_rate
+
+
+    def snap(self, position_ms:int) -> int:
+        return self.time_to_byte(min(max(0, position_ms), self.duration()))[1]
+
+
+    def dump(self, path:str) -> None:
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_MAGIC + pack('<IQI', self.sample_rate, self.total_samples, len(self.offsets)))
+            self.offsets.tofile(f)
+            self.samples.tofile(f)
+        os.replace(tmp_path, path)
+
+
+    @classmethod
+    def load(cls, path:str) -> 'SeekIndex':
+        with open(path, 'rb') as f:
+            head = f.read(len(INDEX_MAGIC) + 16)
+            if head[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+                raise ValueError(f"Not a seek index: {path}")
+            sample_rate, total_samples, count = unpack('<IQI', head[len(INDEX_MAGIC):])
+            offsets, samples = array('q'), array('q')
+            offsets.fromfile(f, count)
+            samples.fromfile(f, count)
+        return cls(sample_rate, offsets, samples, total_samples)
+
+
+def frame_table() -> list:
+    # (length, samples) for the second and third header bytes of every valid frame at
+    # `sample_rate`, so the frame walk is one list lookup instead of parse_frame_header()
+    global FRAME_TABLE
+    if FRAME_TABLE is None:
+        table = [None] * 0x10000
+        for key in range(0xe000, 0x10000):
+            frame = parse_frame_header(bytes((0xff, key >> 8, key & 0xff, 0)))
+            if frame is not None:
+                table[key] = frame['length'], frame['samples'], frame['sample_rate']
+        FRAME_TABLE = table
+    return FRAME_TABLE
+
+
+def build_index(path:str) -> SeekIndex:
+    # walks every frame header once; payloads are skipped, never decoded
+    offsets, samples = array('q'), array('q')
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 128))
+        end = size - 128 if f.read(3) == b'TAG' else size
+        start, first = find_first_frame(f, id3v2_size(f))
+        if first is None:
+            return SeekIndex(0, offsets, samples, 0)
+
+        sample_rate, position, total = first['sample_rate'], start, 0
+        if read_vbr_header(f, start, first) is not None:
+            # the Xing/Info frame decodes to nothing; counting it puts every offset a frame late
+            position += first['length']
+        table = [entry[:2] if entry and entry[2] == sample_rate else None for entry in frame_table()]
+        add_offset, add_sample = offsets.append, samples.append
+        f.seek(position)
+        buffer, base = f.read(READ_SIZE), position
+        limit = base + len(buffer) - 4
+        while position + 4 <= end:
+            if position > limit:
+                f.seek(position)
+                buffer, base = f.read(READ_SIZE), position
+                limit = base + len(buffer) - 4
+            local = position - base
+            frame = table[buffer[local + 1] << 8 | buffer[local + 2]] if buffer[local] == 0xff else None
+            if frame is None:
+                # lost sync: look for the next frame header
+                found, header = find_first_frame(f, position + 1)
+                if header is None or found >= end:
+                    break
+                position = found
+                f.seek(position)
+                buffer, base = f.read(READ_SIZE), position
+                limit = base + len(buffer) - 4
+                continue
+            add_offset(position)
+            add_sample(total)
+            total += frame[1]
+            position += frame[0]
+    return SeekIndex(sample_rate, offsets, samples, total)
+
+
+class SeekIndexCache:
+    # one .sidx per track, least recently loaded evicted past max_bytes
+    def __init__(self, directory:str, max_bytes:int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.__lock = Lock()
+        self.__files = None
+        os.makedirs(directory, exist_ok=True)
+
+
+    def load(self, path:str) -> SeekIndex:
+        name = file_key(path) + '.sidx'
+        index_path = os.path.join(self.directory, name)
+        try:
+            index = SeekIndex.load(index_path)
+        except (OSError, ValueError, EOFError):
+            index = build_index(path)
+            index.dump(index_path)
+            self.__store(name)
+            return index
+        self.__touch(name)
+        return index
+
+
+    def size(self) -> int:
+        with self.__lock:
+            return sum(self.__index().values())
+
+
+    def __index(self):
+        # lock held; oldest first, rebuilt from mtimes on first use
+        if self.__files is None:
+            with os.scandir(self.directory) as entries:
+                files = sorted((entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                               for entry in entries if entry.name.endswith('.sidx'))
+            self.__files = OrderedDict((name, size) for _, name, size in files)
+        return self.__files
+
+
+    def __touch(self, name):
+        with self.__lock:
+            files = self.__index()
+            if name in files:
+                files.move_to_end(name)
+        try:
+            os.utime(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+
+    def __store(self, name):
+        path = os.path.join(self.directory, name)
+        with self.__lock:
+            files = self.__index()
+            files[name] = os.path.getsize(path)
+            files.move_to_end(name)
+            total = sum(files.values())
+            while total > self.max_bytes and len(files) > 1:
+                old, size = files.popitem(last=False)
+                total -= size
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except OSError:
+                    pass
@@ -0,0 +1,184 @@
+import numpy as np
+
+
+TAP_FRAMES = 16384
+# (FFT size, bands) from the finest to the cheapest; the frame budget walks this list
+RESOLUTIONS = ((2048, 32), (1024, 24), (512, 16), (256, 8))
+MIN_HZ = 40
+# decimating to about twice this keeps the FFT small without losing the visible range
+MAX_HZ = 11025
+FLOOR_DB = -60.0
+EPSILON = 1e-9
+
+
+class SampleTap:
+    # a mono copy of what the sink plays; write() runs on the audio thread and only
+    # advances write_index, readers copy the newest samples out. A read racing a
+    # write can see a torn window, which a visualizer never shows
+    def __init__(self, capacity:int = TAP_FRAMES, block:int = 4096):
+        self.data = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.scratch = np.zeros(block, dtype=np.float32)
+        self.write_index = 0
+        self.sample_rate = 0
+
+
+    def write(self, block:np.ndarray, sample_rate:int, scale:float = 1.0) -> None:
+        # block is (frames, channels) of any numeric dtype, `scale` maps it to -1..1
+        self.sample_rate = sample_rate
+        factor = scale / block.shape[1]
+        for start in range(0, len(block), len(self.scratch)):
+            part = block[start:start + len(self.scratch)]
+            mono = self.scratch[:len(part)]
+            np.sum(part, axis=1, out=mono)
+            mono *= factor
+            offset = self.write_index % self.capacity
+            first = min(len(mono), self.capacity - offset)
+            self.data[offset:offset + first] = mono[:first]
+            self.data[:len(mono) - first] = mono[first:]
+            self.write_index += len(mono)
+
+
+    def latest(self, out:np.ndarray) -> bool:
+        # the newest len(out) samples, oldest first; False until that many were written
+        end = self.write_index
+        count = len(out)
+        if end < count:
+            return False
+        start = (end - count) % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        out[first:] = self.data[:count - first]
+        return True
+
+
+class SpectrumAnalyzer:
+    # Hann-windowed FFT over the newest tap samples, reduced to log-spaced bands.
+    # Every array is allocated in configure(), update() only writes into them
+    def __init__(self, level:int = 0, decay:float = 0.85):
+        self.level = level
+        self.decay = decay
+        self.sample_rate = 0
+        self.read_index = -1
+        self.levels = np.zeros(RESOLUTIONS[level][1])
+        self.rms = 0.0
+
+
+    def configure(self, sample_rate:int, level:int | None = None) -> None:
+        if level is not None:
+            self.level = level
+        size, bands = RESOLUTIONS[self.level]
+        self.sample_rate = sample_rate
+        self.factor = max(1, sample_rate // (2 * MAX_HZ))
+        # float64 throughout: pocketfft copies anything else into a temporary
+        self.raw = np.zeros(size * self.factor)
+        self.blocks = self.raw.reshape(size, self.factor)
+        self.frame = np.zeros(size)
+        self.window = np.hanning(size)
+        self.spectrum = np.zeros(size // 2 + 1, dtype=complex)
+        self.magnitude = np.zeros(size // 2 + 1)
+
+        # band edges as FFT bins; at small sizes the lowest bands share bins and merge
+        rate = sample_rate / self.factor
+        edges = np.geomspace(MIN_HZ, min(MAX_HZ, rate / 2), bands + 1) * size / rate
+        edges = np.unique(np.clip(np.round(edges).astype(int), 1, size // 2))
+        self.starts = edges[:-1]
+        self.head = self.magnitude[:edges[-1]]
+        self.bands = np.zeros(len(self.starts))
+        self.levels = np.zeros(len(self.starts))
+        # a full-scale sine peaks at size/4 after the Hann window
+        self.reference = size / 4
+        self.__rfft_out = True
+
+
+    def set_level(self, level:int) -> None:
+        level = max(0, min(level, len(RESOLUTIONS) - 1))
+        if level != self.level:
+            self.level = level
+            if self.sample_rate:
+                self.configure(self.sample_rate)
+
+
+    def update(self, tap:SampleTap) -> bool:
+        # False when there was nothing to draw: no new audio and the bars already fell to zero
+        if not tap.sample_rate:
+            return False
+        if tap.sample_rate != self.sample_rate:
+            self.configure(tap.sample_rate)
+        if tap.write_index == self.read_index or not tap.latest(self.raw):
+            if not self.levels.any():
+                return False
+            self.levels *= self.decay
+            if self.levels.max() < 1e-3:
+                self.levels.fill(0)
+            self.rms = 0.0
+            return True
+        self.read_index = tap.write_index
+
+        # boxcar decimation, then window -> FFT -> |X| -> loudest bin per band
+        if self.factor > 1:
+            np.add.reduce(self.blocks, axis=1, out=self.frame)
+            self.frame *= 1 / self.factor
+        else:
+            self.frame[:] = self.raw
+        self.rms = float(np.sqrt(np.dot(self.frame, self.frame) / len(self.frame)))
+        self.frame *= self.window
+        if self.__rfft_out:
+            try:
+                np.fft.rfft(self.frame, out=self.spectrum)
+            except TypeError:
+                # NumPy < 2.0 has no out=, pay for the allocation
+                self.__rfft_out = False
+        if not self.__rfft_out:
+            self.spectrum[:] = np.fft.rfft(self.frame)
+        np.abs(self.spectrum, out=self.magnitude)
+        np.maximum.reduceat(self.head, self.starts, out=self.bands)
+
+        # to 0..1 over FLOOR_DB..0 dBFS; bars rise at once and fall by `decay` per frame
+        self.bands /= self.reference
+        np.maximum(self.bands, EPSILON, out=self.bands)
+        np.log10(self.bands, out=self.bands)
+        self.bands *= 20 / -FLOOR_DB
+        self.bands += 1
+        np.maximum(self.bands, 0, out=self.bands)
+        np.minimum(self.bands, 1, out=self.bands)
+        self.levels *= self.decay
+        np.maximum(self.levels, self.bands, out=self.levels)
+        return True
+
+
+class FrameBudget:
+    # keeps the visualizer's share of each frame under `share`: a few frames over
+    # budget drop one resolution step, a long run well under it climbs back
+    def __init__(self, fps:int, share:float = 0.1, smoothing:float = 0.2, recover:int = 90):
+        self.share = share
+        self.smoothing = smoothing
+        self.recover = recover
+        self.set_fps(fps)
+
+
+    def set_fps(self, fps:int) -> None:
+        self.interval = 1000 / fps
+        self.budget = self.interval * self.share
+        self.cost = 0.0
+        self.calm = 0
+        self.cooldown = 0
+
+
+    def record(self, cost:float, late:float = 0.0) -> int:
+        # cost: ms this frame spent analysing and painting; late: ms the tick came
+        # after its due time, which is how load elsewhere shows up. Returns the step
+        self.cost += (cost - self.cost) * self.smoothing
+        if self.cooldown:
+            self.cooldown -= 1
+            return 0
+        if self.cost > self.budget or late > self.interval:
+            self.calm = 0
+            self.cooldown = 10
+            return 1
+        self.calm = self.calm + 1 if self.cost < self.budget / 3 else 0
+        if self.calm >= self.recover:
+            self.calm = 0
+            self.cooldown = 10
+            return -1
+        return 0